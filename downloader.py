@@ -18,7 +18,6 @@ Tomato 服务负责解密和下载正文，本模块只做转发和状态管理
     status = dl.get_download_status("7143038691944959011")
 """
 
-import json
 import os
 import re
 import time
@@ -27,6 +26,9 @@ from typing import Optional, Callable
 
 import requests
 
+from scrapers.extract import embedded_state
+from scrapers.http import get_client
+
 
 # ── 数据模型 ────────────────────────────────────────
 
@@ -123,6 +125,11 @@ class FanqieDownloader:
         ).rstrip("/")
 
         self.timeout = config.get("request_timeout", 15)
+        # 与爬虫共用的连接池客户端
+        self.http = get_client({
+            "timeout": self.timeout,
+            "retries": config.get("request_retries", 1),
+        })
         self.user_agent = (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
             "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -140,7 +147,7 @@ class FanqieDownloader:
             连接失败返回 {"connected": False, "error": "..."}
         """
         try:
-            resp = requests.get(
+            resp = self.http.get(
                 f"{self.tomato_url}/api/status",
                 timeout=self.timeout,
             )
@@ -171,7 +178,7 @@ class FanqieDownloader:
     def _get_book_info_from_tomato(self, book_id: str) -> Optional[BookInfo]:
         """通过 Tomato preview API 获取书信息"""
         try:
-            resp = requests.get(
+            resp = self.http.get(
                 f"{self.tomato_url}/api/preview/{book_id}",
                 timeout=self.timeout,
             )
@@ -203,7 +210,7 @@ class FanqieDownloader:
                 "User-Agent": self.user_agent,
                 "Accept": "text/html,application/xhtml+xml,*/*",
             }
-            resp = requests.get(url, headers=headers, timeout=self.timeout)
+            resp = self.http.get(url, headers=headers, timeout=self.timeout)
             resp.raise_for_status()
             resp.encoding = "utf-8"
         except Exception:
@@ -212,17 +219,10 @@ class FanqieDownloader:
         html = resp.text
         info = BookInfo(book_id=book_id)
 
-        # 解析 __NEXT_DATA__
-        m = re.search(
-            r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>',
-            html, re.DOTALL,
-        )
-        if m:
-            try:
-                data = json.loads(m.group(1))
-                info = self._extract_info_from_json(data, book_id)
-            except json.JSONDecodeError:
-                pass
+        # 解析内嵌数据（__INITIAL_STATE__ / __NEXT_DATA__）
+        data = embedded_state(html)
+        if data is not None:
+            info = self._extract_info_from_json(data, book_id)
 
         # 回退正则
         if not info.title:
@@ -271,7 +271,7 @@ class FanqieDownloader:
                 "User-Agent": self.user_agent,
                 "Accept": "application/json",
             }
-            resp = requests.get(
+            resp = self.http.get(
                 self.DIRECTORY_API,
                 params={"bookId": book_id},
                 headers=headers,
@@ -369,7 +369,7 @@ class FanqieDownloader:
             if mode == "update":
                 payload["mode"] = "update"
 
-            resp = requests.post(
+            resp = self.http.post(
                 f"{self.tomato_url}/api/jobs",
                 json=payload,
                 timeout=self.timeout,
@@ -407,7 +407,7 @@ class FanqieDownloader:
             DownloadProgress 列表
         """
         try:
-            resp = requests.get(
+            resp = self.http.get(
                 f"{self.tomato_url}/api/jobs",
                 timeout=self.timeout,
             )
@@ -447,7 +447,7 @@ class FanqieDownloader:
     def cancel_download(self, job_id: int) -> bool:
         """取消下载任务"""
         try:
-            resp = requests.post(
+            resp = self.http.post(
                 f"{self.tomato_url}/api/jobs/{job_id}/cancel",
                 timeout=self.timeout,
             )
@@ -458,7 +458,7 @@ class FanqieDownloader:
     def get_library(self) -> list:
         """获取已下载的书库列表"""
         try:
-            resp = requests.get(
+            resp = self.http.get(
                 f"{self.tomato_url}/api/library",
                 timeout=self.timeout,
             )
@@ -470,7 +470,7 @@ class FanqieDownloader:
     def search_books(self, keyword: str) -> list:
         """通过 Tomato 搜索小说"""
         try:
-            resp = requests.get(
+            resp = self.http.get(
                 f"{self.tomato_url}/api/search",
                 params={"q": keyword},
                 timeout=self.timeout,
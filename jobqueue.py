@@ -0,0 +1,289 @@
+"""抓取任务队列 - SQLite 持久化，多个 worker 进程/主机按榜单租约领取任务"""
+
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from scrapers import SCRAPER_REGISTRY
+from scrapers.base import scrape_scope
+from scrapers.breaker import FetchError
+from storage import done_lists, get_connection, save_batch, snapshot_str, today_str
+
+
+# 租约默认时长（秒），超时未完成的任务可被其他 worker 重新领取
+LEASE_SECONDS = 600
+# 单个任务最多尝试次数，超过后标记为 failed
+MAX_ATTEMPTS = 3
+# 往天的任务判失败时记录的原因
+_STALE_ERROR = "任务日期已过：站点只提供当前榜单，不能写入往天的数据"
+
+
+def init_queue():
+    """创建任务表"""
+    conn = get_connection()
+    conn.executescript("""
+        -- 一个任务 = 某数据源某天的一个榜单（list_key 含频道/榜单类型/分类）
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            source       TEXT NOT NULL,
+            date         TEXT NOT NULL,
+            list_key     TEXT NOT NULL,
+            status       TEXT NOT NULL DEFAULT 'pending',  -- pending / leased / done / failed
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            lease_owner  TEXT NOT NULL DEFAULT '',
+            lease_until  REAL NOT NULL DEFAULT 0,
+            count        INTEGER NOT NULL DEFAULT 0,
+            error        TEXT NOT NULL DEFAULT '',
+            created_at   TEXT NOT NULL,
+            updated_at   TEXT NOT NULL,
+            UNIQUE (source, date, list_key)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON scrape_jobs(status, lease_until);
+    """)
+    conn.commit()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_sync(
+    source_keys: list[str],
+    config: dict,
+    gender: Optional[str] = None,
+    period: Optional[str] = None,
+    day: Optional[str] = None,
+    resume: bool = True,
+    max_attempts: int = MAX_ATTEMPTS,
+    lists: Optional[dict[str, list[str]]] = None,
+    refresh_after: Optional[float] = None,
+) -> int:
+    """
+    把一次全量同步拆成榜单任务入队
+
+    resume=True 时跳过当天已入库（有断点）的榜单，refresh_after（秒）指定时
+    入库已超过这么久的榜单仍入队；lists 为 {source: 榜单键列表} 时只入队这些
+    榜单。已在队列中且未结束的任务不会重复入队，已结束（done / failed）的
+    任务重新置为 pending，worker 执行时写入新的快照。
+
+    任务抓取的是站点当前的榜单，只能写入今天，day 不是今天时抛出 ValueError。
+
+    Returns:
+        int: 新入队或重新入队的任务数
+    """
+    day = day or today_str()
+    if day != today_str():
+        raise ValueError(f"只能为今天入队，站点榜单无法按历史日期抓取: {day}")
+    now = datetime.now().isoformat()
+    since = None
+    if refresh_after:
+        since = (datetime.now() - timedelta(seconds=refresh_after)).isoformat()
+
+    rows = []
+    for source_key in source_keys:
+        scraper = SCRAPER_REGISTRY[source_key]["class"](config)
+        skip = done_lists(source_key, day, since) if resume else set()
+        keys = scraper.list_keys(gender, period)
+        if lists is not None:
+            wanted = set(lists.get(source_key, []))
+            keys = [k for k in keys if k in wanted]
+        rows.extend(
+            (source_key, day, key, max_attempts, now, now)
+            for key in keys if key not in skip
+        )
+
+    conn = get_connection()
+    with conn:
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT INTO scrape_jobs (source, date, list_key, max_attempts, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source, date, list_key) DO UPDATE SET
+                status='pending', attempts=0, max_attempts=excluded.max_attempts,
+                lease_owner='', lease_until=0, error='', updated_at=excluded.updated_at
+            WHERE status IN ('done', 'failed')
+        """, rows)
+        queued = conn.total_changes - before
+    return queued
+
+
+def lease_job(
+    worker_id: str,
+    sources: Optional[list[str]] = None,
+    lease_seconds: float = LEASE_SECONDS,
+) -> Optional[dict]:
+    """
+    领取一个今天的任务：pending 的任务，或租约已过期（worker 中途退出）的任务
+
+    在 BEGIN IMMEDIATE 事务内选取并加租约，多个 worker 不会领到同一任务。
+    往天未完成的任务（如跨过零点仍在排队的重试）直接判失败，不再执行。
+    没有可领取的任务返回 None。
+    """
+    now = time.time()
+    today = today_str()
+    where = "date=? AND (status='pending' OR (status='leased' AND lease_until < ?))"
+    params: list = [today, now]
+    if sources:
+        where += f" AND source IN ({','.join('?' * len(sources))})"
+        params.extend(sources)
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # 租约过期且次数已用完的任务直接判失败
+        conn.execute("""
+            UPDATE scrape_jobs SET status='failed', lease_owner='', updated_at=?
+            WHERE status='leased' AND lease_until < ? AND attempts >= max_attempts
+        """, (datetime.now().isoformat(), now))
+        conn.execute("""
+            UPDATE scrape_jobs SET status='failed', error=?, lease_owner='', lease_until=0, updated_at=?
+            WHERE date != ? AND (status='pending' OR (status='leased' AND lease_until < ?))
+        """, (_STALE_ERROR, datetime.now().isoformat(), today, now))
+        row = conn.execute(
+            f"SELECT * FROM scrape_jobs WHERE {where} AND attempts < max_attempts "
+            f"ORDER BY id LIMIT 1",
+            params,
+        ).fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        conn.execute("""
+            UPDATE scrape_jobs
+            SET status='leased', attempts=attempts+1, lease_owner=?, lease_until=?, updated_at=?
+            WHERE id=?
+        """, (worker_id, now + lease_seconds, datetime.now().isoformat(), row["id"]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    job = dict(row)
+    job.update(status="leased", attempts=row["attempts"] + 1, lease_owner=worker_id)
+    return job
+
+
+def complete_job(job_id: int, worker_id: str, count: int) -> bool:
+    """标记任务完成；租约已被其他 worker 接手时忽略，返回 False"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("""
+            UPDATE scrape_jobs SET status='done', count=?, error='', lease_until=0, updated_at=?
+            WHERE id=? AND status='leased' AND lease_owner=?
+        """, (count, datetime.now().isoformat(), job_id, worker_id))
+    return cur.rowcount > 0
+
+
+def fail_job(job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+    """任务失败：还有重试次数（且 retry=True）则放回队列，否则标记为 failed"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("""
+            UPDATE scrape_jobs
+            SET status=CASE WHEN ? AND attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+                error=?, lease_owner='', lease_until=0, updated_at=?
+            WHERE id=? AND status='leased' AND lease_owner=?
+        """, (retry, error[:500], datetime.now().isoformat(), job_id, worker_id))
+    return cur.rowcount > 0
+
+
+def queue_stats(day: Optional[str] = None) -> dict:
+    """各数据源各状态的任务数，如 {"fanqie": {"pending": 3, "done": 70}}"""
+    conn = get_connection()
+    sql = "SELECT source, status, COUNT(*) AS cnt FROM scrape_jobs"
+    params = ()
+    if day:
+        sql += " WHERE date=?"
+        params = (day,)
+    rows = conn.execute(sql + " GROUP BY source, status", params).fetchall()
+
+    stats: dict[str, dict] = {}
+    for row in rows:
+        stats.setdefault(row["source"], {})[row["status"]] = row["cnt"]
+    return stats
+
+
+def run_job(scraper, job: dict, worker_id: str) -> Optional[int]:
+    """
+    执行一个榜单任务并入库，返回入库条数（失败返回 None）
+
+    每次执行写入该榜单的一个新快照，任务被重复执行（至少一次语义）只会
+    多出一个内容相同的快照；当天汇总随入库在同一事务内重算。抓到的是站点
+    当前的榜单，任务日期已不是今天（领取后跨过了零点）时不执行，直接判失败。
+    """
+    source_key, list_key = job["source"], job["list_key"]
+    if job["date"] != today_str():
+        print(f"  ⚠ 任务日期已过，不再执行: {source_key} {list_key} ({job['date']})")
+        fail_job(job["id"], worker_id, _STALE_ERROR, retry=False)
+        return None
+    snapshot = snapshot_str()
+    try:
+        with scrape_scope(list_key, snapshot):
+            novels = scraper.fetch_list(list_key)
+        if novels:
+            save_batch(source_key, list_key, novels, job["date"], snapshot)
+        else:
+            print(f"  ⚠ 榜单无数据，跳过入库: {source_key} {list_key}")
+    except FetchError as e:
+        print(f"  ⚠ 榜单抓取失败: {source_key} {list_key} - {e}")
+        fail_job(job["id"], worker_id, str(e))
+        return None
+    except Exception as e:
+        print(f"  ⚠ 任务执行出错: {source_key} {list_key} - {e}")
+        fail_job(job["id"], worker_id, f"{type(e).__name__}: {e}")
+        return None
+
+    if not complete_job(job["id"], worker_id, len(novels)):
+        print(f"  ⚠ 租约已过期，任务由其他 worker 接手: {source_key} {list_key}")
+    return len(novels)
+
+
+def run_worker(
+    config: dict,
+    worker_id: Optional[str] = None,
+    sources: Optional[list[str]] = None,
+    once: bool = False,
+    poll_interval: float = 5.0,
+    lease_seconds: float = LEASE_SECONDS,
+) -> dict:
+    """
+    worker 主循环：领取任务 -> 抓取 -> 入库 -> 汇报
+
+    once=True 时队列为空即退出，否则每 poll_interval 秒轮询一次。
+    进程被杀掉时手上的任务在租约过期后由其他 worker 重做。
+
+    Returns:
+        dict: {"done": 完成任务数, "failed": 失败次数, "records": 入库条数}
+    """
+    worker_id = worker_id or default_worker_id()
+    scrapers = {}
+    summary = {"done": 0, "failed": 0, "records": 0}
+
+    while True:
+        job = lease_job(worker_id, sources, lease_seconds)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        source_key = job["source"]
+        if source_key not in scrapers:
+            scrapers[source_key] = SCRAPER_REGISTRY[source_key]["class"](config)
+        print(f"[worker {worker_id}] {source_key} {job['list_key']} ({job['date']}, "
+              f"第 {job['attempts']} 次)")
+
+        count = run_job(scrapers[source_key], job, worker_id)
+        if count is None:
+            summary["failed"] += 1
+        else:
+            summary["done"] += 1
+            summary["records"] += count
+
+    return summary
+
+
+init_queue()
@@ -14,6 +14,14 @@
     python main.py download 7143038691944959011 --info-only   # 只查看信息
     python main.py categories                       # 列出所有可用分类
     python main.py feishu-fields                    # 显示飞书表格所需字段
+    python main.py reparse --from 2026-02-01 --to 2026-02-28   # 用归档页面重新解析并回填
+    python main.py bench-parse --source fanqie      # 用归档页面测量解析耗时
+    python main.py build-fontmap                    # 从归档的番茄页面学习字体反爬映射
+    python main.py record-fixtures                  # 抓取并录制回放夹具
+    python main.py replay --latency 0.2             # 启动本地回放服务器
+    python main.py bench --latency 0.2 --error-rate 0.05   # 离线吞吐基准
+    python main.py enqueue                          # 把今天的全量同步拆成榜单任务入队
+    python main.py worker                           # 从任务队列领取并执行抓取任务
 """
 
 import argparse
@@ -30,6 +38,8 @@ from exporters.console import ConsoleExporter
 from exporters.feishu import FeishuExporter
 from sorter import apply_sort, filter_by_gender, filter_by_category, filter_by_period
 from downloader import FanqieDownloader
+from scrapers.http import client_stats
+from scrapers.replay import FIXTURES_DIR
 
 
 def _deep_merge(base: dict, override: dict) -> dict:
@@ -107,6 +117,9 @@ def cmd_scrape(args, config):
         return
 
     print(f"\n✅ 共抓取到 {len(novels)} 条数据")
+    st = client_stats()
+    print(f"   HTTP 请求 {st['requests']} 次，新建连接 {st['new_connections']}，"
+          f"复用连接 {st['reused_connections']}")
 
     # 排序
     if args.sort:
@@ -184,6 +197,191 @@ def cmd_download(args, config):
             print("\n❌ 下载失败")
 
 
+def cmd_reparse(args, config):
+    """用当前解析器重新解析归档页面，按原榜单和快照覆盖写入对应日期的数据"""
+    from scrapers import SCRAPER_REGISTRY
+    from scrapers.archive import reparse_range
+    from storage import refresh_summary, save_batch
+
+    end = args.to or args.start
+    for source in _resolve_sources(args.source):
+        name = SCRAPER_REGISTRY[source]["name"]
+        print(f"🔁 重新解析 [{name}] {args.start} ~ {end} ...")
+        results = reparse_range(source, args.start, end, workers=args.workers)
+        if not results:
+            print("   无归档页面")
+            continue
+        for day, batches in results.items():
+            total = sum(len(novels) for _, _, novels in batches)
+            if args.dry_run:
+                print(f"   {day}: {len(batches)} 个榜单快照 {total} 条 (dry-run，未写入)")
+                continue
+            saved = 0
+            for list_key, snapshot, novels in batches:
+                if novels:
+                    save_batch(source, list_key, novels, day, snapshot, summary=False)
+                    saved += 1
+                else:
+                    print(f"   {day} {list_key or '(未标记榜单)'} @ {snapshot[11:]}: 解析结果为空，保留原数据")
+            if saved:
+                refresh_summary(source, day)
+
+
+def cmd_bench_parse(args, config):
+    """用归档页面测量各数据源的解析耗时"""
+    from scrapers import SCRAPER_REGISTRY
+    from scrapers.archive import bench_parse
+
+    for source in _resolve_sources(args.source):
+        name = SCRAPER_REGISTRY[source]["name"]
+        result = bench_parse(source, args.date, repeat=args.repeat)
+        if result is None:
+            print(f"⏱  [{name}] 无归档页面")
+            continue
+        print(f"⏱  [{name}] {result['day']}: {result['pages']} 页 / {result['items']} 条, "
+              f"平均 {result['ms_per_page']:.2f} ms/页")
+        for parser_name, st in result["parsers"].items():
+            print(f"   {parser_name}: {st['pages']} 页, {st['ms_per_page']:.2f} ms/页")
+
+
+def cmd_build_fontmap(args, config):
+    """从归档的番茄排行榜页面学习字体映射（HTML 混淆文本对齐内嵌 JSON 真实文本）"""
+    from scrapers.archive import page_archive
+    from scrapers.fanqie import FanqieScraper
+    from scrapers.fontmap import fanqie_fonts, learn_mapping
+
+    scraper = FanqieScraper({"page_cache": False, "archive": False})
+    samples: dict[str, list] = {}
+    days = page_archive.list_days("fanqie", args.start or "0000-00-00", args.to or "9999-99-99")
+    for day in days:
+        for page in page_archive.list_pages("fanqie", day):
+            if page["parser"] != "_parse_rank_page":
+                continue
+            body = page_archive.get_object(page["body_hash"])
+            if body is None:
+                continue
+            version, pairs = scraper.font_samples(body.decode("utf-8", errors="replace"))
+            samples.setdefault(version, []).extend(pairs)
+
+    if not any(samples.values()):
+        print("🔤 没有可学习的番茄归档页面（需要同时带内嵌数据和混淆文本）")
+        return
+    for version, pairs in samples.items():
+        mapping = learn_mapping(pairs)
+        if not mapping:
+            continue
+        changed = fanqie_fonts.merge(version or "default", mapping)
+        print(f"🔤 字体 {version or 'default'}: {len(pairs)} 个样本, 学到 {len(mapping)} 个码位, "
+              f"新增/更新 {changed} 个")
+
+
+def _resolve_sources(source):
+    """--source 参数 -> 数据源列表（默认全部），不支持的来源直接退出"""
+    from scrapers import SCRAPER_REGISTRY
+
+    sources = [source] if source else list(SCRAPER_REGISTRY.keys())
+    for s in sources:
+        if s not in SCRAPER_REGISTRY:
+            print(f"❌ 不支持的来源: {s}")
+            sys.exit(1)
+    return sources
+
+
+def cmd_record_fixtures(args, config):
+    """抓取各数据源（开启归档），再把当天归档页面导出为回放夹具"""
+    from scrapers import SCRAPER_REGISTRY
+    from scrapers.replay import record_fixtures
+
+    scrape_config = {**config.get("scrape", {}), "archive": True}
+    for source in _resolve_sources(args.source):
+        name = SCRAPER_REGISTRY[source]["name"]
+        if not args.no_fetch:
+            print(f"🕷 抓取 [{name}] ...")
+            SCRAPER_REGISTRY[source]["class"](scrape_config).scrape_all()
+        count = record_fixtures(source, args.out, day=args.date)
+        print(f"📼 [{name}] 录制 {count} 个页面 -> {os.path.join(args.out, source)}")
+
+
+def cmd_replay(args, config):
+    """启动本地回放服务器，直到 Ctrl+C"""
+    from scrapers.replay import ReplayServer
+
+    server = ReplayServer(
+        args.fixtures, port=args.port, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate,
+    )
+    print(f"📼 回放服务器: {server.base_url}  (夹具: {args.fixtures})")
+    print("   在 config.local.yaml 中设置 scrape.base_urls 指向它，例如:")
+    for source, url in server.base_urls(_resolve_sources(None)).items():
+        print(f"     {source}: {url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def cmd_bench(args, config):
+    """在回放服务器上测量各爬虫的吞吐"""
+    from scrapers import SCRAPER_REGISTRY
+    from scrapers.replay import run_benchmark
+
+    sources = _resolve_sources(args.source)
+    results = run_benchmark(
+        sources, config.get("scrape", {}), args.fixtures,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+    )
+    print(f"⏱  回放基准 (延迟 {args.latency}s + 0~{args.jitter}s, 错误率 {args.error_rate:.0%})")
+    for source, r in results.items():
+        name = SCRAPER_REGISTRY[source]["name"]
+        parse_ms = f"{r['parse_ms_per_page']:.2f}" if r["parse_ms_per_page"] is not None else "-"
+        print(f"   [{name}] scrape_all {r['seconds']:.2f}s, {r['requests']} 次请求 "
+              f"({r['errors']} 失败), {r['pages_per_sec']:.1f} 页/秒, "
+              f"解析 {parse_ms} ms/页, {r['novels']} 条")
+
+
+def cmd_enqueue(args, config):
+    """把一次同步拆成榜单任务写入任务队列"""
+    from jobqueue import enqueue_sync, queue_stats
+    from storage import today_str
+
+    queue_cfg = config.get("queue", {})
+    day = args.date or today_str()
+    if day != today_str():
+        print(f"❌ 只能为今天入队: {day}（站点只提供当前榜单，历史日期请用 reparse 回填）")
+        sys.exit(1)
+    queued = enqueue_sync(
+        _resolve_sources(args.source), config.get("scrape", {}),
+        gender=args.gender, period=args.period, day=day, resume=not args.force,
+        max_attempts=queue_cfg.get("max_attempts", 3),
+    )
+    print(f"📥 入队 {queued} 个榜单任务 ({day})")
+    for source, st in queue_stats(day).items():
+        print(f"   {source}: " + ", ".join(f"{k} {v}" for k, v in sorted(st.items())))
+
+
+def cmd_worker(args, config):
+    """从任务队列领取榜单任务执行，直到 Ctrl+C（--once 时队列为空即退出）"""
+    from jobqueue import default_worker_id, run_worker
+
+    queue_cfg = config.get("queue", {})
+    worker_id = args.id or default_worker_id()
+    sources = _resolve_sources(args.source) if args.source else None
+    print(f"👷 worker {worker_id} 启动" + (f" (数据源: {', '.join(sources)})" if sources else ""))
+    try:
+        summary = run_worker(
+            config.get("scrape", {}), worker_id, sources=sources, once=args.once,
+            poll_interval=queue_cfg.get("poll_interval", 5),
+            lease_seconds=queue_cfg.get("lease_seconds", 600),
+        )
+    except KeyboardInterrupt:
+        print("\n👷 worker 已停止，未完成的任务将在租约过期后被重新领取")
+        return
+    print(f"👷 队列已空: 完成 {summary['done']} 个任务 / {summary['records']} 条, "
+          f"失败 {summary['failed']} 次")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="📚 小说排行榜爬虫 - 抓取、排序、推送",
@@ -261,6 +459,140 @@ def main():
         help="只显示章节列表，不下载"
     )
 
+    # reparse 命令
+    rp_parser = subparsers.add_parser("reparse", help="用归档页面重新解析并回填历史数据")
+    rp_parser.add_argument(
+        "--source", type=str, default=None,
+        help="数据来源 (默认: 全部)"
+    )
+    rp_parser.add_argument(
+        "--from", dest="start", type=str, required=True,
+        help="起始日期 YYYY-MM-DD"
+    )
+    rp_parser.add_argument(
+        "--to", type=str, default=None,
+        help="结束日期 YYYY-MM-DD (默认同起始日期)"
+    )
+    rp_parser.add_argument(
+        "--workers", type=int, default=None,
+        help="解析进程数 (默认: CPU 核数)"
+    )
+    rp_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="只解析不写入数据库"
+    )
+
+    # bench-parse 命令
+    bp_parser = subparsers.add_parser("bench-parse", help="用归档页面测量解析耗时")
+    bp_parser.add_argument(
+        "--source", type=str, default=None,
+        help="数据来源 (默认: 全部)"
+    )
+    bp_parser.add_argument(
+        "--date", type=str, default=None,
+        help="归档日期 YYYY-MM-DD (默认: 最近一天)"
+    )
+    bp_parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="每页重复解析次数 (默认: 5)"
+    )
+
+    # build-fontmap 命令
+    fm_parser = subparsers.add_parser("build-fontmap", help="从归档的番茄页面学习字体反爬映射")
+    fm_parser.add_argument(
+        "--from", dest="start", type=str, default=None,
+        help="起始日期 YYYY-MM-DD (默认: 全部归档)"
+    )
+    fm_parser.add_argument(
+        "--to", type=str, default=None,
+        help="结束日期 YYYY-MM-DD (默认: 全部归档)"
+    )
+
+    # record-fixtures / replay / bench 命令
+    rec_parser = subparsers.add_parser("record-fixtures", help="抓取并录制回放夹具")
+    rec_parser.add_argument(
+        "--source", type=str, default=None,
+        help="数据来源 (默认: 全部)"
+    )
+    rec_parser.add_argument(
+        "--out", type=str, default=FIXTURES_DIR,
+        help="夹具目录 (默认: data/fixtures)"
+    )
+    rec_parser.add_argument(
+        "--date", type=str, default=None,
+        help="导出的归档日期 YYYY-MM-DD (默认: 今天)"
+    )
+    rec_parser.add_argument(
+        "--no-fetch", action="store_true",
+        help="不抓取，只导出已有归档"
+    )
+
+    for name, help_text in (("replay", "启动本地回放服务器"), ("bench", "用回放服务器测量爬虫吞吐")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument(
+            "--fixtures", type=str, default=FIXTURES_DIR,
+            help="夹具目录 (默认: data/fixtures)"
+        )
+        sub.add_argument(
+            "--latency", type=float, default=0.0,
+            help="每个请求的固定延迟秒数"
+        )
+        sub.add_argument(
+            "--jitter", type=float, default=0.0,
+            help="额外的随机延迟上限秒数"
+        )
+        sub.add_argument(
+            "--error-rate", type=float, default=0.0,
+            help="随机返回 503 的概率 (0~1)"
+        )
+        if name == "replay":
+            sub.add_argument(
+                "--port", type=int, default=8765,
+                help="监听端口 (默认: 8765)"
+            )
+        else:
+            sub.add_argument(
+                "--source", type=str, default=None,
+                help="数据来源 (默认: 全部)"
+            )
+
+    # enqueue / worker 命令
+    eq_parser = subparsers.add_parser("enqueue", help="把同步拆成榜单任务写入任务队列")
+    eq_parser.add_argument(
+        "--source", type=str, default=None,
+        help="数据来源 (默认: 全部)"
+    )
+    eq_parser.add_argument(
+        "--gender", type=str, choices=["male", "female"], default=None,
+        help="频道筛选: male(男频) / female(女频)"
+    )
+    eq_parser.add_argument(
+        "--period", type=str, default=None,
+        help="榜单类型筛选"
+    )
+    eq_parser.add_argument(
+        "--date", type=str, default=None,
+        help="数据日期 YYYY-MM-DD (只能是今天，默认: 今天)"
+    )
+    eq_parser.add_argument(
+        "--force", action="store_true",
+        help="不跳过已入库的榜单"
+    )
+
+    wk_parser = subparsers.add_parser("worker", help="从任务队列领取并执行抓取任务")
+    wk_parser.add_argument(
+        "--source", type=str, default=None,
+        help="只领取该数据源的任务 (默认: 全部)"
+    )
+    wk_parser.add_argument(
+        "--id", type=str, default=None,
+        help="worker 标识 (默认: 主机名:进程号)"
+    )
+    wk_parser.add_argument(
+        "--once", action="store_true",
+        help="队列为空时退出，而不是继续轮询"
+    )
+
     args = parser.parse_args()
 
     if not args.command:
@@ -277,6 +609,22 @@ def main():
         cmd_feishu_fields(args, config)
     elif args.command == "download":
         cmd_download(args, config)
+    elif args.command == "reparse":
+        cmd_reparse(args, config)
+    elif args.command == "bench-parse":
+        cmd_bench_parse(args, config)
+    elif args.command == "build-fontmap":
+        cmd_build_fontmap(args, config)
+    elif args.command == "record-fixtures":
+        cmd_record_fixtures(args, config)
+    elif args.command == "replay":
+        cmd_replay(args, config)
+    elif args.command == "bench":
+        cmd_bench(args, config)
+    elif args.command == "enqueue":
+        cmd_enqueue(args, config)
+    elif args.command == "worker":
+        cmd_worker(args, config)
 
 
 if __name__ == "__main__":
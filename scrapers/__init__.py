@@ -1,4 +1,5 @@
 from .base import BaseScraper
+from .breaker import FetchError, CircuitOpenError
 from .fanqie import FanqieScraper
 from .shuqi import ShuqiScraper
 from .qimao import QimaoScraper
@@ -14,6 +15,8 @@ SCRAPER_REGISTRY = {
 
 __all__ = [
     "BaseScraper",
+    "FetchError",
+    "CircuitOpenError",
     "FanqieScraper",
     "ShuqiScraper",
     "QimaoScraper",
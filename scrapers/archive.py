@@ -0,0 +1,357 @@
+"""原始页面归档 - 内容寻址的压缩 HTML 存档 + 离线重新解析"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时退回 zlib
+    zstandard = None
+
+
+ARCHIVE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "archive"
+)
+
+
+class PageArchive:
+    """
+    页面归档
+
+    正文按 SHA-256 存为 objects/<前2位>/<hash>.zst（或 .zz），相同内容只存一份；
+    index.db 记录 (source, date, url, 快照) -> 正文哈希，以及当时使用的解析器和
+    参数、所属榜单键，以便解析器修改后离线回放历史页面并按原榜单和快照回填。
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, "index.db")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+                    conn = sqlite3.connect(self.index_path, timeout=10)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+                    if columns and "snapshot" not in columns:
+                        # 旧版索引没有榜单键和快照：保留记录，快照取抓取时间
+                        conn.execute("ALTER TABLE pages RENAME TO pages_v1")
+                        conn.execute("DROP INDEX IF EXISTS idx_pages_date")
+                    conn.executescript("""
+                        CREATE TABLE IF NOT EXISTS pages (
+                            source      TEXT NOT NULL,
+                            date        TEXT NOT NULL,
+                            url         TEXT NOT NULL,
+                            parser      TEXT NOT NULL,
+                            parser_args TEXT NOT NULL,
+                            body_hash   TEXT NOT NULL,
+                            fetched_at  TEXT NOT NULL,
+                            list_key    TEXT NOT NULL DEFAULT '',   -- 所属榜单，未知为空串
+                            snapshot    TEXT NOT NULL,              -- 入库时的快照时间
+                            PRIMARY KEY (source, date, url, parser, snapshot)
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_pages_date ON pages(date, source);
+                    """)
+                    if columns and "snapshot" not in columns:
+                        conn.execute("""
+                            INSERT INTO pages
+                                (source, date, url, parser, parser_args, body_hash, fetched_at, snapshot)
+                            SELECT source, date, url, parser, parser_args, body_hash, fetched_at,
+                                   substr(fetched_at, 1, 19)
+                            FROM pages_v1
+                        """)
+                        conn.execute("DROP TABLE pages_v1")
+                    conn.commit()
+                    conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _object_path(self, body_hash: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", body_hash[:2], f"{body_hash}{ext}")
+
+    def has_object(self, body_hash: str) -> bool:
+        return any(os.path.exists(self._object_path(body_hash, ext)) for ext in (".zst", ".zz"))
+
+    def put_object(self, body_hash: str, body: bytes):
+        """按内容哈希写入压缩正文（已存在则跳过）"""
+        if self.has_object(body_hash):
+            return
+        if zstandard is not None:
+            data, ext = zstandard.ZstdCompressor(level=10).compress(body), ".zst"
+        else:
+            data, ext = zlib.compress(body, 9), ".zz"
+        path = self._object_path(body_hash, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get_object(self, body_hash: str) -> Optional[bytes]:
+        """读取并解压正文"""
+        path = self._object_path(body_hash, ".zst")
+        if os.path.exists(path):
+            if zstandard is None:
+                raise RuntimeError(f"需要安装 zstandard 才能读取 {path}")
+            with open(path, "rb") as f:
+                return zstandard.ZstdDecompressor().decompress(f.read())
+        path = self._object_path(body_hash, ".zz")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return zlib.decompress(f.read())
+        return None
+
+    def record(
+        self,
+        source: str,
+        url: str,
+        parser: str,
+        parser_args: list,
+        body_hash: str,
+        body: Optional[bytes] = None,
+        day: Optional[str] = None,
+        list_key: str = "",
+        snapshot: Optional[str] = None,
+    ):
+        """
+        归档一次抓取
+
+        body 为 None（如 304 响应）时只记录索引，正文沿用已有对象。
+        list_key / snapshot 为页面所属的榜单和入库快照（见 scrape_scope），
+        未指定快照时取当前时间。
+        """
+        if body is not None:
+            self.put_object(body_hash, body)
+        elif not self.has_object(body_hash):
+            return
+
+        day = day or date.today().isoformat()
+        now = datetime.now()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO pages
+                    (source, date, url, parser, parser_args, body_hash, fetched_at, list_key, snapshot)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                source, day, url, parser,
+                json.dumps(parser_args, ensure_ascii=False),
+                body_hash, now.isoformat(), list_key,
+                snapshot or now.isoformat(timespec="seconds"),
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def list_pages(self, source: str, day: str) -> list[dict]:
+        """某数据源某天的归档页面，按抓取时间排序"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM pages WHERE source=? AND date=? ORDER BY fetched_at",
+                (source, day),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def list_days(self, source: str, start: str, end: str) -> list[str]:
+        """日期区间内（含两端）有归档的日期"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT date FROM pages WHERE source=? AND date BETWEEN ? AND ? ORDER BY date",
+                (source, start, end),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row["date"] for row in rows]
+
+
+# 进程内共享实例
+page_archive = PageArchive()
+
+
+# ============================================================
+# 离线重新解析
+# ============================================================
+def _reparse_day(source_key: str, day: str, root: str) -> list:
+    """
+    在子进程中重新解析某数据源某天的全部归档页面
+
+    页面按抓取时记录的 (快照, 榜单键) 分批；分页榜单（见
+    BaseScraper.PAGED_PARSERS）的各页按页码合并为全局排名，一个页面解析出
+    多个榜单（dict 结果，键为榜单键）时拆到各榜单。没有记录榜单键的页面
+    （旧版归档、不经 sync 的抓取）合成一个未标记榜单的批次，快照取其中最晚的一个。
+
+    Returns:
+        list[tuple]: [(list_key, snapshot, list[NovelRank])]，按首次抓取顺序
+    """
+    from scrapers import SCRAPER_REGISTRY
+    from scrapers.base import merge_pages
+
+    archive = PageArchive(root)
+    scraper = SCRAPER_REGISTRY[source_key]["class"]({"page_cache": False})
+
+    pages = archive.list_pages(source_key, day)
+    legacy_snapshot = max((p["snapshot"] for p in pages if not p["list_key"]), default="")
+
+    # 每个榜单的每个快照一个批次；批次内同一分页榜单的各页成组，非分页页面各自成组
+    batches: dict = {}
+    for page in pages:
+        body = archive.get_object(page["body_hash"])
+        if body is None:
+            print(f"  [warn] missing archived object {page['body_hash']} ({page['url']})")
+            continue
+        args = json.loads(page["parser_args"])
+        result = getattr(scraper, page["parser"])(body.decode("utf-8", errors="replace"), *args)
+        snapshot = page["snapshot"] if page["list_key"] else legacy_snapshot
+
+        if isinstance(result, dict):
+            for list_key, items in result.items():
+                groups = batches.setdefault((snapshot, list_key), {})
+                groups[("page", page["url"], page["parser"])] = [(1, items)]
+            continue
+
+        groups = batches.setdefault((snapshot, page["list_key"]), {})
+        n_fixed = scraper.PAGED_PARSERS.get(page["parser"])
+        if n_fixed is None:
+            groups[("page", page["url"], page["parser"])] = [(1, result)]
+            continue
+        page_no = args[n_fixed] if len(args) > n_fixed else 1
+        key = ("list", page["parser"], json.dumps(args[:n_fixed], ensure_ascii=False))
+        groups.setdefault(key, []).append((page_no, result))
+
+    results = []
+    for (snapshot, list_key), groups in batches.items():
+        novels = []
+        for key, group in groups.items():
+            if key[0] == "list":
+                group.sort(key=lambda p: p[0])
+                # 与抓取时一致：从第 1 页起连续的页才参与合并
+                ordered = []
+                for page_no, items in group:
+                    if page_no != len(ordered) + 1:
+                        break
+                    ordered.append(items)
+                novels.extend(merge_pages(ordered))
+            else:
+                novels.extend(group[0][1])
+        results.append((list_key, snapshot, novels))
+    return results
+
+
+def reparse_range(
+    source_key: str,
+    start: str,
+    end: str,
+    workers: Optional[int] = None,
+    archive: Optional[PageArchive] = None,
+) -> dict:
+    """
+    用当前解析器重新解析日期区间内的归档页面（进程池并行，每天一个任务）
+
+    Returns:
+        dict: {day: [(list_key, snapshot, list[NovelRank])]}，见 _reparse_day
+    """
+    archive = archive or page_archive
+    days = archive.list_days(source_key, start, end)
+    if not days:
+        return {}
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {day: pool.submit(_reparse_day, source_key, day, archive.root) for day in days}
+        for day, fut in futures.items():
+            results[day] = fut.result()
+    return results
+
+
+# ============================================================
+# 解析性能基准
+# ============================================================
+def bench_parse(
+    source_key: str,
+    day: Optional[str] = None,
+    repeat: int = 5,
+    archive: Optional[PageArchive] = None,
+) -> Optional[dict]:
+    """
+    用归档页面测量当前解析器的耗时（不发网络请求）
+
+    Args:
+        source_key: 数据源标识
+        day: 归档日期，默认最近一天
+        repeat: 每个页面重复解析次数，取平均
+
+    Returns:
+        dict: {day, pages, items, ms_per_page, parsers: {parser: {pages, ms_per_page}}}，
+        没有归档页面返回 None
+    """
+    from scrapers import SCRAPER_REGISTRY
+
+    archive = archive or page_archive
+    if day is None:
+        days = archive.list_days(source_key, "0000-00-00", "9999-99-99")
+        if not days:
+            return None
+        day = days[-1]
+
+    scraper = SCRAPER_REGISTRY[source_key]["class"]({"page_cache": False, "archive": False})
+    repeat = max(1, repeat)
+
+    pages = 0
+    items = 0
+    total = 0.0
+    parsers = {}
+    for page in archive.list_pages(source_key, day):
+        body = archive.get_object(page["body_hash"])
+        if body is None:
+            continue
+        html = body.decode("utf-8", errors="replace")
+        parse = getattr(scraper, page["parser"])
+        args = json.loads(page["parser_args"])
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = parse(html, *args)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        if isinstance(result, dict):
+            items += sum(len(v) for v in result.values())
+        else:
+            items += len(result)
+        pages += 1
+        total += elapsed
+        stat = parsers.setdefault(page["parser"], {"pages": 0, "seconds": 0.0})
+        stat["pages"] += 1
+        stat["seconds"] += elapsed
+
+    if not pages:
+        return None
+    return {
+        "day": day,
+        "pages": pages,
+        "items": items,
+        "ms_per_page": round(total / pages * 1000, 3),
+        "parsers": {
+            name: {"pages": st["pages"], "ms_per_page": round(st["seconds"] / st["pages"] * 1000, 3)}
+            for name, st in parsers.items()
+        },
+    }
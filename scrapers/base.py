@@ -1,8 +1,52 @@
 """爬虫基类 - 定义所有爬虫的统一接口"""
 
+import hashlib
+import json
+import sqlite3
 from abc import ABC, abstractmethod
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+
 from models.novel import NovelRank
+from scrapers.archive import page_archive
+from scrapers.breaker import FetchError, get_breaker
+from scrapers.cache import page_cache
+from scrapers.http import ACCEPT_ENCODING, get_client
+from scrapers.parsepool import run_parser
+from scrapers.ratelimit import get_limiter
+
+
+# 当前抓取所属的 (榜单键, 快照时间)，随页面写入归档，离线重新解析时按此分组入库
+_scrape_scope: ContextVar[tuple[str, str]] = ContextVar("scrape_scope", default=("", ""))
+
+
+@contextmanager
+def scrape_scope(list_key: Optional[str] = None, snapshot: Optional[str] = None):
+    """
+    在 with 块内把抓到的页面归到榜单 list_key 的快照 snapshot 下（None 表示沿用外层）
+
+    通过 in_scope 提交到线程池的任务沿用提交时的范围。
+    """
+    outer_key, outer_snapshot = _scrape_scope.get()
+    token = _scrape_scope.set((
+        outer_key if list_key is None else list_key,
+        outer_snapshot if snapshot is None else snapshot,
+    ))
+    try:
+        yield
+    finally:
+        _scrape_scope.reset(token)
+
+
+def in_scope(func: Callable) -> Callable:
+    """包装 func，使其在线程池中执行时沿用当前的 scrape_scope"""
+    ctx = copy_context()
+    return lambda *args: ctx.copy().run(func, *args)
 
 
 class BaseScraper(ABC):
@@ -10,10 +54,45 @@ class BaseScraper(ABC):
 
     # 站点名称，子类必须定义
     SOURCE_NAME: str = ""
+    # 数据源标识（与 SCRAPER_REGISTRY 的键一致），用于读取分源配置
+    SOURCE_KEY: str = ""
+    # 站点根地址，限速器按其主机名注册
+    BASE_URL: str = ""
+    # 解析逻辑版本，修改解析器后递增以使页面缓存失效
+    PARSE_VERSION: int = 1
+    # 每个榜单最多抓取的页数（可用 scrape.max_pages.<SOURCE_KEY> 覆盖）
+    MAX_PAGES: int = 1
+    # 分页解析方法: 方法名 -> 页码之前的参数个数（页码是最后一个参数），
+    # 离线重新解析时据此把同一榜单的各页合并
+    PAGED_PARSERS: dict = {}
 
     def __init__(self, config: dict = None):
         self.config = config or {}
         self.delay = self.config.get("delay", 1)
+        # 同一站点同时在途的请求数上限（1 表示串行抓取）
+        self.concurrency = max(1, int(self.config.get("concurrency", 4)))
+        # 共享连接池客户端（timeout / retries / backoff / pool_size 可配置）
+        self.http = get_client(self.config)
+        # 单个榜单最多抓取的页数
+        max_pages = (self.config.get("max_pages") or {}).get(self.SOURCE_KEY, self.MAX_PAGES)
+        self.max_pages = max(1, int(max_pages))
+        # 解析进程数（scrape.parse_workers），0 表示在抓取线程内解析
+        self.parse_workers = max(0, int(self.config.get("parse_workers", 0)))
+        # 页面缓存（条件请求 + 正文哈希），scrape.page_cache=false 可关闭
+        self.page_cache = page_cache if self.config.get("page_cache", True) else None
+        # 原始页面归档（用于离线重新解析），scrape.archive=false 可关闭
+        self.archive = page_archive if self.config.get("archive", True) else None
+        # 按数据源共享的熔断器（scrape.circuit_breaker 可配置）
+        self.breaker = get_breaker(self.SOURCE_KEY, self.config.get("circuit_breaker")) if self.SOURCE_KEY else None
+        # scrape.base_urls.<SOURCE_KEY> 把站点地址换成别的地址（如本地回放服务器）
+        base_url = (self.config.get("base_urls") or {}).get(self.SOURCE_KEY)
+        if base_url:
+            self._rebase(base_url.rstrip("/"))
+        # 按主机共享的自适应限速器
+        self.limiter = None
+        if self.BASE_URL:
+            host = urlsplit(self.BASE_URL).hostname
+            self.limiter = get_limiter(host, self._rate_limit_settings())
         self.user_agent = self.config.get(
             "user_agent",
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -47,10 +126,46 @@ class BaseScraper(ABC):
 
         Returns:
             list[NovelRank]: 排行榜数据列表
+
+        Raises:
+            FetchError: 请求失败或熔断中
         """
         pass
 
     @abstractmethod
+    def list_keys(
+        self,
+        gender: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> list[str]:
+        """
+        列出一次全量（或指定频道/榜单类型）抓取包含的榜单
+
+        Args:
+            gender: 可选，筛选频道
+            period: 可选，筛选榜单类型
+
+        Returns:
+            list[str]: 榜单键，如番茄的 "male:read:1141"，可传给 fetch_list
+        """
+        pass
+
+    @abstractmethod
+    def fetch_list(self, key: str) -> list[NovelRank]:
+        """
+        抓取单个榜单
+
+        Args:
+            key: list_keys 返回的榜单键
+
+        Returns:
+            list[NovelRank]: 该榜单的数据
+
+        Raises:
+            FetchError: 请求失败或熔断中
+        """
+        pass
+
     def scrape_all(
         self,
         gender: Optional[str] = None,
@@ -64,9 +179,63 @@ class BaseScraper(ABC):
             period: 可选，筛选榜单类型
 
         Returns:
-            list[NovelRank]: 合并的排行榜数据列表
+            list[NovelRank]: 合并的排行榜数据列表（抓取失败的榜单被跳过）
         """
-        pass
+        return self._gather([(self.fetch_list, (key,)) for key in self.list_keys(gender, period)])
+
+    def iter_batches(
+        self,
+        gender: Optional[str] = None,
+        period: Optional[str] = None,
+        skip: Optional[set[str]] = None
+    ) -> Iterator[tuple[str, list[NovelRank]]]:
+        """
+        逐个榜单产出抓取结果，便于边抓边入库
+
+        榜单按 concurrency 并发抓取，按完成先后产出；抓取失败的榜单
+        产出 None，以便与"榜单本身为空"区分。
+
+        Args:
+            gender: 可选，筛选频道
+            period: 可选，筛选榜单类型
+            skip: 已完成的榜单键（断点续抓时跳过）
+
+        Yields:
+            (list_key, list[NovelRank] 或 None)
+        """
+        skip = skip or set()
+        keys = [k for k in self.list_keys(gender, period) if k not in skip]
+        if not keys:
+            return
+
+        def fetch(key: str) -> Optional[list[NovelRank]]:
+            try:
+                with scrape_scope(list_key=key):
+                    return self.fetch_list(key)
+            except FetchError as e:
+                print(f"  ⚠ 榜单抓取失败: {self.SOURCE_KEY} {key} - {e}")
+                return None
+
+        workers = min(self.concurrency, len(keys))
+        if workers == 1:
+            for key in keys:
+                yield key, fetch(key)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(in_scope(fetch), key): key for key in keys}
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+
+    def _rebase(self, base_url: str):
+        """把 BASE_URL 及以它开头的其他 *_URL 属性换到 base_url 下（路径不变）"""
+        origin = self.BASE_URL
+        for attr in dir(type(self)):
+            if not attr.endswith("_URL"):
+                continue
+            value = getattr(self, attr)
+            if isinstance(value, str) and value.startswith(origin):
+                setattr(self, attr, base_url + value[len(origin):])
 
     def _get_headers(self) -> dict:
         """获取默认请求头"""
@@ -74,6 +243,223 @@ class BaseScraper(ABC):
             "User-Agent": self.user_agent,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Connection": "keep-alive",
         }
+
+    def _rate_limit_settings(self) -> dict:
+        """
+        合并限速配置：scrape.rate_limit.default < scrape.rate_limit.<SOURCE_KEY>
+
+        未配置 rate 时按旧的 delay 换算初始速率（delay=1 即 1 请求/秒）。
+        """
+        rate_cfg = self.config.get("rate_limit") or {}
+        settings = {}
+        if self.delay and self.delay > 0:
+            settings["rate"] = 1 / self.delay
+        settings.update(rate_cfg.get("default") or {})
+        settings.update(rate_cfg.get(self.SOURCE_KEY) or {})
+        return settings
+
+    def _gather(self, jobs: list[tuple[Callable, tuple]]) -> list[NovelRank]:
+        """
+        并发执行多个抓取任务，按提交顺序合并结果
+
+        最多 self.concurrency 个任务同时进行；请求速率由按主机共享的
+        限速器控制（见 scrapers.ratelimit），不再固定休眠。
+
+        Args:
+            jobs: [(func, args), ...]，func(*args) 返回 list[NovelRank]
+
+        Returns:
+            list[NovelRank]: 与串行抓取顺序一致的合并结果（失败的任务计为空）
+        """
+        if not jobs:
+            return []
+
+        def run(func: Callable, args: tuple) -> list[NovelRank]:
+            try:
+                return func(*args)
+            except FetchError as e:
+                print(f"  ⚠ 抓取失败，跳过: {e}")
+                return []
+
+        workers = min(self.concurrency, len(jobs))
+        if workers == 1:
+            results = [run(func, args) for func, args in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(in_scope(run), func, args) for func, args in jobs]
+                results = [f.result() for f in futures]
+
+        all_novels = []
+        for novels in results:
+            all_novels.extend(novels)
+        return all_novels
+
+    def _fetch_pages(self, fetch_page: Callable[[int], list[NovelRank]]) -> list[NovelRank]:
+        """
+        抓取一个分页榜单的前 max_pages 页并合并为全局排名
+
+        先抓第 1 页，有数据时再抓第 2 页；第 2 页为空或全是第 1 页的书（站点
+        忽略页码）时到此为止，否则其余页按 concurrency 并发抓取（速率仍由
+        限速器控制），再按页码顺序合并。任意一页失败则整个榜单失败，不产出
+        缺页的榜单，已入库的快照保持不变。
+
+        Args:
+            fetch_page: fetch_page(page) 返回该页的 list[NovelRank]（页内排名）
+
+        Raises:
+            FetchError: 任意一页抓取失败
+        """
+        first = fetch_page(1)
+        if not first or self.max_pages == 1:
+            return first
+
+        second = fetch_page(2)
+        seen = {n.book_url or n.title for n in first}
+        if self.max_pages == 2 or not second or all((n.book_url or n.title) in seen for n in second):
+            return merge_pages([first, second])
+
+        rest = range(3, self.max_pages + 1)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(rest))) as pool:
+            results = list(pool.map(in_scope(fetch_page), rest))
+        return merge_pages([first, second, *results])
+
+    def _fetch_and_parse(
+        self,
+        url: str,
+        parse: Callable,
+        *args,
+        params: Optional[dict] = None,
+    ):
+        """
+        请求页面并解析，命中页面缓存时跳过解析
+
+        带上次的 ETag / Last-Modified 发送条件请求；收到 304，或正文
+        SHA-256 与上次一致时，直接返回缓存的解析结果。
+        每次成功抓取的正文都写入页面归档。
+        解析按 scrape.parse_workers 交给解析进程池（见 scrapers.parsepool），
+        本线程等待结果期间不占用 GIL。
+
+        Args:
+            url: 页面地址
+            parse: 解析方法，调用方式为 parse(html, *args)，
+                   返回 list[NovelRank] 或 dict[str, list[NovelRank]]
+            params: 查询参数
+
+        Raises:
+            requests.RequestException: 请求失败或状态码异常
+            CircuitOpenError: 该数据源熔断中，请求未发出
+        """
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        signature = json.dumps(
+            [type(self).__name__, parse.__name__, self.PARSE_VERSION, list(args)],
+            ensure_ascii=False,
+        )
+
+        cached = self.page_cache.get(full_url, signature) if self.page_cache else None
+        headers = self._get_headers()
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        if self.breaker:
+            self.breaker.before_request()
+        try:
+            resp = self.http.get(full_url, headers=headers)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            if self.breaker:
+                if _is_site_failure(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            raise
+        if self.breaker:
+            self.breaker.record_success()
+
+        etag = resp.headers.get("ETag", "")
+        last_modified = resp.headers.get("Last-Modified", "")
+
+        if cached and resp.status_code == 304:
+            self.page_cache.touch(full_url, signature, etag, last_modified)
+            self._archive_page(full_url, parse, args, cached["body_hash"])
+            return _decode_result(cached["result"])
+
+        body_hash = hashlib.sha256(resp.content).hexdigest()
+        self._archive_page(full_url, parse, args, body_hash, resp.content)
+        if cached and cached["body_hash"] == body_hash:
+            self.page_cache.touch(full_url, signature, etag, last_modified)
+            return _decode_result(cached["result"])
+
+        # 正文统一按 UTF-8 解码；parse_workers > 0 时在解析进程池中执行
+        result = run_parser(self, parse, resp.content, args)
+        if self.page_cache:
+            self.page_cache.put(
+                full_url, signature, etag, last_modified, body_hash, _encode_result(result)
+            )
+        return result
+
+    def _archive_page(self, url: str, parse: Callable, args: tuple,
+                      body_hash: str, body: Optional[bytes] = None):
+        """把页面正文和解析参数写入归档，归档失败不影响抓取"""
+        if not self.archive:
+            return
+        list_key, snapshot = _scrape_scope.get()
+        try:
+            self.archive.record(
+                self.SOURCE_KEY, url, parse.__name__, list(args), body_hash, body,
+                list_key=list_key, snapshot=snapshot or None,
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"  ⚠ 页面归档失败: {url} - {e}")
+
+
+def merge_pages(pages: list[list[NovelRank]]) -> list[NovelRank]:
+    """
+    按页码顺序合并分页结果，页内排名换算为全局排名
+
+    遇到空页，或整页都是前面已出现过的书（站点忽略页码返回了重复内容）时停止。
+    """
+    merged = []
+    seen = set()
+    offset = 0
+    for items in pages:
+        if not items:
+            break
+        keys = [n.book_url or n.title for n in items]
+        if seen and all(k in seen for k in keys):
+            break
+        page_last = max(n.rank for n in items)
+        for n, key in zip(items, keys):
+            if key in seen:
+                continue
+            n.rank += offset
+            merged.append(n)
+        seen.update(keys)
+        offset += page_last
+    return merged
+
+
+def _is_site_failure(e: requests.RequestException) -> bool:
+    """站点不可用（网络错误、超时、429/5xx）才计入熔断；其他 4xx 说明站点在线"""
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return True
+
+
+def _encode_result(result):
+    """解析结果 -> 可 JSON 序列化的结构"""
+    if isinstance(result, dict):
+        return {k: [n.to_dict() for n in v] for k, v in result.items()}
+    return [n.to_dict() for n in result]
+
+
+def _decode_result(data):
+    """缓存中的 JSON 结构 -> 解析结果（每次返回新的 NovelRank 对象）"""
+    if isinstance(data, dict):
+        return {k: [NovelRank(**d) for d in v] for k, v in data.items()}
+    return [NovelRank(**d) for d in data]
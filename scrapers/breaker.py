@@ -0,0 +1,104 @@
+"""按数据源的熔断器 - 站点宕机时快速失败"""
+
+import threading
+import time
+
+
+class FetchError(Exception):
+    """榜单抓取失败（与"榜单本身为空"区分）"""
+
+
+class CircuitOpenError(FetchError):
+    """熔断器打开，请求未发出即失败"""
+
+
+# 默认熔断参数（可在 config.yaml 的 scrape.circuit_breaker 中覆盖）
+DEFAULT_BREAKER = {
+    "failure_threshold": 5,  # 连续失败多少次后熔断
+    "reset_timeout": 60,     # 熔断多少秒后放行一个探测请求
+}
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行，连续失败达到 failure_threshold 次后转为 open；
+    open: 直接抛出 CircuitOpenError，reset_timeout 秒后转为 half_open；
+    half_open: 只放行一个探测请求，成功则恢复 closed，失败则重新 open。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0  # 累计熔断次数
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """请求前检查，熔断中则抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name} 熔断中，跳过请求")
+                self.state = "half_open"
+                self._probing = False
+
+            if self.state == "half_open":
+                if self._probing:
+                    raise CircuitOpenError(f"{self.name} 熔断探测中，跳过请求")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    print(f"  ⚠ {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opened": self.opened,
+            }
+
+
+# 进程内按数据源共享的熔断器
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(source_key: str, settings: dict = None) -> CircuitBreaker:
+    """获取（或按 settings 创建）某数据源的熔断器，所有爬虫实例共享"""
+    with _breakers_lock:
+        breaker = _breakers.get(source_key)
+        if breaker is None:
+            params = dict(DEFAULT_BREAKER)
+            params.update({k: v for k, v in (settings or {}).items() if k in DEFAULT_BREAKER})
+            breaker = CircuitBreaker(source_key, **params)
+            _breakers[source_key] = breaker
+        return breaker
+
+
+def breaker_stats() -> dict:
+    """所有数据源熔断器的当前状态"""
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {key: breaker.snapshot() for key, breaker in items}
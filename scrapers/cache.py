@@ -0,0 +1,119 @@
+"""页面缓存 - 条件请求校验信息 + 正文哈希 + 解析结果"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+# 与 storage 的数据库放在同一目录
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "page_cache.db"
+)
+
+
+class PageCache:
+    """
+    按 (URL, 解析器签名) 缓存页面
+
+    每条记录保存 ETag / Last-Modified（用于 If-None-Match / If-Modified-Since）、
+    响应正文的 SHA-256，以及该正文的解析结果（JSON）。
+    parser 字段记录解析器签名（方法名 + 参数 + 版本），同一 URL 的不同解析器各存一条。
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=10)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    # 旧版表只以 url 为主键，同一 URL 的不同解析器互相覆盖；缓存可以重建，直接丢弃
+                    pk = [row[1] for row in conn.execute("PRAGMA table_info(page_cache)") if row[5]]
+                    if pk == ["url"]:
+                        conn.execute("DROP TABLE page_cache")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS page_cache (
+                            url           TEXT NOT NULL,
+                            parser        TEXT NOT NULL,
+                            etag          TEXT DEFAULT '',
+                            last_modified TEXT DEFAULT '',
+                            body_hash     TEXT NOT NULL,
+                            result_json   TEXT NOT NULL,
+                            updated_at    TEXT NOT NULL,
+                            PRIMARY KEY (url, parser)
+                        )
+                    """)
+                    conn.commit()
+                    conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, url: str, parser: str) -> Optional[dict]:
+        """
+        查询缓存
+
+        Returns:
+            dict: {etag, last_modified, body_hash, result}，未命中返回 None
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT * FROM page_cache WHERE url=? AND parser=?", (url, parser)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {
+            "etag": row["etag"] or "",
+            "last_modified": row["last_modified"] or "",
+            "body_hash": row["body_hash"],
+            "result": json.loads(row["result_json"]),
+        }
+
+    def put(self, url: str, parser: str, etag: str, last_modified: str,
+            body_hash: str, result) -> None:
+        """写入 / 覆盖缓存"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO page_cache
+                    (url, parser, etag, last_modified, body_hash, result_json, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                url, parser, etag or "", last_modified or "", body_hash,
+                json.dumps(result, ensure_ascii=False),
+                datetime.now().isoformat(),
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def touch(self, url: str, parser: str, etag: str = "", last_modified: str = "") -> None:
+        """内容未变化时仅刷新校验信息和时间"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE page_cache
+                SET etag = COALESCE(NULLIF(?, ''), etag),
+                    last_modified = COALESCE(NULLIF(?, ''), last_modified),
+                    updated_at = ?
+                WHERE url = ? AND parser = ?
+            """, (etag or "", last_modified or "", datetime.now().isoformat(), url, parser))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# 进程内共享实例
+page_cache = PageCache()
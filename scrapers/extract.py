@@ -0,0 +1,240 @@
+"""声明式页面抽取 - 选择器规格在定义时编译为 XPath / 正则抽取器"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import lxml.html
+from lxml import etree
+
+
+def has_class(name: str) -> str:
+    """XPath 谓词：class 属性中含有 name 这个类名（等价于 CSS 的 .name）"""
+    # 先用廉价的子串判断过滤掉绝大多数节点，再做精确的类名匹配
+    return (f'contains(@class, "{name}") and '
+            f'contains(concat(" ", normalize-space(@class), " "), " {name} ")')
+
+
+def parse_html(html: str):
+    """HTML 文本 -> lxml 根节点，空页面返回 None"""
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 带 XML 编码声明的字符串不能直接解析，转为字节
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def node_text(el) -> str:
+    """等价于 BeautifulSoup 的 get_text(strip=True)：各文本片段去空白后拼接"""
+    return "".join(t.strip() for t in el.itertext())
+
+
+_INITIAL_STATE_RE = re.compile(r"window\.__INITIAL_STATE__\s*=\s*")
+_NEXT_DATA_RE = re.compile(
+    r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+# JS 对象字面量里的 undefined（JSON 不支持）
+_UNDEFINED_RE = re.compile(r"(?<=[:\[,])\s*undefined\b")
+
+
+def embedded_state(html: str) -> Optional[dict]:
+    """
+    提取页面内嵌的初始数据（不建 DOM）
+
+    依次尝试 window.__INITIAL_STATE__ = {...} 和 <script id="__NEXT_DATA__">，
+    都没有或无法解析时返回 None。
+    """
+    m = _INITIAL_STATE_RE.search(html)
+    if m:
+        end = html.find("</script>", m.end())
+        segment = html[m.end():end if end != -1 else len(html)]
+        decoder = json.JSONDecoder()
+        for text in (segment, _UNDEFINED_RE.sub("null", segment)):
+            try:
+                data, _ = decoder.raw_decode(text)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+
+    m = _NEXT_DATA_RE.search(html)
+    if m:
+        try:
+            data = json.loads(m.group(1))
+        except json.JSONDecodeError:
+            return None
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+@dataclass(frozen=True)
+class Match:
+    """
+    条目内后代元素的简单匹配条件，供 Spec 单次遍历使用（不求值 XPath）
+
+    tag: 标签名；cls: class 中含有该类名；href: href 属性中含有该子串。
+    未指定的条件不限制，如 Match("a", href="/page/") 等价于
+    .//a[contains(@href, "/page/")]。
+    """
+    tag: Optional[str] = None
+    cls: Optional[str] = None
+    href: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    单个字段的抽取规则
+
+    path: 相对条目节点的 XPath，或 Match（条目内文档顺序第一个满足条件的后代）
+    attr: 取该属性的值；为 None 时取节点文本（get_text(strip=True) 语义）
+    many: True 返回全部匹配（列表），否则返回文档顺序的第一个匹配（无匹配为 None）
+    pattern: 对取到的值做正则匹配：无分组返回整体，一个分组返回该分组，
+             多个分组返回元组；不匹配为 None
+    """
+    path: Union[str, Match]
+    attr: Optional[str] = None
+    many: bool = False
+    pattern: Optional[str] = None
+
+
+class Spec:
+    """
+    条目列表的抽取规格
+
+    items 为定位条目的 XPath，其余关键字参数为字段名 -> Field；
+    字段也可以是嵌套的 Spec（相对条目再抽取一组子条目）。
+    构造时即编译全部 XPath 和正则，之后对每个页面复用。
+    路径为 Match 的字段在每个条目内合并为一次文档顺序遍历，全部找到即停止，
+    比逐个字段求值 .// XPath（各自遍历整棵子树）快。
+
+    示例:
+        BOOKS = Spec(
+            f'//li[{has_class("book")}]',
+            title=Field('.//a[@class="title"]'),
+            url=Field('.//a[@class="title"]', attr="href"),
+        )
+        rows = BOOKS.parse(html)  # [{"title": ..., "url": ...}, ...]
+    """
+
+    def __init__(self, items: str, **fields: Union[Field, "Spec"]):
+        self.items = items
+        self.fields = fields
+        self._items = etree.XPath(items)
+        # 相同路径只编译、求值一次（如同一链接的文本和 href）；"." 直接取条目本身
+        self._paths = {}
+        self._matches: list[Match] = []
+        self._compiled = []
+        for name, f in fields.items():
+            if isinstance(f, Spec):
+                self._compiled.append((name, f, None, None, False, None))
+                continue
+            path = f.path
+            if isinstance(path, Match):
+                if f.many:
+                    raise ValueError(f"Match 路径只取第一个匹配，不支持 many: {name}")
+                if path not in self._matches:
+                    self._matches.append(path)
+                # 单次遍历的结果按序号存放，避免以 Match 为键反复求哈希
+                path = self._matches.index(path)
+            elif path != "." and path not in self._paths:
+                self._paths[path] = etree.XPath(path)
+            regex = re.compile(f.pattern) if f.pattern else None
+            self._compiled.append((name, f, path, f.attr, f.many, regex))
+        # 单次遍历的条件按标签分组：元素只与同标签的条件和不限标签的条件比较
+        self._untagged = [(i, m.cls, m.href) for i, m in enumerate(self._matches) if m.tag is None]
+        self._conds_for = {}
+        for i, m in enumerate(self._matches):
+            if m.tag is not None:
+                self._conds_for.setdefault(m.tag, []).append((i, m.cls, m.href))
+        for conds in self._conds_for.values():
+            conds.extend(self._untagged)
+
+    def parse(self, html: str) -> list[dict]:
+        """解析 HTML 并抽取条目，空页面返回 []"""
+        root = parse_html(html)
+        if root is None:
+            return []
+        return self.extract(root)
+
+    def extract(self, node) -> list[dict]:
+        """从已解析的节点抽取条目（文档顺序）"""
+        return [self._extract_item(item) for item in self._items(node)]
+
+    def _walk(self, item) -> list:
+        """
+        一次文档顺序遍历条目的后代，取每个 Match 的第一个匹配，全部找到即停止
+
+        Returns:
+            list: 与 self._matches 对应的匹配元素，没有匹配为 None
+        """
+        found = [None] * len(self._matches)
+        left = len(found)
+        conds_for, untagged = self._conds_for, self._untagged
+        for el in item.iterdescendants(etree.Element):
+            conds = conds_for.get(el.tag, untagged)
+            if not conds:
+                continue
+            # 属性只在需要时取一次
+            href = classes = None
+            for i, m_cls, m_href in conds:
+                if found[i] is not None:
+                    continue
+                if m_href is not None:
+                    if href is None:
+                        href = el.get("href") or ""
+                    if m_href not in href:
+                        continue
+                if m_cls is not None:
+                    if classes is None:
+                        classes = (el.get("class") or "").split()
+                    if m_cls not in classes:
+                        continue
+                found[i] = el
+                left -= 1
+            if not left:
+                break
+        return found
+
+    def _extract_item(self, item) -> dict:
+        matches = {path: xpath(item) for path, xpath in self._paths.items()}
+        matches["."] = [item]
+        if self._matches:
+            for i, el in enumerate(self._walk(item)):
+                matches[i] = [el] if el is not None else []
+        row = {}
+        value = self._value
+        for name, f, path, attr, many, regex in self._compiled:
+            if path is None:
+                row[name] = f.extract(item)
+            elif many:
+                row[name] = [value(m, attr, regex) for m in matches[path]]
+            else:
+                found = matches[path]
+                row[name] = value(found[0], attr, regex) if found else None
+        return row
+
+    @staticmethod
+    def _value(match, attr: Optional[str], regex):
+        if isinstance(match, str):
+            value = str(match)
+        elif attr:
+            value = match.get(attr)
+        else:
+            value = node_text(match)
+
+        if regex is None or value is None:
+            return value
+        m = regex.search(value)
+        if not m:
+            return None
+        groups = m.groups()
+        if not groups:
+            return m.group(0)
+        return groups[0] if len(groups) == 1 else groups
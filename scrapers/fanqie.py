@@ -1,12 +1,14 @@
 """番茄小说网排行榜爬虫"""
 
-import time
+from collections import deque
 from typing import Optional
 
 import requests
-from bs4 import BeautifulSoup
 
 from scrapers.base import BaseScraper
+from scrapers.breaker import FetchError
+from scrapers.extract import Field, Match, Spec, embedded_state, has_class, parse_html
+from scrapers.fontmap import fanqie_fonts, translate
 from models.novel import NovelRank
 
 
@@ -14,7 +16,10 @@ class FanqieScraper(BaseScraper):
     """番茄小说网爬虫"""
 
     SOURCE_NAME = "番茄小说"
+    SOURCE_KEY = "fanqie"
     BASE_URL = "https://fanqienovel.com"
+    # 2: 优先解析页面内嵌 JSON；3: 按字体映射解码私有区字符
+    PARSE_VERSION = 3
 
     # 性别映射: 参数名 -> URL 参数
     GENDER_MAP = {
@@ -85,12 +90,38 @@ class FanqieScraper(BaseScraper):
         "1017": "民国言情",
     }
 
+    # 排名容器条目（div.rank-book-item），各字段取条目内第一个匹配（一次遍历）
+    RANK_SPEC = Spec(
+        f'//div[{has_class("rank-book-item")}]',
+        title=Field(Match("a", href="/page/")),
+        book_href=Field(Match("a", href="/page/"), attr="href"),
+        author=Field(Match("a", href="/author-page/")),
+        author_href=Field(Match("a", href="/author-page/"), attr="href"),
+        chapter=Field(Match("a", href="/reader/")),
+        heat=Field(Match(cls="book-item-count")),   # "在读：3.2万"
+        intro=Field(Match(cls="desc")),
+    )
+
+    # 回退：页面中的书籍 / 作者 / 章节链接（文档顺序）
+    LINKS_SPEC = Spec(
+        '//a[contains(@href, "/page/") or contains(@href, "/author-page/")'
+        ' or contains(@href, "/reader/")]',
+        text=Field("."),
+        href=Field(".", attr="href"),
+    )
+
+    def __init__(self, config: dict = None):
+        super().__init__(config)
+        # 字体映射文件变化后，页面缓存中的旧解析结果随之失效
+        self.PARSE_VERSION = f"{type(self).PARSE_VERSION}.{fanqie_fonts.digest()}"
+
     def _get_headers(self) -> dict:
-        """获取请求头（番茄小说专用，不能包含 Accept-Encoding）"""
+        """获取请求头（番茄小说专用，不能协商 br 压缩）"""
         return {
             "User-Agent": self.user_agent,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+            "Accept-Encoding": "gzip, deflate",
             "Connection": "keep-alive",
         }
 
@@ -138,18 +169,14 @@ class FanqieScraper(BaseScraper):
               f"{self.PERIOD_NAMES[period_code]} - {category_name} ...")
 
         try:
-            resp = requests.get(url, headers=self._get_headers(), timeout=15)
-            resp.raise_for_status()
-            resp.encoding = "utf-8"
+            return self._fetch_and_parse(
+                url, self._parse_rank_page, category_name,
+                self.GENDER_NAMES[gender_code],
+                self.PERIOD_NAMES[period_code]
+            )
         except requests.RequestException as e:
             print(f"  ⚠ 请求失败: {url} - {e}")
-            return []
-
-        return self._parse_rank_page(
-            resp.text, category_name,
-            self.GENDER_NAMES[gender_code],
-            self.PERIOD_NAMES[period_code]
-        )
+            raise FetchError(f"请求失败: {url} - {e}") from e
 
     def _parse_rank_page(
         self,
@@ -169,77 +196,142 @@ class FanqieScraper(BaseScraper):
                 │     ├── a[href="/author-page/xxx"]  (作者)
                 │     └── a[href="/reader/xxx"]  (最新章节)
                 └── ...
+
+        页面内嵌了初始数据（__INITIAL_STATE__ / __NEXT_DATA__）时直接取其中的
+        榜单，不建 DOM，书名和在读人数也不受字体反爬影响；否则按 RANK_SPEC /
+        LINKS_SPEC 解析 HTML。
         """
-        soup = BeautifulSoup(html, "lxml")
-        novels = []
+        # 本页字体版本对应的私有区字符转换表
+        table = fanqie_fonts.table(fanqie_fonts.font_version(html))
+
+        novels = self._parse_embedded(html, category, gender_name, period_name, table)
+        if novels:
+            return novels
+
+        root = parse_html(html)
+        if root is None:
+            return []
 
         # 方法1: 尝试用 rank-book-item 容器
-        rank_items = soup.select("div.rank-book-item")
-        if rank_items:
-            return self._parse_by_containers(rank_items, category, gender_name, period_name)
+        rows = self.RANK_SPEC.extract(root)
+        if rows:
+            return self._parse_by_containers(rows, category, gender_name, period_name, table)
 
         # 方法2: 回退 - 从页面所有链接中提取
-        return self._parse_by_links(soup, category, gender_name, period_name)
+        return self._parse_by_links(
+            self.LINKS_SPEC.extract(root), category, gender_name, period_name, table
+        )
+
+    # 内嵌 JSON 中书籍条目的字段名（按优先级）
+    _JSON_KEYS = {
+        "id": ("bookId", "book_id"),
+        "title": ("bookName", "book_name"),
+        "author": ("author", "authorName", "author_name"),
+        "author_id": ("authorId", "author_id"),
+        "chapter": ("lastChapterTitle", "last_chapter_title", "latestChapterTitle"),
+        "read_count": ("readCount", "read_count", "readNum"),
+        "intro": ("abstract", "bookAbstract", "description"),
+    }
+
+    def _parse_embedded(
+        self,
+        html: str,
+        category: str,
+        gender_name: str,
+        period_name: str,
+        table: dict = None
+    ) -> list[NovelRank]:
+        """从页面内嵌 JSON 解析榜单，没有内嵌数据或找不到榜单时返回 []"""
+        state = embedded_state(html)
+        if state is None:
+            return []
+        books = _find_book_list(state, self._JSON_KEYS["id"], self._JSON_KEYS["title"])
+        if not books:
+            return []
+
+        def pick(book: dict, field: str):
+            for key in self._JSON_KEYS[field]:
+                value = book.get(key)
+                if value not in (None, ""):
+                    return value
+            return None
+
+        novels = []
+        for idx, book in enumerate(books, 1):
+            title = pick(book, "title")
+            book_id = pick(book, "id")
+            if not title or not book_id:
+                continue
+
+            author_id = pick(book, "author_id")
+            extra = {}
+            read_count = pick(book, "read_count")
+            if read_count is not None:
+                try:
+                    read_count = int(float(read_count))
+                except (TypeError, ValueError):
+                    read_count = None
+            if read_count is not None:
+                extra["heat"] = _format_read_count(read_count)
+                extra["read_count"] = read_count
+            intro = pick(book, "intro")
+            if intro:
+                extra["intro"] = str(intro).strip()[:200]
+
+            novels.append(NovelRank(
+                rank=idx,
+                title=self._clean_text(str(title), table),
+                author=self._clean_text(str(pick(book, "author") or ""), table),
+                category=category,
+                gender=gender_name,
+                period=period_name,
+                latest_chapter=self._clean_text(str(pick(book, "chapter") or ""), table),
+                book_url=f"{self.BASE_URL}/page/{book_id}",
+                author_url=f"{self.BASE_URL}/author-page/{author_id}" if author_id else "",
+                source=self.SOURCE_NAME,
+                extra=extra,
+            ))
+        return novels
 
     def _parse_by_containers(
         self,
-        rank_items,
+        rows: list[dict],
         category: str,
         gender_name: str,
-        period_name: str
+        period_name: str,
+        table: dict = None
     ) -> list[NovelRank]:
         """通过排名容器解析"""
         novels = []
-        for idx, item in enumerate(rank_items, 1):
+        for idx, row in enumerate(rows, 1):
             try:
-                # 书名
-                title_link = item.select_one('a[href*="/page/"]')
-                title = title_link.get_text(strip=True) if title_link else ""
-                book_url = ""
-                if title_link and title_link.get("href"):
-                    href = title_link["href"]
-                    book_url = href if href.startswith("http") else f"{self.BASE_URL}{href}"
-
-                # 作者
-                author_link = item.select_one('a[href*="/author-page/"]')
-                author = author_link.get_text(strip=True) if author_link else ""
-                author_url = ""
-                if author_link and author_link.get("href"):
-                    href = author_link["href"]
-                    author_url = href if href.startswith("http") else f"{self.BASE_URL}{href}"
+                title = row["title"] or ""
+                book_url = self._abs_url(row["book_href"]) if row["book_href"] else ""
+                author = row["author"] or ""
+                author_url = self._abs_url(row["author_href"]) if row["author_href"] else ""
 
                 # 最新章节
-                chapter_link = item.select_one('a[href*="/reader/"]')
-                latest_chapter = ""
-                if chapter_link:
-                    latest_chapter = chapter_link.get_text(strip=True)
-                    if latest_chapter.startswith("最近更新："):
-                        latest_chapter = latest_chapter[5:]
+                latest_chapter = row["chapter"] or ""
+                if latest_chapter.startswith("最近更新："):
+                    latest_chapter = latest_chapter[5:]
 
-                # 在读人数 (热度)
                 extra = {}
-                count_span = item.select_one('.book-item-count')
-                if count_span:
-                    count_text = count_span.get_text(strip=True)
-                    # 格式: "在读：3.2万"
-                    extra["heat"] = count_text
-
+                # 在读人数 (热度)
+                if row["heat"] is not None:
+                    extra["heat"] = row["heat"]
                 # 简介
-                desc_div = item.select_one('.desc.abstract, .desc')
-                if desc_div:
-                    intro = desc_div.get_text(strip=True)
-                    if intro:
-                        extra["intro"] = intro[:200]
+                if row["intro"]:
+                    extra["intro"] = row["intro"][:200]
 
                 if title:
                     novels.append(NovelRank(
                         rank=idx,
-                        title=self._clean_text(title),
-                        author=self._clean_text(author),
+                        title=self._clean_text(title, table),
+                        author=self._clean_text(author, table),
                         category=category,
                         gender=gender_name,
                         period=period_name,
-                        latest_chapter=self._clean_text(latest_chapter),
+                        latest_chapter=self._clean_text(latest_chapter, table),
                         book_url=book_url,
                         author_url=author_url,
                         source=self.SOURCE_NAME,
@@ -252,41 +344,34 @@ class FanqieScraper(BaseScraper):
 
     def _parse_by_links(
         self,
-        soup: BeautifulSoup,
+        links: list[dict],
         category: str,
         gender_name: str,
-        period_name: str
+        period_name: str,
+        table: dict = None
     ) -> list[NovelRank]:
         """
         回退解析：从页面链接提取排行数据
         """
         novels = []
 
-        # 收集书籍链接（去重保序）
         seen_hrefs = set()
-        books = []  # (title, href)
-        for link in soup.select('a[href*="/page/"]'):
-            href = link.get("href", "")
-            text = link.get_text(strip=True)
-            if text and href and href not in seen_hrefs:
+        books = []  # (title, href)，去重保序
+        seen_authors = set()
+        authors = []  # (name, href)，去重保序
+        chapters = []
+
+        for link in links:
+            text, href = link["text"], link["href"]
+            if not text:
+                continue
+            if "/page/" in href and href not in seen_hrefs:
                 seen_hrefs.add(href)
                 books.append((text, href))
-
-        # 收集作者链接（去重保序）
-        seen_authors = set()
-        authors = []  # (name, href)
-        for link in soup.select('a[href*="/author-page/"]'):
-            text = link.get_text(strip=True)
-            href = link.get("href", "")
-            if text and href not in seen_authors:
+            if "/author-page/" in href and href not in seen_authors:
                 seen_authors.add(href)
                 authors.append((text, href))
-
-        # 收集章节链接
-        chapters = []
-        for link in soup.select('a[href*="/reader/"]'):
-            text = link.get_text(strip=True)
-            if text:
+            if "/reader/" in href:
                 if text.startswith("最近更新："):
                     text = text[5:]
                 chapters.append(text)
@@ -296,56 +381,95 @@ class FanqieScraper(BaseScraper):
             author_href = authors[idx][1] if idx < len(authors) else ""
             latest = chapters[idx] if idx < len(chapters) else ""
 
-            book_url = href if href.startswith("http") else f"{self.BASE_URL}{href}"
-            author_url = author_href if author_href.startswith("http") else f"{self.BASE_URL}{author_href}" if author_href else ""
-
             novels.append(NovelRank(
                 rank=idx + 1,
-                title=self._clean_text(title),
-                author=self._clean_text(author_name),
+                title=self._clean_text(title, table),
+                author=self._clean_text(author_name, table),
                 category=category,
                 gender=gender_name,
                 period=period_name,
-                latest_chapter=self._clean_text(latest),
-                book_url=book_url,
-                author_url=author_url,
+                latest_chapter=self._clean_text(latest, table),
+                book_url=self._abs_url(href),
+                author_url=self._abs_url(author_href) if author_href else "",
                 source=self.SOURCE_NAME,
             ))
 
         return novels
 
+    def font_samples(self, html: str) -> tuple[str, list[tuple[str, str]]]:
+        """
+        从排行榜页面取字体学习样本：同一本书 HTML 中的混淆文本与内嵌 JSON 中的真实文本
+
+        Returns:
+            (字体版本, [(混淆文本, 真实文本)])，页面缺少任一部分时样本为空
+        """
+        version = fanqie_fonts.font_version(html)
+        state = embedded_state(html)
+        books = _find_book_list(state, self._JSON_KEYS["id"], self._JSON_KEYS["title"]) if state else None
+        root = parse_html(html) if books else None
+        if root is None:
+            return version, []
+
+        plain = {}
+        for book in books:
+            fields = {}
+            for field in ("title", "author", "chapter"):
+                fields[field] = next(
+                    (str(book[k]) for k in self._JSON_KEYS[field] if book.get(k) not in (None, "")), ""
+                )
+            book_id = next((str(book[k]) for k in self._JSON_KEYS["id"] if book.get(k)), "")
+            plain[book_id] = fields
+
+        pairs = []
+        for row in self.RANK_SPEC.extract(root):
+            book_id = (row["book_href"] or "").rstrip("/").rsplit("/", 1)[-1]
+            if book_id not in plain:
+                continue
+            chapter = row["chapter"] or ""
+            if chapter.startswith("最近更新："):
+                chapter = chapter[5:]
+            for field, text in (("title", row["title"]), ("author", row["author"]), ("chapter", chapter)):
+                if text and plain[book_id][field]:
+                    pairs.append((text, plain[book_id][field]))
+        return version, pairs
+
+    def _abs_url(self, href: str) -> str:
+        return href if href.startswith("http") else f"{self.BASE_URL}{href}"
+
     @staticmethod
-    def _clean_text(text: str) -> str:
-        """清理文本中的字体反爬私有 Unicode 字符"""
-        # 移除 Unicode 私有使用区字符 (PUA)
-        # E000-F8FF: BMP 私有使用区
-        return "".join(c for c in text if not (0xE000 <= ord(c) <= 0xF8FF))
+    def _clean_text(text: str, table: dict = None) -> str:
+        """
+        解码字体反爬的私有区 (PUA, E000-F8FF) 字符
 
-    def scrape_all(
+        按字体映射替换为真实字符，映射中没有的字符删除（见 scrapers.fontmap）。
+        """
+        return translate(text, table if table is not None else fanqie_fonts.table())
+
+    def list_keys(
         self,
         gender: Optional[str] = None,
         period: Optional[str] = None
-    ) -> list[NovelRank]:
-        """抓取所有排行榜数据"""
-        all_novels = []
-
+    ) -> list[str]:
+        """榜单键: "{gender}:{period}:{category_id}" """
         # 确定要抓取的频道
         genders = [gender] if gender else ["male", "female"]
         # 确定要抓取的榜单类型
         periods = [period] if period else ["read", "new"]
 
+        keys = []
         for g in genders:
             categories = self.MALE_CATEGORIES if g == "male" else self.FEMALE_CATEGORIES
 
             for p in periods:
                 for cat_id in categories:
-                    novels = self.scrape_rank(cat_id, g, p)
-                    all_novels.extend(novels)
-                    # 请求间隔
-                    if self.delay > 0:
-                        time.sleep(self.delay)
+                    keys.append(f"{g}:{p}:{cat_id}")
+
+        return keys
 
-        return all_novels
+    def fetch_list(self, key: str) -> list[NovelRank]:
+        """抓取单个分类榜单"""
+        g, p, cat_id = key.split(":", 2)
+        return self.scrape_rank(cat_id, g, p)
 
     def scrape_categories(
         self,
@@ -354,19 +478,53 @@ class FanqieScraper(BaseScraper):
         period: Optional[str] = None
     ) -> list[NovelRank]:
         """按分类名称抓取指定分类"""
-        all_novels = []
         genders = [gender] if gender else ["male", "female"]
         periods = [period] if period else ["read", "new"]
 
+        jobs = []
         for g in genders:
             categories = self.MALE_CATEGORIES if g == "male" else self.FEMALE_CATEGORIES
 
             for p in periods:
                 for cat_id, cat_name in categories.items():
                     if cat_name in category_names:
-                        novels = self.scrape_rank(cat_id, g, p)
-                        all_novels.extend(novels)
-                        if self.delay > 0:
-                            time.sleep(self.delay)
+                        jobs.append((self.scrape_rank, (cat_id, g, p)))
+
+        return self._gather(jobs)
+
+
+def _find_book_list(state, id_keys: tuple, title_keys: tuple) -> Optional[list]:
+    """
+    在内嵌数据中查找书籍列表（元素为同时带书籍 ID 和书名的 dict）
+
+    优先在键名含 rank 的分支中查找，其次全局查找，均按广度优先取第一个。
+    """
+    def is_book_list(value) -> bool:
+        return (
+            isinstance(value, list) and value
+            and all(isinstance(v, dict) for v in value)
+            and any(k in value[0] for k in id_keys)
+            and any(k in value[0] for k in title_keys)
+        )
 
-        return all_novels
+    def search(roots: list) -> Optional[list]:
+        queue = deque(roots)
+        while queue:
+            node = queue.popleft()
+            if is_book_list(node):
+                return node
+            if isinstance(node, dict):
+                queue.extend(node.values())
+            elif isinstance(node, list):
+                queue.extend(node)
+        return None
+
+    rank_roots = [v for k, v in state.items() if "rank" in k.lower()] if isinstance(state, dict) else []
+    return search(rank_roots) or search([state])
+
+
+def _format_read_count(count: int) -> str:
+    """在读人数 -> 与页面一致的文本，如 32000 -> "在读：3.2万" """
+    if count >= 10000:
+        return f"在读：{count / 10000:.1f}万"
+    return f"在读：{count}"
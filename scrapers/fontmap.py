@@ -0,0 +1,150 @@
+"""字体反爬解码 - 按字体版本缓存的私有区字符 -> 真实字符转换表"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+
+FONT_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "fanqie.json")
+
+# BMP 私有使用区 (PUA): E000-F8FF
+PUA_RANGE = range(0xE000, 0xF900)
+
+# 页面 @font-face 中引用的字体文件
+_FONT_URL_RE = re.compile(r"url\(\s*[\"']?([^\"')]+?\.(?:woff2?|ttf|otf))", re.IGNORECASE)
+
+
+class FontDecoder:
+    """
+    字体反爬解码器
+
+    映射文件为 JSON: {字体版本: {私有区码位(十六进制，如 "E3E8"): 真实字符}}，
+    字体版本取页面引用的字体文件名（不含扩展名），"default" 用于未知版本。
+    每个版本的 str.translate 转换表只构建一次；映射中没有的私有区字符被删除。
+    映射由 learn_mapping 从归档页面学习，merge 写回文件（见 main.py build-fontmap）。
+    """
+
+    def __init__(self, path: str = FONT_MAP_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mappings = None
+        self._digest = ""
+        self._tables: dict[str, dict] = {}
+
+    def _load(self):
+        with self._lock:
+            if self._mappings is not None:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    raw = f.read()
+            except OSError:
+                raw = b"{}"
+            try:
+                mappings = json.loads(raw)
+            except json.JSONDecodeError as e:
+                print(f"  ⚠ 字体映射文件无法解析，按未映射处理: {self.path} - {e}")
+                mappings = {}
+            self._digest = hashlib.sha256(raw).hexdigest()[:8]
+            self._mappings = mappings if isinstance(mappings, dict) else {}
+
+    def digest(self) -> str:
+        """映射文件内容摘要，映射变化时用来使解析缓存失效"""
+        self._load()
+        return self._digest
+
+    @staticmethod
+    def font_version(html: str) -> str:
+        """页面引用的第一个字体文件名（不含扩展名），没有则为空字符串"""
+        m = _FONT_URL_RE.search(html)
+        if not m:
+            return ""
+        name = m.group(1).rsplit("/", 1)[-1]
+        return name.rsplit(".", 1)[0]
+
+    def table(self, version: str = "") -> dict:
+        """某字体版本的转换表（可直接传给 str.translate）"""
+        table = self._tables.get(version)
+        if table is not None:
+            return table
+
+        self._load()
+        mapping = self._mappings.get(version) or self._mappings.get("default") or {}
+        chars = dict.fromkeys(PUA_RANGE)
+        for key, char in mapping.items():
+            try:
+                code = int(key, 16) if len(key) > 1 else ord(key)
+            except ValueError:
+                continue
+            chars[code] = char
+        table = str.maketrans(chars)
+        with self._lock:
+            self._tables[version] = table
+        return table
+
+    def decode(self, text: str, version: str = "") -> str:
+        return translate(text, self.table(version))
+
+    def merge(self, version: str, mapping: dict[str, str]) -> int:
+        """
+        把学到的映射并入某字体版本（同时更新 "default"）并写回映射文件
+
+        Returns:
+            int: 新增或改变的码位数（按该字体版本计）
+        """
+        self._load()
+        with self._lock:
+            mappings = json.loads(json.dumps(self._mappings))
+        changed = 0
+        for name in (version, "default"):
+            if not name:
+                continue
+            current = mappings.setdefault(name, {})
+            diff = {k: v for k, v in mapping.items() if current.get(k) != v}
+            if name == version:
+                changed = len(diff)
+            current.update(diff)
+            mappings[name] = dict(sorted(current.items()))
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(mappings, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, self.path)
+        with self._lock:
+            self._mappings = None
+            self._tables = {}
+        return changed
+
+
+def translate(text: str, table: dict) -> str:
+    """用 FontDecoder.table 构建的转换表解码私有区字符（映射中没有的删除）"""
+    return text.translate(table)
+
+
+def learn_mapping(pairs: list[tuple[str, str]]) -> dict[str, str]:
+    """
+    从 (混淆文本, 真实文本) 对中学习私有区码位 -> 真实字符
+
+    两段文本逐字符对齐（长度不同的对无法对齐，跳过）；同一码位对到多个字符时
+    取出现次数最多的一个。
+
+    Returns:
+        dict: {码位(十六进制，如 "E3E8"): 真实字符}，可传给 FontDecoder.merge
+    """
+    votes: dict[int, Counter] = {}
+    for obfuscated, plain in pairs:
+        if len(obfuscated) != len(plain) or obfuscated == plain:
+            continue
+        for o, p in zip(obfuscated, plain):
+            if ord(o) in PUA_RANGE and ord(p) not in PUA_RANGE:
+                votes.setdefault(ord(o), Counter())[p] += 1
+    return {f"{code:04X}": counter.most_common(1)[0][0] for code, counter in sorted(votes.items())}
+
+
+# 进程内共享实例（番茄小说）
+fanqie_fonts = FontDecoder()
@@ -0,0 +1,205 @@
+"""共享 HTTP 客户端 - 连接池 / 长连接 / 超时与重试"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from scrapers.ratelimit import find_limiter
+
+
+# 可协商的压缩格式：安装了 brotli 时 requests 会自动包含 br
+ACCEPT_ENCODING = DEFAULT_ACCEPT_ENCODING
+
+# 需要重试的响应状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class _ObservedRetry(Retry):
+    """
+    重试策略：每次重试前先向对应主机的限速器取令牌
+
+    中途遇到的 429/5xx 和网络错误只记在返回的 Retry 对象上（throttled /
+    retry_after），整个请求结束后由 HttpClient 统一通知限速器一次，
+    一次请求的多次重试不会让速率连续减半。
+    """
+
+    host = ""
+    throttled = False
+    retry_after = None
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(
+            method=method, url=url, response=response, error=error,
+            _pool=_pool, _stacktrace=_stacktrace,
+        )
+        retry.host = _pool.host if _pool is not None else self.host
+        retry.throttled = True
+        header = response.headers.get("Retry-After") if response is not None else None
+        retry.retry_after = header or self.retry_after
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        limiter = find_limiter(self.host)
+        if limiter is not None:
+            limiter.acquire()
+
+
+class HttpClient:
+    """
+    带连接池的 HTTP 客户端
+
+    基于 requests.Session，同一主机的 TCP/TLS 连接在请求间复用。
+    每个主机的连接数上限为 pool_size（超出时阻塞等待空闲连接）。
+    已注册限速器的主机（见 scrapers.ratelimit）在发请求前和每次重试前先取令牌，
+    请求结束后把响应状态和耗时反馈给限速器（中途重试过的请求按一次限流处理）。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15,
+        retries: int = 2,
+        backoff: float = 0.5,
+        pool_size: int = 8,
+        max_hosts: int = 16,
+    ):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        retry = _ObservedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=retry,
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        limiter = find_limiter(urlsplit(url).hostname or "")
+        if limiter is None:
+            return self.session.request(method, url, **kwargs)
+
+        limiter.acquire()
+        start = time.monotonic()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            limiter.on_throttle()
+            raise
+        retry = getattr(resp.raw, "retries", None)
+        if getattr(retry, "throttled", False) and resp.status_code < 500 and resp.status_code != 429:
+            # 重试后才成功
+            limiter.on_throttle(retry.retry_after)
+        else:
+            limiter.on_response(
+                resp.status_code,
+                time.monotonic() - start,
+                resp.headers.get("Retry-After"),
+            )
+        return resp
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        连接复用统计
+
+        Returns:
+            dict: {requests, new_connections, reused_connections, hosts: {host: {...}}}
+        """
+        pools = self._adapter.poolmanager.pools
+        hosts = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}"
+            reqs = pool.num_requests
+            conns = pool.num_connections
+            hosts[host] = {
+                "requests": reqs,
+                "new_connections": conns,
+                "reused_connections": max(reqs - conns, 0),
+            }
+
+        total_reqs = sum(h["requests"] for h in hosts.values())
+        total_conns = sum(h["new_connections"] for h in hosts.values())
+        return {
+            "requests": total_reqs,
+            "new_connections": total_conns,
+            "reused_connections": max(total_reqs - total_conns, 0),
+            "hosts": hosts,
+        }
+
+
+# 进程内共享的客户端，按配置区分
+_clients: dict[tuple, HttpClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config: dict = None) -> HttpClient:
+    """
+    获取共享 HTTP 客户端
+
+    相同的 timeout / retries / backoff / pool_size 配置复用同一个客户端，
+    不同爬虫实例之间因此共享连接池。
+    """
+    config = config or {}
+    key = (
+        config.get("timeout", 15),
+        config.get("retries", 2),
+        config.get("backoff", 0.5),
+        config.get("pool_size", 8),
+    )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = HttpClient(
+                timeout=key[0],
+                retries=key[1],
+                backoff=key[2],
+                pool_size=key[3],
+            )
+            _clients[key] = client
+        return client
+
+
+def client_stats() -> dict:
+    """汇总所有共享客户端的连接复用统计"""
+    summary = {"requests": 0, "new_connections": 0, "reused_connections": 0, "hosts": {}}
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        st = client.stats()
+        summary["requests"] += st["requests"]
+        summary["new_connections"] += st["new_connections"]
+        summary["reused_connections"] += st["reused_connections"]
+        for host, h in st["hosts"].items():
+            agg = summary["hosts"].setdefault(
+                host, {"requests": 0, "new_connections": 0, "reused_connections": 0}
+            )
+            for k in agg:
+                agg[k] += h[k]
+    return summary
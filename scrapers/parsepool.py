@@ -0,0 +1,115 @@
+"""解析进程池 - 把 CPU 密集的 HTML 解析移出抓取线程和 Web 进程的 GIL"""
+
+import atexit
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+
+# 子进程内按 (爬虫类, 配置) 缓存的爬虫实例（只用来调用解析方法）
+_worker_scrapers: dict = {}
+
+
+def _worker_scraper(scraper_cls: type, config: dict):
+    key = (scraper_cls, json.dumps(config, sort_keys=True, ensure_ascii=False, default=str))
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = scraper_cls({**config, "page_cache": False, "archive": False, "parse_workers": 0})
+        _worker_scrapers[key] = scraper
+    return scraper
+
+
+def _parse_in_worker(scraper_cls: type, config: dict, parser_name: str, body: bytes, args: tuple):
+    """在子进程中解析页面正文，返回 list[NovelRank] 或 dict[str, list[NovelRank]]"""
+    parse = getattr(_worker_scraper(scraper_cls, config), parser_name)
+    return parse(body.decode("utf-8", errors="replace"), *args)
+
+
+def _mp_context():
+    # forkserver 从干净的服务进程派生子进程，不继承 Flask / 抓取线程持有的锁
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# 进程内共享的解析进程池（首次使用时按 workers 创建）
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_stats = {"pooled": 0, "inline": 0, "fallbacks": 0}
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor):
+    """子进程异常退出后丢弃损坏的进程池，下次使用时重建"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            _pool_workers = 0
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _count(key: str):
+    with _pool_lock:
+        _stats[key] += 1
+
+
+def run_parser(scraper, parse: Callable, body: bytes, args: tuple):
+    """
+    执行解析方法
+
+    scraper.parse_workers > 0 时把正文交给解析进程池，调用线程只等待结果
+    （不占用 GIL），其他抓取线程的网络 I/O 和 Web 请求可以同时进行；
+    为 0 时在当前线程解析。进程池不可用时退回当前线程解析。
+    子进程用相同的爬虫类和配置创建实例，按方法名调用解析方法。
+
+    Args:
+        scraper: 爬虫实例
+        parse: 该实例的解析方法，调用方式为 parse(html, *args)
+        body: 响应正文字节（按 UTF-8 解码后传给 parse）
+        args: 解析方法的附加参数
+    """
+    workers = scraper.parse_workers
+    if workers <= 0:
+        _count("inline")
+        return parse(body.decode("utf-8", errors="replace"), *args)
+
+    pool = _get_pool(workers)
+    try:
+        result = pool.submit(
+            _parse_in_worker, type(scraper), scraper.config, parse.__name__, body, tuple(args)
+        ).result()
+    except BrokenProcessPool as e:
+        print(f"  ⚠ 解析进程池异常，改为本线程解析: {e}")
+        _reset_pool(pool)
+        _count("fallbacks")
+        return parse(body.decode("utf-8", errors="replace"), *args)
+    _count("pooled")
+    return result
+
+
+def parse_pool_stats() -> dict:
+    """解析进程池的配置和调用计数"""
+    with _pool_lock:
+        return {"workers": _pool_workers, **_stats}
+
+
+@atexit.register
+def shutdown_parse_pool():
+    """关闭解析进程池（进程退出时自动调用）"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -1,13 +1,14 @@
 """七猫小说排行榜爬虫"""
 
 import re
-import time
 from typing import Optional
 
 import requests
-from bs4 import BeautifulSoup
 
 from scrapers.base import BaseScraper
+from scrapers.breaker import FetchError
+from scrapers.extract import Field, Spec, has_class
+from scrapers.http import ACCEPT_ENCODING
 from models.novel import NovelRank
 
 
@@ -27,7 +28,11 @@ class QimaoScraper(BaseScraper):
     """
 
     SOURCE_NAME = "七猫小说"
+    SOURCE_KEY = "qimao"
     BASE_URL = "https://www.qimao.com"
+    # 榜单分页，?page=N
+    MAX_PAGES = 5
+    PAGED_PARSERS = {"_parse_page": 2}
 
     # 频道
     GENDERS = {
@@ -55,12 +60,31 @@ class QimaoScraper(BaseScraper):
         "update": "update",
     }
 
+    # 排行条目抽取规则（li.rank-list-item），未标 many 的字段取条目内第一个匹配
+    _INFO = f'(.//span[{has_class("s-book-info")}])[1]'
+    RANK_SPEC = Spec(
+        f'//li[{has_class("rank-list-item")}]',
+        title=Field(f'.//a[{has_class("s-book-title")}]'),
+        href=Field(f'.//a[{has_class("s-book-title")}]', attr="href"),
+        authors=Field(f'{_INFO}//a[contains(@href, "/zuozhe/")]', many=True),
+        categories=Field(
+            f'{_INFO}//a[contains(@href, "/shuku/a-") and not(contains(@href, "/zuozhe/"))]',
+            many=True,
+        ),
+        info_ems=Field(f'{_INFO}//em', many=True),  # 字数 / 连载状态
+        intro=Field(f'.//span[{has_class("s-book-intro")}]'),
+        update_link=Field(f'(.//span[{has_class("s-book-update")}])[1]//a'),
+        update=Field(f'.//span[{has_class("s-book-update")}]'),
+        rank_num=Field(f'.//em[{has_class("rank-num")}]'),
+        rank_unit=Field(f'.//em[{has_class("rank-unit")}]'),
+    )
+
     def _get_headers(self) -> dict:
         return {
             "User-Agent": self.user_agent,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Connection": "keep-alive",
             "Referer": "https://www.qimao.com/paihang",
             "Sec-Fetch-Dest": "document",
@@ -84,95 +108,102 @@ class QimaoScraper(BaseScraper):
         return categories
 
     def _fetch_rank_page(self, gender_key: str, rank_key: str) -> list[NovelRank]:
-        """抓取单个榜单页面 (可能有多页，先抓第1页)"""
-        # 先尝试不带 /date/ 的 URL, 失败再加
-        url = f"{self.BASE_URL}/paihang/{gender_key}/{rank_key}/"
+        """抓取单个榜单（前 max_pages 页，合并为全局排名）"""
         gender_name = self.GENDERS.get(gender_key, gender_key)
         rank_name = self.RANK_TYPES.get(rank_key, rank_key)
 
         print(f"  正在抓取: {self.SOURCE_NAME} {gender_name} - {rank_name} ...")
 
+        return self._fetch_pages(
+            lambda page: self._fetch_page(gender_key, rank_key, gender_name, rank_name, page)
+        )
+
+    def _fetch_page(
+        self,
+        gender_key: str,
+        rank_key: str,
+        gender_name: str,
+        rank_name: str,
+        page: int
+    ) -> list[NovelRank]:
+        """抓取榜单的第 page 页"""
+        # 先尝试不带 /date/ 的 URL, 失败再加
+        url = f"{self.BASE_URL}/paihang/{gender_key}/{rank_key}/"
+        params = {"page": page} if page > 1 else None
+
         try:
-            resp = requests.get(url, headers=self._get_headers(), timeout=15)
-            if resp.status_code == 405:
-                # 尝试带 /date/ 的备用 URL
-                url = f"{self.BASE_URL}/paihang/{gender_key}/{rank_key}/date/"
-                resp = requests.get(url, headers=self._get_headers(), timeout=15)
-            resp.raise_for_status()
-            resp.encoding = "utf-8"
+            try:
+                return self._fetch_and_parse(
+                    url, self._parse_page, gender_name, rank_name, page, params=params
+                )
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 405:
+                    raise
+            # 尝试带 /date/ 的备用 URL
+            url = f"{self.BASE_URL}/paihang/{gender_key}/{rank_key}/date/"
+            return self._fetch_and_parse(
+                url, self._parse_page, gender_name, rank_name, page, params=params
+            )
         except requests.RequestException as e:
             print(f"  ⚠ 请求失败: {url} - {e}")
-            return []
+            raise FetchError(f"请求失败: {url} - {e}") from e
 
-        return self._parse_page(resp.text, gender_name, rank_name)
+    def _parse_page(
+        self,
+        html: str,
+        gender_name: str,
+        rank_name: str,
+        page: int = 1
+    ) -> list[NovelRank]:
+        """
+        解析七猫排行榜页面（字段规则见 RANK_SPEC）
 
-    def _parse_page(self, html: str, gender_name: str, rank_name: str) -> list[NovelRank]:
-        """解析七猫排行榜页面"""
-        soup = BeautifulSoup(html, "lxml")
+        返回页内排名；page 只用于区分各页的缓存和归档，全局排名由 merge_pages 换算。
+        """
         novels = []
 
-        items = soup.select("li.rank-list-item")
-
-        for idx, item in enumerate(items, start=1):
+        for idx, row in enumerate(self.RANK_SPEC.parse(html), start=1):
             try:
                 # 书名 + 链接
-                title_a = item.select_one("a.s-book-title")
-                if not title_a:
-                    continue
-                title = title_a.get_text(strip=True)
+                title = row["title"]
                 if not title:
                     continue
 
-                href = title_a.get("href", "")
+                href = row["href"] or ""
                 book_url = href if href.startswith("http") else f"{self.BASE_URL}{href}"
 
-                # 作者 + 分类 + 字数 + 状态 (from span.s-book-info)
-                author = ""
-                category = ""
+                # 作者 + 分类 (from span.s-book-info，同类链接取最后一个)
+                author = row["authors"][-1] if row["authors"] else ""
+                category = row["categories"][-1] if row["categories"] else ""
+
+                # em 标签里有字数和状态
                 word_count = ""
                 status = ""
-                info_span = item.select_one("span.s-book-info")
-                if info_span:
-                    for a in info_span.select("a"):
-                        link_href = a.get("href", "")
-                        if "/zuozhe/" in link_href:
-                            author = a.get_text(strip=True)
-                        elif "/shuku/a-" in link_href:
-                            category = a.get_text(strip=True)
-                    # em 标签里有字数和状态
-                    for em in info_span.select("em"):
-                        em_text = em.get_text(strip=True)
-                        if "万字" in em_text or "字" in em_text:
-                            word_count = em_text
-                        elif em_text in ("连载中", "已完结"):
-                            status = em_text
+                for em_text in row["info_ems"]:
+                    if "万字" in em_text or "字" in em_text:
+                        word_count = em_text
+                    elif em_text in ("连载中", "已完结"):
+                        status = em_text
 
                 # 简介
-                intro = ""
-                intro_span = item.select_one("span.s-book-intro")
-                if intro_span:
-                    intro = intro_span.get_text(strip=True)
+                intro = row["intro"] or ""
 
                 # 最新章节
                 latest_chapter = ""
-                update_span = item.select_one("span.s-book-update")
-                if update_span:
-                    update_a = update_span.select_one("a")
-                    if update_a:
-                        latest_chapter = update_a.get_text(strip=True)
+                if row["update"] is not None:
+                    if row["update_link"] is not None:
+                        latest_chapter = row["update_link"]
                     else:
-                        latest_chapter = update_span.get_text(strip=True)
+                        latest_chapter = row["update"]
                     latest_chapter = re.sub(r'^最近更新\s*', '', latest_chapter)
                     latest_chapter = re.sub(r'\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}$', '', latest_chapter).strip()
 
                 # 热度
                 heat = ""
-                rank_num = item.select_one("em.rank-num")
-                rank_unit = item.select_one("em.rank-unit")
-                if rank_num:
-                    heat = rank_num.get_text(strip=True)
-                    if rank_unit:
-                        heat += rank_unit.get_text(strip=True)
+                if row["rank_num"] is not None:
+                    heat = row["rank_num"]
+                    if row["rank_unit"] is not None:
+                        heat += row["rank_unit"]
 
                 extra = {}
                 if heat:
@@ -214,22 +245,18 @@ class QimaoScraper(BaseScraper):
         rank_key = self.PERIOD_MAP.get(period, period)
         return self._fetch_rank_page(gender_key, rank_key)
 
-    def scrape_all(
+    def list_keys(
         self,
         gender: Optional[str] = None,
         period: Optional[str] = None
-    ) -> list[NovelRank]:
-        """抓取所有排行榜"""
-        all_novels = []
-
+    ) -> list[str]:
+        """榜单键: "{gender_key}:{rank_key}"，如 "boy:hot" """
         genders = [self.GENDER_MAP.get(gender, gender)] if gender else list(self.GENDERS.keys())
         rank_types = [self.PERIOD_MAP.get(period, period)] if period else list(self.RANK_TYPES.keys())
 
-        for g in genders:
-            for r in rank_types:
-                novels = self._fetch_rank_page(g, r)
-                all_novels.extend(novels)
-                if self.delay > 0:
-                    time.sleep(self.delay)
+        return [f"{g}:{r}" for g in genders for r in rank_types]
 
-        return all_novels
+    def fetch_list(self, key: str) -> list[NovelRank]:
+        """抓取单个榜单"""
+        gender_key, rank_key = key.split(":", 1)
+        return self._fetch_rank_page(gender_key, rank_key)
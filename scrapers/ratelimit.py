@@ -0,0 +1,146 @@
+"""按主机的自适应令牌桶限速器"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+# 默认限速参数（可在 config.yaml 的 scrape.rate_limit 中按数据源覆盖）
+DEFAULT_RATE_LIMIT = {
+    "rate": 1.0,            # 初始速率（请求/秒）
+    "burst": 2,             # 桶容量，允许的瞬时突发请求数
+    "min_rate": 0.2,        # 退避下限
+    "max_rate": 4.0,        # 提速上限
+    "target_latency": 2.0,  # 平均响应时间超过该值（秒）时主动降速
+}
+
+
+class AdaptiveTokenBucket:
+    """
+    自适应令牌桶
+
+    每个请求消耗一个令牌，令牌按 rate 匀速补充，最多积累 burst 个。
+    速率按 AIMD 调整：响应正常且延迟低于目标时线性提速，
+    遇到 429/5xx 或网络错误时减半，并遵守 Retry-After。
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 2,
+        min_rate: float = 0.2,
+        max_rate: float = 4.0,
+        target_latency: float = 2.0,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.capacity = max(1, int(burst))
+        self.target_latency = target_latency
+
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._latency = None  # 响应时间 EWMA
+        self._lock = threading.Lock()
+
+        self.throttled = 0  # 收到 429/5xx/网络错误的次数
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """阻塞直到拿到一个令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def on_response(self, status: int, latency: float, retry_after: Optional[str] = None):
+        """根据响应状态和耗时调整速率"""
+        if status == 429 or status >= 500:
+            self.on_throttle(retry_after)
+            return
+
+        with self._lock:
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency = 0.8 * self._latency + 0.2 * latency
+
+            if self._latency > self.target_latency:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_throttle(self, retry_after: Optional[str] = None):
+        """站点限流 / 出错：速率减半并清空令牌，必要时暂停到 Retry-After"""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            wait = _parse_retry_after(retry_after)
+            if wait:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "burst": self.capacity,
+                "latency": round(self._latency, 3) if self._latency is not None else None,
+                "throttled": self.throttled,
+            }
+
+
+def _parse_retry_after(value: Optional[str]) -> float:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需等待的秒数"""
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+# 进程内按主机共享的限速器
+_limiters: dict[str, AdaptiveTokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host: str, settings: dict = None) -> AdaptiveTokenBucket:
+    """获取（或按 settings 创建）某主机的限速器，同一主机全进程共享"""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            params = dict(DEFAULT_RATE_LIMIT)
+            params.update({k: v for k, v in (settings or {}).items() if k in DEFAULT_RATE_LIMIT})
+            limiter = AdaptiveTokenBucket(**params)
+            _limiters[host] = limiter
+        return limiter
+
+
+def find_limiter(host: str) -> Optional[AdaptiveTokenBucket]:
+    """查找已注册的限速器，未注册的主机（如本地 Tomato 服务）不限速"""
+    return _limiters.get(host)
+
+
+def limiter_stats() -> dict:
+    """所有主机限速器的当前状态"""
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return {host: limiter.snapshot() for host, limiter in items}
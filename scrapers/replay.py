@@ -0,0 +1,294 @@
+"""离线回放 - 页面夹具录制、本地回放服务器和爬虫吞吐基准"""
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from scrapers.archive import PageArchive, page_archive
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures"
+)
+
+
+# ============================================================
+# 录制
+# ============================================================
+def record_fixtures(
+    source_key: str,
+    out_dir: str = FIXTURES_DIR,
+    day: Optional[str] = None,
+    archive: Optional[PageArchive] = None,
+) -> int:
+    """
+    把某数据源某天的归档页面导出为夹具
+
+    目录结构: <out_dir>/<source>/index.json + <body_hash>.html；
+    index.json 为 {请求路径(含查询串): {file, parser, args}}，路径相对站点 BASE_URL。
+    先用正常抓取（开启归档）拿到真实页面，再导出即完成录制。
+
+    Returns:
+        int: 导出的页面数
+    """
+    from scrapers import SCRAPER_REGISTRY
+
+    archive = archive or page_archive
+    day = day or date.today().isoformat()
+    origin = SCRAPER_REGISTRY[source_key]["class"].BASE_URL
+
+    source_dir = os.path.join(out_dir, source_key)
+    os.makedirs(source_dir, exist_ok=True)
+    index_path = os.path.join(source_dir, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+
+    count = 0
+    for page in archive.list_pages(source_key, day):
+        if not page["url"].startswith(origin):
+            continue
+        body = archive.get_object(page["body_hash"])
+        if body is None:
+            continue
+        filename = f"{page['body_hash']}.html"
+        with open(os.path.join(source_dir, filename), "wb") as f:
+            f.write(body)
+        index[page["url"][len(origin):] or "/"] = {
+            "file": filename,
+            "parser": page["parser"],
+            "args": json.loads(page["parser_args"]),
+        }
+        count += 1
+
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return count
+
+
+def load_fixtures(fixtures_dir: str, source_key: str) -> dict:
+    """读取某数据源的夹具索引，没有则返回 {}"""
+    path = os.path.join(fixtures_dir, source_key, "index.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ============================================================
+# 回放服务器
+# ============================================================
+class ReplayServer:
+    """
+    本地回放服务器
+
+    请求 /<source>/<原路径> 返回对应夹具（带 ETag，支持 If-None-Match），
+    没有夹具的路径返回 404。可注入延迟（latency + 0~jitter 秒）和随机错误
+    （按 error_rate 概率返回 error_status）。爬虫通过 scrape.base_urls 指向
+    http://host:port/<source> 即可离线抓取。
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: str = FIXTURES_DIR,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+    ):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+        self._indexes: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_urls(self, sources: list[str]) -> dict:
+        """供 scrape.base_urls 使用的 {source: 回放地址}"""
+        return {source: f"{self.base_url}/{source}" for source in sources}
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+
+    def _count(self, source: str, key: str):
+        with self._lock:
+            st = self.stats.setdefault(source, {"requests": 0, "ok": 0, "not_modified": 0,
+                                                "errors": 0, "missing": 0})
+            st["requests"] += 1
+            st[key] += 1
+
+    def _lookup(self, source: str, path: str) -> Optional[tuple[bytes, str]]:
+        with self._lock:
+            index = self._indexes.get(source)
+            if index is None:
+                index = self._indexes[source] = load_fixtures(self.fixtures_dir, source)
+        entry = index.get(path)
+        if entry is None:
+            return None
+        with open(os.path.join(self.fixtures_dir, source, entry["file"]), "rb") as f:
+            body = f.read()
+        return body, entry["file"].rsplit(".", 1)[0]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                source, _, rest = self.path.lstrip("/").partition("/")
+                path = "/" + rest
+
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if server.error_rate and random.random() < server.error_rate:
+                    server._count(source, "errors")
+                    self._send(server.error_status, b"injected error")
+                    return
+
+                found = server._lookup(source, path)
+                if found is None:
+                    server._count(source, "missing")
+                    self._send(404, b"no fixture")
+                    return
+
+                body, body_hash = found
+                etag = f'"{body_hash[:32]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server._count(source, "not_modified")
+                    self._send(304, b"", etag)
+                    return
+                server._count(source, "ok")
+                self._send(200, body, etag)
+
+            def _send(self, status: int, body: bytes, etag: str = ""):
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                if status == 200:
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ============================================================
+# 基准
+# ============================================================
+def bench_parse_fixtures(source_key: str, fixtures_dir: str = FIXTURES_DIR, repeat: int = 3) -> Optional[float]:
+    """用夹具测量当前解析器的平均耗时（毫秒/页），没有夹具返回 None"""
+    from scrapers import SCRAPER_REGISTRY
+
+    index = load_fixtures(fixtures_dir, source_key)
+    if not index:
+        return None
+    scraper = SCRAPER_REGISTRY[source_key]["class"]({"page_cache": False, "archive": False})
+    repeat = max(1, repeat)
+
+    total = 0.0
+    for entry in index.values():
+        with open(os.path.join(fixtures_dir, source_key, entry["file"]), "rb") as f:
+            html = f.read().decode("utf-8", errors="replace")
+        parse = getattr(scraper, entry["parser"])
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(html, *entry["args"])
+        total += (time.perf_counter() - start) / repeat
+    return total / len(index) * 1000
+
+
+def run_benchmark(
+    sources: list[str],
+    config: dict,
+    fixtures_dir: str = FIXTURES_DIR,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+) -> dict:
+    """
+    对回放服务器跑各数据源的 scrape_all，统计吞吐
+
+    使用传入的抓取配置（并发、解析进程数等），但关闭页面缓存、归档和
+    书旗区块缓存，并放开限速，使每次运行都完整请求和解析全部页面。
+
+    Returns:
+        dict: {source: {seconds, requests, errors, pages_per_sec, parse_ms_per_page, novels}}
+    """
+    from scrapers import SCRAPER_REGISTRY
+
+    server = ReplayServer(
+        fixtures_dir, latency=latency, jitter=jitter, error_rate=error_rate
+    ).start()
+    unlimited = {"rate": 10000, "burst": 10000, "max_rate": 10000}
+    bench_config = {
+        **config,
+        "base_urls": server.base_urls(sources),
+        "page_cache": False,
+        "archive": False,
+        "section_ttl": 0,
+        "rate_limit": {"default": unlimited, **{s: unlimited for s in sources}},
+    }
+
+    results = {}
+    try:
+        for source in sources:
+            scraper = SCRAPER_REGISTRY[source]["class"](bench_config)
+            start = time.perf_counter()
+            novels = scraper.scrape_all()
+            elapsed = time.perf_counter() - start
+
+            st = server.stats.get(source, {})
+            served = st.get("ok", 0) + st.get("not_modified", 0)
+            parse_ms = bench_parse_fixtures(source, fixtures_dir)
+            results[source] = {
+                "seconds": round(elapsed, 3),
+                "requests": st.get("requests", 0),
+                "errors": st.get("errors", 0) + st.get("missing", 0),
+                "pages_per_sec": round(served / elapsed, 2) if elapsed > 0 else 0.0,
+                "parse_ms_per_page": round(parse_ms, 3) if parse_ms is not None else None,
+                "novels": len(novels),
+            }
+    finally:
+        server.stop()
+    return results
@@ -1,12 +1,15 @@
 """书旗小说排行榜爬虫"""
 
+import copy
+import threading
 import time
-from typing import Optional
+from typing import Iterator, Optional
 
 import requests
-from bs4 import BeautifulSoup
 
 from scrapers.base import BaseScraper
+from scrapers.breaker import FetchError
+from scrapers.extract import Field, Spec, has_class
 from models.novel import NovelRank
 
 
@@ -19,6 +22,7 @@ class ShuqiScraper(BaseScraper):
     """
 
     SOURCE_NAME = "书旗小说"
+    SOURCE_KEY = "shuqi"
     BASE_URL = "https://www.shuqi.com"
     RANK_URL = "https://www.shuqi.com/rank"
 
@@ -38,6 +42,13 @@ class ShuqiScraper(BaseScraper):
         "girlNew":     ("女频", "新书榜"),
     }
 
+    # /rank 解析结果的缓存时间（秒），可用 scrape.section_ttl 覆盖，0 表示不缓存
+    SECTION_TTL = 300
+
+    # 按 URL 在所有实例间共享的区块缓存: url -> (抓取时间, {rank_key: list[NovelRank]})
+    _sections_memo: dict = {}
+    _sections_lock = threading.Lock()
+
     GENDER_MAP = {"male": "男频", "female": "女频"}
     PERIOD_MAP = {
         "click": "点击榜", "read": "点击榜",
@@ -48,6 +59,24 @@ class ShuqiScraper(BaseScraper):
         "new": "新书榜",
     }
 
+    # 榜单区块（div.comp-ranks-2）及区块内的书籍链接
+    SECTIONS_SPEC = Spec(
+        f'//div[{has_class("comp-ranks-2")}]',
+        more_href=Field('.//a[contains(@href, "/ranklist?rank=")]', attr="href"),  # "查看更多"
+        books=Spec(
+            f'.//ul[{has_class("cp-ranks-list")}]//a[contains(@href, "/book/")]',
+            no=Field(f'.//i[{has_class("no")}]'),
+            title=Field(f'.//span[{has_class("bn")}]'),
+            author=Field(f'.//span[{has_class("au")}]'),
+            href=Field(".", attr="href"),
+        ),
+    )
+
+    def __init__(self, config: dict = None):
+        super().__init__(config)
+        # 强制刷新（scrape.force，如 /api/scrape?force=1）时不复用本实例创建前抓取的区块
+        self._memo_since = time.monotonic() if self.config.get("force") else None
+
     def get_categories(self) -> list[dict]:
         """返回榜单列表作为分类"""
         categories = []
@@ -74,33 +103,57 @@ class ShuqiScraper(BaseScraper):
 
     def _fetch_all_sections(self) -> dict:
         """
-        一次请求抓取 /rank 页面，解析所有区块
+        抓取 /rank 页面，解析所有区块
+
+        一次响应包含全部榜单，解析结果在 section_ttl 秒内被 scrape_rank /
+        scrape_categories / scrape_all 等调用共享，并发调用也只请求一次。
+        强制刷新的实例第一次调用时总是重新请求（结果同样写入缓存）。失败不缓存。
 
         Returns:
-            dict: {rank_key: list[NovelRank]}
+            dict: {rank_key: list[NovelRank]}（每次返回新的副本）
+
+        Raises:
+            FetchError: 请求失败或熔断中
         """
+        ttl = self.config.get("section_ttl", self.SECTION_TTL)
+        if not ttl:
+            return self._request_sections()
+
+        # 同一时刻只有一个线程请求总榜页，其余等待后直接用结果
+        with self._sections_lock:
+            memo = self._sections_memo.get(self.RANK_URL)
+            if memo is None or time.monotonic() - memo[0] >= ttl or (
+                self._memo_since is not None and memo[0] < self._memo_since
+            ):
+                memo = (time.monotonic(), self._request_sections())
+                self._sections_memo[self.RANK_URL] = memo
+        return copy.deepcopy(memo[1])
+
+    def _request_sections(self) -> dict:
+        """请求并解析 /rank 页面"""
         print(f"  正在抓取: {self.SOURCE_NAME} 总榜页 ...")
 
         try:
-            resp = requests.get(self.RANK_URL, headers=self._get_headers(), timeout=15)
-            resp.raise_for_status()
-            resp.encoding = "utf-8"
+            return self._fetch_and_parse(self.RANK_URL, self._parse_sections)
         except requests.RequestException as e:
             print(f"  ⚠ 请求失败: {self.RANK_URL} - {e}")
-            return {}
+            raise FetchError(f"请求失败: {self.RANK_URL} - {e}") from e
 
-        soup = BeautifulSoup(resp.text, "lxml")
-        sections = soup.select("div.comp-ranks-2")
+    def _parse_sections(self, html: str) -> dict:
+        """
+        解析 /rank 页面的所有榜单区块（字段规则见 SECTIONS_SPEC）
 
+        Returns:
+            dict: {rank_key: list[NovelRank]}
+        """
         result = {}
 
-        for sec in sections:
+        for sec in self.SECTIONS_SPEC.parse(html):
             # 从 "查看更多" 链接提取 rank key
-            more_link = sec.select_one('a[href*="/ranklist?rank="]')
-            if not more_link:
+            href = sec["more_href"]
+            if href is None:
                 continue
 
-            href = more_link.get("href", "")
             rank_key = href.split("rank=")[-1] if "rank=" in href else ""
             if not rank_key or rank_key not in self.RANK_META:
                 continue
@@ -109,28 +162,22 @@ class ShuqiScraper(BaseScraper):
 
             # 解析书籍列表
             novels = []
-            book_links = sec.select('ul.cp-ranks-list a[href*="/book/"]')
-
-            for link in book_links:
-                no_el = link.select_one("i.no")
-                bn_el = link.select_one("span.bn")
-                au_el = link.select_one("span.au")
-
-                if not bn_el:
+            for book in sec["books"]:
+                if book["title"] is None:
                     continue
 
                 rank_num = 0
-                if no_el:
+                if book["no"] is not None:
                     try:
-                        rank_num = int(no_el.get_text(strip=True))
+                        rank_num = int(book["no"])
                     except ValueError:
                         rank_num = len(novels) + 1
                 else:
                     rank_num = len(novels) + 1
 
-                title = bn_el.get_text(strip=True)
-                author = au_el.get_text(strip=True) if au_el else ""
-                book_href = link.get("href", "")
+                title = book["title"]
+                author = book["author"] or ""
+                book_href = book["href"] or ""
                 book_url = book_href if book_href.startswith("http") else f"{self.BASE_URL}{book_href}"
 
                 if title:
@@ -168,13 +215,61 @@ class ShuqiScraper(BaseScraper):
 
         return []
 
+    def list_keys(
+        self,
+        gender: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> list[str]:
+        """榜单键即 RANK_META 的 rank key，如 "boyClick" """
+        gender_filter = self.GENDER_MAP.get(gender) if gender else None
+        period_filter = self.PERIOD_MAP.get(period) if period else None
+
+        keys = []
+        for rank_key, (gn, pn) in self.RANK_META.items():
+            if gender_filter and gn != gender_filter:
+                continue
+            if period_filter and pn != period_filter:
+                continue
+            keys.append(rank_key)
+        return keys
+
+    def fetch_list(self, key: str) -> list[NovelRank]:
+        """抓取单个榜单（取自共享的 /rank 区块缓存）"""
+        return self._fetch_all_sections().get(key, [])
+
+    def iter_batches(
+        self,
+        gender: Optional[str] = None,
+        period: Optional[str] = None,
+        skip: Optional[set[str]] = None
+    ) -> Iterator[tuple[str, list[NovelRank]]]:
+        """一次请求拿到全部区块，再逐个榜单产出"""
+        skip = skip or set()
+        keys = [k for k in self.list_keys(gender, period) if k not in skip]
+        if not keys:
+            return
+
+        try:
+            all_sections = self._fetch_all_sections()
+        except FetchError:
+            # 总榜页失败，所有榜单都算失败
+            for key in keys:
+                yield key, None
+            return
+
+        for key in keys:
+            yield key, all_sections.get(key, [])
+
     def scrape_all(
         self,
         gender: Optional[str] = None,
         period: Optional[str] = None
     ) -> list[NovelRank]:
         """抓取所有排行榜（一次请求获取全部数据）"""
-        all_sections = self._fetch_all_sections()
+        try:
+            all_sections = self._fetch_all_sections()
+        except FetchError:
+            return []
         all_novels = []
 
         gender_filter = self.GENDER_MAP.get(gender) if gender else None
@@ -202,7 +297,10 @@ class ShuqiScraper(BaseScraper):
         period: Optional[str] = None
     ) -> list[NovelRank]:
         """按榜单名称抓取"""
-        all_sections = self._fetch_all_sections()
+        try:
+            all_sections = self._fetch_all_sections()
+        except FetchError:
+            return []
         all_novels = []
 
         gender_filter = self.GENDER_MAP.get(gender) if gender else None
@@ -1,12 +1,12 @@
 """纵横中文网排行榜爬虫"""
 
-import time
 from typing import Optional
 
 import requests
-from bs4 import BeautifulSoup
 
 from scrapers.base import BaseScraper
+from scrapers.breaker import FetchError
+from scrapers.extract import Field, Spec, has_class
 from models.novel import NovelRank
 
 
@@ -19,8 +19,12 @@ class ZonghengScraper(BaseScraper):
     """
 
     SOURCE_NAME = "纵横中文网"
+    SOURCE_KEY = "zongheng"
     BASE_URL = "https://www.zongheng.com"
     RANK_URL = "https://www.zongheng.com/rank"
+    # 榜单分页，&page=N
+    MAX_PAGES = 5
+    PAGED_PARSERS = {"_parse_page": 1}
 
     # 榜单类型: rankType -> (中文名, nav参数)
     RANK_TYPES = {
@@ -45,6 +49,24 @@ class ZonghengScraper(BaseScraper):
 
     GENDER_MAP = {"male": "男频", "female": "女频"}
 
+    # 书籍链接及其所在 zh-modules-rank-book 模块中的作者、右侧数据栏
+    _MODULE = f'ancestor::*[{has_class("zh-modules-rank-book")}][1]'
+    _AUTHOR_LINK = 'a[contains(@href, "/show/userInfo/")]'
+    RANK_SPEC = Spec(
+        '//a[contains(@href, "/detail/")]',
+        title=Field("."),
+        href=Field(".", attr="href"),
+        author=Field(f'{_MODULE}//{_AUTHOR_LINK}'),
+        # 右侧数据栏: "作者|15938|月票" 或 "作者|387.9|万字" -> (数值, 单位)
+        slot=Field(
+            f'{_MODULE}//*[{has_class("rank-content-default__right-slot")}]',
+            pattern=r'([\d.]+)\s*(万字|月票|人气|点击|推荐票)',
+        ),
+        # 不在模块内时，从父级 / 祖父级找作者
+        parent_author=Field(f'..//{_AUTHOR_LINK}'),
+        grandparent_author=Field(f'../..//{_AUTHOR_LINK}'),
+    )
+
     def _get_headers(self) -> dict:
         return {
             "User-Agent": self.user_agent,
@@ -69,93 +91,63 @@ class ZonghengScraper(BaseScraper):
         return categories
 
     def _fetch_rank(self, nav: str = "default", rank_type: str = "") -> list[NovelRank]:
-        """抓取指定榜单页面"""
-        params = {"nav": nav}
-        if rank_type:
-            params["rankType"] = rank_type
-
+        """抓取指定榜单（前 max_pages 页，合并为全局排名）"""
         rank_name = "人气榜"
         if rank_type and rank_type in self.RANK_TYPES:
             rank_name = self.RANK_TYPES[rank_type][0]
 
         print(f"  正在抓取: {self.SOURCE_NAME} {rank_name} ...")
 
+        return self._fetch_pages(lambda page: self._fetch_page(nav, rank_type, rank_name, page))
+
+    def _fetch_page(self, nav: str, rank_type: str, rank_name: str, page: int) -> list[NovelRank]:
+        """抓取榜单的第 page 页"""
+        params = {"nav": nav}
+        if rank_type:
+            params["rankType"] = rank_type
+        if page > 1:
+            params["page"] = page
+
         try:
-            resp = requests.get(
-                self.RANK_URL,
-                params=params,
-                headers=self._get_headers(),
-                timeout=15,
+            return self._fetch_and_parse(
+                self.RANK_URL, self._parse_page, rank_name, page, params=params
             )
-            resp.raise_for_status()
-            resp.encoding = "utf-8"
         except requests.RequestException as e:
             print(f"  ⚠ 请求失败: {self.RANK_URL} - {e}")
-            return []
+            raise FetchError(f"请求失败: {self.RANK_URL} - {e}") from e
 
-        return self._parse_page(resp.text, rank_name)
+    def _parse_page(self, html: str, rank_name: str, page: int = 1) -> list[NovelRank]:
+        """
+        解析纵横排行榜页面（字段规则见 RANK_SPEC）
 
-    def _parse_page(self, html: str, rank_name: str) -> list[NovelRank]:
-        """解析纵横排行榜页面"""
-        import re
-        soup = BeautifulSoup(html, "lxml")
+        返回页内排名；page 只用于区分各页的缓存和归档，全局排名由 merge_pages 换算。
+        """
         novels = []
 
         rank_idx = 0
-        book_links = soup.select('a[href*="/detail/"]')
-
         seen_titles = set()
-        for link in book_links:
-            title = link.get_text(strip=True)
+        for link in self.RANK_SPEC.parse(html):
+            title = link["title"]
             if not title or len(title) < 2 or len(title) > 50:
                 continue
 
-            href = link.get("href", "")
-            if "/detail/" not in href:
-                continue
-
             if title in seen_titles:
                 continue
             seen_titles.add(title)
 
             rank_idx += 1
+            href = link["href"]
             book_url = href if href.startswith("http") else f"{self.BASE_URL}{href}"
 
-            # 从父级 zh-modules-rank-book 获取详细数据
-            author = ""
             extra = {}
-            book_module = link.find_parent(class_="zh-modules-rank-book")
-            if book_module:
-                # 作者
-                author_link = book_module.select_one('a[href*="/show/userInfo/"]')
-                if author_link:
-                    author = author_link.get_text(strip=True)
-
-                # 右侧数据栏: "作者|15938|月票" 或 "作者|387.9|万字"
-                right_slot = book_module.select_one('.rank-content-default__right-slot')
-                if right_slot:
-                    slot_text = right_slot.get_text(strip=True)
-                    # 提取数值 + 单位
-                    m = re.search(r'([\d.]+)\s*(万字|月票|人气|点击|推荐票)', slot_text)
-                    if m:
-                        val, unit = m.group(1), m.group(2)
-                        if unit == '万字':
-                            extra['word_count'] = f"{val}万字"
-                        else:
-                            extra['heat'] = f"{val}{unit}"
-
-            if not author:
-                parent = link.parent
-                if parent:
-                    author_link = parent.select_one('a[href*="/show/userInfo/"]')
-                    if author_link:
-                        author = author_link.get_text(strip=True)
-                    if not author:
-                        grandparent = parent.parent
-                        if grandparent:
-                            author_link = grandparent.select_one('a[href*="/show/userInfo/"]')
-                            if author_link:
-                                author = author_link.get_text(strip=True)
+            if link["slot"]:
+                val, unit = link["slot"]
+                if unit == '万字':
+                    extra['word_count'] = f"{val}万字"
+                else:
+                    extra['heat'] = f"{val}{unit}"
+
+            author = link["author"] or link["parent_author"] or link["grandparent_author"] or ""
 
             novels.append(NovelRank(
                 rank=rank_idx,
@@ -181,20 +173,16 @@ class ZonghengScraper(BaseScraper):
         print(f"  正在抓取: {self.SOURCE_NAME} 总榜页 ...")
 
         try:
-            resp = requests.get(self.RANK_URL, headers=self._get_headers(), timeout=15)
-            resp.raise_for_status()
-            resp.encoding = "utf-8"
+            novels = self._fetch_and_parse(self.RANK_URL, self._parse_page, "人气榜")
         except requests.RequestException as e:
             print(f"  ⚠ 请求失败: {self.RANK_URL} - {e}")
             return {}
 
-        soup = BeautifulSoup(resp.text, "lxml")
         result = {}
 
         # 在主页面上解析不同的区块
         # 纵横主排行页面有多个区块: 人气榜/月票榜/新书榜
         # 先从默认页面抓取人气榜的数据
-        novels = self._parse_page(resp.text, "人气榜")
         if novels:
             result["人气榜"] = novels
 
@@ -214,37 +202,28 @@ class ZonghengScraper(BaseScraper):
         # 默认人气榜
         return self._fetch_rank("default")
 
-    def scrape_all(
+    def list_keys(
         self,
         gender: Optional[str] = None,
         period: Optional[str] = None
-    ) -> list[NovelRank]:
-        """抓取所有/指定榜单"""
-        all_novels = []
-
+    ) -> list[str]:
+        """榜单键: "{nav}:{rankType}"，人气榜为 "default" """
         if period and period in self.PERIOD_MAP:
             rank_type = self.PERIOD_MAP[period]
-            if rank_type == "default":
-                novels = self._fetch_rank("default")
-            elif rank_type in self.RANK_TYPES:
+            if rank_type in self.RANK_TYPES:
                 nav = self.RANK_TYPES[rank_type][1]
-                novels = self._fetch_rank(nav, rank_type)
-            else:
-                novels = self._fetch_rank("default")
-            return novels
-
-        # 抓取主要榜单
-        rank_list = [
-            ("default", ""),      # 人气榜
-            ("new-book", "4"),    # 新书榜
-            ("click", "5"),      # 点击榜
-            ("end", "8"),        # 完结榜
+                return [f"{nav}:{rank_type}"]
+            return ["default"]
+
+        # 主要榜单
+        return [
+            "default",        # 人气榜
+            "new-book:4",     # 新书榜
+            "click:5",        # 点击榜
+            "end:8",          # 完结榜
         ]
 
-        for nav, rt in rank_list:
-            novels = self._fetch_rank(nav, rt)
-            all_novels.extend(novels)
-            if self.delay > 0:
-                time.sleep(self.delay)
-
-        return all_novels
+    def fetch_list(self, key: str) -> list[NovelRank]:
+        """抓取单个榜单"""
+        nav, _, rank_type = key.partition(":")
+        return self._fetch_rank(nav, rank_type)
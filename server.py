@@ -5,7 +5,7 @@ import sys
 import os
 import threading
 import datetime
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -16,12 +16,22 @@ import hashlib
 import secrets
 
 from scrapers import SCRAPER_REGISTRY
+from scrapers.breaker import FetchError, breaker_stats
+from scrapers.http import client_stats
+from scrapers.parsepool import parse_pool_stats
+from scrapers.ratelimit import limiter_stats
 from sorter import apply_sort
 from exporters.feishu import FeishuExporter
 from exporters.webhook import FeishuWebhookNotifier
-from storage import has_data, load_data, save_data, list_dates, today_str, latest_date, get_novel_trend, init_db
+from storage import (
+    has_data, load_data, list_dates, list_snapshots, today_str, latest_date, get_novel_trend, init_db,
+    connection_stats, configure_snapshot_cache, snapshot_cache_stats, load_dashboard, load_category_rank,
+    query_ranks, count_ranks, merge_ranks,
+)
 from models.novel import NovelRank
 from downloader import FanqieDownloader
+from sync import hot_lists, sync_source
+from jobqueue import enqueue_sync, queue_stats
 
 app = Flask(__name__, static_folder="web", static_url_path="")
 app.secret_key = secrets.token_hex(32)
@@ -86,6 +96,7 @@ def api_auth_check():
 # 定时调度器
 # ============================================================
 _scheduler_timer = None
+_hot_timer = None
 _scheduler_lock = threading.Lock()
 _last_sync_result = {"time": None, "status": None, "detail": None}
 
@@ -95,20 +106,28 @@ def _run_scheduled_sync():
     global _last_sync_result
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[sync] [{now}] scheduled sync started...")
+
+    # 队列模式：只把榜单任务入队，由独立的 worker 进程（python main.py worker）执行
+    config = load_config()
+    if config.get("schedule", {}).get("use_queue", False):
+        queued = enqueue_sync(
+            list(SCRAPER_REGISTRY), config.get("scrape", {}),
+            max_attempts=config.get("queue", {}).get("max_attempts", 3),
+        )
+        _last_sync_result = {"time": now, "status": "queued", "total": 0, "queued": queued, "errors": []}
+        print(f"[sync] [{now}] {queued} list jobs queued")
+        _schedule_next()
+        return
+
     errors = []
     total = 0
-    for source_key, entry in SCRAPER_REGISTRY.items():
-        try:
-            scraper = get_scraper(source_key)
-            if scraper:
-                novels = scraper.scrape_all()
-                save_data(source_key, novels)
-                count = len(novels)
-                total += count
-                print(f"  [ok] {entry['name']}: {count} records")
-        except Exception as e:
-            errors.append(f"{entry['name']}: {e}")
-            print(f"  [err] {entry['name']}: {e}")
+    # 各数据源并发抓取，逐榜单入库；重启后的同步只补抓未完成的榜单
+    for source_key, outcome in _scrape_sources_parallel(list(SCRAPER_REGISTRY), resume=True).items():
+        entry = SCRAPER_REGISTRY[source_key]
+        if "error" in outcome:
+            errors.append(f"{entry['name']}: {outcome['error']}")
+        else:
+            total += len(outcome["data"])
 
     _last_sync_result = {
         "time": now,
@@ -130,7 +149,7 @@ def _run_scheduled_sync():
             results = {}
             for sk, ent in SCRAPER_REGISTRY.items():
                 if has_data(sk, day):
-                    data = load_data(sk, day)
+                    data = load_data(sk, day, fields=("rank",))
                     results[sk] = {"name": ent["name"], "count": len(data), "from_storage": False}
                 else:
                     results[sk] = {"name": ent["name"], "count": 0, "from_storage": False}
@@ -175,6 +194,64 @@ def _schedule_next():
         _scheduler_timer.start()
 
 
+def _run_hot_sync():
+    """
+    定时刷新热门榜单（schedule.hot_lists），每次写入新的日内快照
+
+    冷门榜单仍只由每日同步抓取一次。距上次入库不到半个间隔的榜单跳过，
+    避免与手动拉取或每日同步重复抓取。
+    """
+    config = load_config()
+    schedule = config.get("schedule", {})
+    interval = schedule.get("hot_interval", 0) or 0
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        lists = {}
+        for source_key, patterns in (schedule.get("hot_lists") or {}).items():
+            scraper = get_scraper(source_key)
+            if scraper and patterns:
+                lists[source_key] = hot_lists(scraper, patterns)
+        refresh_after = interval * 60 / 2
+
+        if schedule.get("use_queue", False):
+            queued = enqueue_sync(
+                list(lists), config.get("scrape", {}), lists=lists, refresh_after=refresh_after,
+                max_attempts=config.get("queue", {}).get("max_attempts", 3),
+            )
+            print(f"[sync] [{now}] {queued} hot list jobs queued")
+        else:
+            print(f"[sync] [{now}] hot list refresh started...")
+            outcomes = _scrape_sources_parallel(
+                list(lists), resume=True, lists=lists, refresh_after=refresh_after
+            )
+            total = sum(len(o.get("data", [])) for o in outcomes.values())
+            print(f"[sync] [{now}] hot list refresh done, {total} records")
+    except Exception as e:
+        print(f"  [warn] hot list refresh failed: {e}")
+
+    _schedule_hot()
+
+
+def _schedule_hot():
+    """按 schedule.hot_interval（分钟）设置热门榜单的刷新定时器，0 表示不刷新"""
+    global _hot_timer
+    schedule = load_config().get("schedule", {})
+    interval = schedule.get("hot_interval", 0) or 0
+
+    with _scheduler_lock:
+        if _hot_timer:
+            _hot_timer.cancel()
+            _hot_timer = None
+
+        if not schedule.get("enabled", False) or interval <= 0 or not schedule.get("hot_lists"):
+            return
+
+        _hot_timer = threading.Timer(interval * 60, _run_hot_sync)
+        _hot_timer.daemon = True
+        _hot_timer.start()
+
+
 def _deep_merge(base: dict, override: dict) -> dict:
     """深度合并两个字典，override 中的值覆盖 base"""
     result = base.copy()
@@ -211,22 +288,78 @@ def save_config(config: dict):
         yaml.dump(config, f, allow_unicode=True, default_flow_style=False)
 
 
-def get_scraper(source: str = "fanqie"):
+def get_scraper(source: str = "fanqie", force: bool = False):
     config = load_config()
     entry = SCRAPER_REGISTRY.get(source)
     if not entry:
         return None
-    return entry["class"](config.get("scrape", {}))
+    scrape_config = config.get("scrape", {})
+    if force:
+        # 强制刷新：不复用进程内缓存的解析结果（如书旗区块缓存）
+        scrape_config = {**scrape_config, "force": True}
+    return entry["class"](scrape_config)
 
 
-def _scrape_and_save(source_key: str, gender=None, period=None):
-    """抓取数据并存储，返回 dict 列表"""
-    scraper = get_scraper(source_key)
+def _scrape_and_save(source_key: str, gender=None, period=None, resume=False,
+                     lists=None, refresh_after=None, force=False):
+    """
+    抓取数据并逐榜单存储，返回本次抓取的 dict 列表
+
+    resume=True 时跳过今天已入库的榜单（断点续抓）；lists / refresh_after
+    见 sync_source（只抓取指定榜单、按入库时间重新抓取）；force=True 时
+    不复用进程内缓存的解析结果。
+    """
+    scraper = get_scraper(source_key, force)
     if not scraper:
         return []
-    novels = scraper.scrape_all(gender=gender, period=period)
-    save_data(source_key, novels)
-    return [n.to_dict() for n in novels]
+    result = sync_source(
+        source_key, scraper, gender=gender, period=period, resume=resume,
+        lists=lists, refresh_after=refresh_after,
+    )
+    if result["skipped"]:
+        print(f"  [resume] {source_key}: skipped {result['skipped']} finished lists")
+    if result["failed"]:
+        if not result["saved"]:
+            raise FetchError(f"全部 {len(result['failed'])} 个榜单抓取失败")
+        print(f"  [warn] {source_key}: {len(result['failed'])} lists failed, kept existing data")
+    return [n.to_dict() for n in result["novels"]]
+
+
+def _scrape_sources_parallel(source_keys: list[str], gender=None, period=None, resume=False,
+                             lists=None, refresh_after=None, force=False) -> dict:
+    """
+    并发抓取多个数据源，每个源一个工作线程，失败互不影响
+
+    各源访问不同站点，总耗时取决于最慢的源；每个榜单抓完即入库。
+    lists 为 {source_key: 榜单键列表} 时每个源只抓取这些榜单。
+
+    Returns:
+        dict: {source_key: {"data": [...]} 或 {"error": "..."}}，按 source_keys 顺序
+    """
+    outcomes = {}
+    if not source_keys:
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=len(source_keys)) as pool:
+        futures = {
+            pool.submit(
+                _scrape_and_save, key, gender, period, resume,
+                lists.get(key) if lists is not None else None, refresh_after, force,
+            ): key
+            for key in source_keys
+        }
+        for fut in as_completed(futures):
+            key = futures[fut]
+            name = SCRAPER_REGISTRY[key]["name"]
+            try:
+                data = fut.result()
+                outcomes[key] = {"data": data}
+                print(f"  [ok] {name}: {len(data)} records")
+            except Exception as e:
+                outcomes[key] = {"error": str(e)}
+                print(f"  [err] {name}: {e}")
+
+    return {key: outcomes[key] for key in source_keys}
 
 
 @app.route("/")
@@ -267,19 +400,22 @@ def api_scrape():
     sort_key = request.args.get("sort", "rank")
     force = request.args.get("force", "0") == "1"
     day = request.args.get("date") or None
+    snapshot = request.args.get("snapshot") or None
 
     from_storage = False
 
     if force:
         # 强制抓取
-        data = _scrape_and_save(source, gender, period)
+        data = _scrape_and_save(source, gender, period, force=True)
         day = day or today_str()
     else:
         # 只读缓存，回退到最近有数据的日期
         if day is None:
             day = latest_date()
         if has_data(source, day):
-            data = load_data(source, day)
+            data = query_ranks(
+                source, day, snapshot, gender=_gender_name(gender), period=period, sort=_rank_sort(sort_key)
+            )
             from_storage = True
         else:
             return jsonify({
@@ -291,16 +427,8 @@ def api_scrape():
                 "msg": "暂无数据，请先拉取",
             })
 
-    # 筛选
-    if from_storage:
-        if gender:
-            gender_name = {"male": "男频", "female": "女频"}.get(gender, gender)
-            data = [d for d in data if d.get("gender") == gender_name]
-        if period:
-            data = [d for d in data if d.get("period") == period]
-
-    # 排序
-    if sort_key and sort_key != "rank":
+    # 新抓取的数据在这里排序（库中数据的筛选和排序已在查询中完成）
+    if not from_storage and sort_key and sort_key != "rank":
         novels = [NovelRank(**{k: v for k, v in d.items() if k != "author_url"}) for d in data]
         novels = apply_sort(novels, sort_key)
         data = [n.to_dict() for n in novels]
@@ -314,6 +442,18 @@ def api_scrape():
     })
 
 
+def _gender_name(gender):
+    """请求参数中的频道（male / female 或中文名）-> 库中的频道名"""
+    if not gender:
+        return None
+    return {"male": "男频", "female": "女频"}.get(gender, gender)
+
+
+def _rank_sort(sort_key: str):
+    """请求参数中的排序键 -> query_ranks 的排序方式（rank 及不支持的键按原顺序）"""
+    return sort_key if sort_key in ("category", "gender", "period") else None
+
+
 @app.route("/api/scrape/all-sources")
 def api_scrape_all_sources():
     """汇总所有数据源（只读缓存，不自动抓取）"""
@@ -328,36 +468,31 @@ def api_scrape_all_sources():
 
     if force:
         day = day or today_str()
-        for source_key, entry in SCRAPER_REGISTRY.items():
-            try:
-                data = _scrape_and_save(source_key, gender, period)
-                all_data.extend(data)
-            except Exception as e:
-                print(f"[warn] {entry['name']} scrape failed: {e}")
+        outcomes = _scrape_sources_parallel(list(SCRAPER_REGISTRY), gender, period, force=True)
+        for source_key, outcome in outcomes.items():
+            if "error" in outcome:
+                print(f"[warn] {SCRAPER_REGISTRY[source_key]['name']} scrape failed: {outcome['error']}")
+                continue
+            all_data.extend(outcome["data"])
+
+        # 排序
+        if sort_key and sort_key != "rank":
+            novels = [NovelRank(**{k: v for k, v in d.items() if k != "author_url"}) for d in all_data]
+            novels = apply_sort(novels, sort_key)
+            all_data = [n.to_dict() for n in novels]
     else:
-        # 只读缓存
+        # 只读缓存：各数据源在查询中筛选、排序，再按注册表顺序归并
         if day is None:
             day = latest_date()
+        sort = _rank_sort(sort_key)
+        results = []
         for source_key, entry in SCRAPER_REGISTRY.items():
             if has_data(source_key, day):
-                data = load_data(source_key, day)
+                results.append(query_ranks(
+                    source_key, day, gender=_gender_name(gender), period=period, sort=sort
+                ))
                 any_stored = True
-            else:
-                continue
-
-            # 筛选
-            if gender:
-                gender_name = {"male": "男频", "female": "女频"}.get(gender, gender)
-                data = [d for d in data if d.get("gender") == gender_name]
-            if period:
-                data = [d for d in data if d.get("period") == period]
-            all_data.extend(data)
-
-    # 排序
-    if sort_key and sort_key != "rank":
-        novels = [NovelRank(**{k: v for k, v in d.items() if k != "author_url"}) for d in all_data]
-        novels = apply_sort(novels, sort_key)
-        all_data = [n.to_dict() for n in novels]
+        all_data = merge_ranks(results, sort)
 
     return jsonify({
         "code": 0,
@@ -375,33 +510,39 @@ def api_fetch_all():
     force = request.args.get("force", "0") == "1"
     results = {}
     errors = []
+    pending = []
 
     for source_key, entry in SCRAPER_REGISTRY.items():
         # 如果不强制刷新且已有今日数据，跳过
         if not force and has_data(source_key, day):
-            stored = load_data(source_key, day)
+            stored = load_data(source_key, day, fields=("rank",))
             results[source_key] = {
                 "name": entry["name"],
                 "count": len(stored),
                 "from_storage": True,
             }
             continue
+        pending.append(source_key)
 
-        try:
-            data = _scrape_and_save(source_key)
+    for source_key, outcome in _scrape_sources_parallel(pending, force=force).items():
+        entry = SCRAPER_REGISTRY[source_key]
+        if "error" in outcome:
+            errors.append(f"{entry['name']}: {outcome['error']}")
             results[source_key] = {
                 "name": entry["name"],
-                "count": len(data),
-                "from_storage": False,
+                "count": 0,
+                "error": outcome["error"],
             }
-        except Exception as e:
-            errors.append(f"{entry['name']}: {str(e)}")
+        else:
             results[source_key] = {
                 "name": entry["name"],
-                "count": 0,
-                "error": str(e),
+                "count": len(outcome["data"]),
+                "from_storage": False,
             }
 
+    # 保持与注册表一致的展示顺序
+    results = {key: results[key] for key in SCRAPER_REGISTRY if key in results}
+
     total = sum(r["count"] for r in results.values())
 
     return jsonify({
@@ -415,19 +556,15 @@ def api_fetch_all():
 
 @app.route("/api/dashboard")
 def api_dashboard():
-    """市场分析汇总看板数据"""
+    """市场分析汇总看板数据（读每日汇总表）"""
     day = request.args.get("date") or latest_date()
 
-    # 收集所有数据源的数据
-    all_novels = []
-    source_stats = {}
-
-    for source_key, entry in SCRAPER_REGISTRY.items():
-        data = load_data(source_key, day) if has_data(source_key, day) else []
-        source_stats[entry["name"]] = len(data)
-        all_novels.extend(data)
+    summary = load_dashboard(day, list(SCRAPER_REGISTRY))
+    source_stats = {
+        entry["name"]: summary["totals"][source_key] for source_key, entry in SCRAPER_REGISTRY.items()
+    }
 
-    if not all_novels:
+    if not summary["total"]:
         return jsonify({
             "code": 0,
             "data": {
@@ -442,102 +579,18 @@ def api_dashboard():
             },
         })
 
-    # 分类统计
-    category_counter = Counter()
-    gender_counter = Counter()
-    period_counter = Counter()
-    title_sources = {}  # title -> set of sources
-
-    for novel in all_novels:
-        cat = novel.get("category", "未分类")
-        gender = novel.get("gender", "未知")
-        period = novel.get("period", "未知")
-        source = novel.get("source", "未知")
-        title = novel.get("title", "")
-
-        category_counter[cat] += 1
-        gender_counter[gender] += 1
-        period_counter[period] += 1
-
-        if title:
-            if title not in title_sources:
-                title_sources[title] = {"sources": set(), "data": novel}
-            title_sources[title]["sources"].add(source)
-
-    # 跨平台热门书籍（出现在 2 个及以上平台的）
-    cross_platform = []
-    for title, info in title_sources.items():
-        if len(info["sources"]) >= 2:
-            cross_platform.append({
-                "title": title,
-                "author": info["data"].get("author", ""),
-                "category": info["data"].get("category", ""),
-                "book_url": info["data"].get("book_url", ""),
-                "sources": sorted(list(info["sources"])),
-                "source_count": len(info["sources"]),
-            })
-    cross_platform.sort(key=lambda x: x["source_count"], reverse=True)
-
-    # 热度 top 分类 (前15)
-    top_categories = dict(category_counter.most_common(15))
-
-    # --- 在读/热度排行 (男频/女频分开) ---
-    import re
-    def parse_heat(novel):
-        extra = novel.get("extra", {})
-        heat_str = extra.get("heat", "")
-        if not heat_str:
-            return 0.0
-        cleaned = re.sub(r'^[^\d.]*', '', heat_str)
-        m = re.match(r'([\d.]+)\s*(万)?', cleaned)
-        if not m:
-            return 0.0
-        val = float(m.group(1))
-        if m.group(2) == '万':
-            val *= 10000
-        return val
-
-    heat_male = []
-    heat_female = []
-    for novel in all_novels:
-        hv = parse_heat(novel)
-        if hv <= 0:
-            continue
-        item = {
-            "title": novel.get("title", ""),
-            "author": novel.get("author", ""),
-            "heat": novel.get("extra", {}).get("heat", ""),
-            "word_count": novel.get("extra", {}).get("word_count", ""),
-            "source": novel.get("source", ""),
-            "book_url": novel.get("book_url", ""),
-            "category": novel.get("category", ""),
-            "_hv": hv,
-        }
-        gender = novel.get("gender", "")
-        if gender == "男频":
-            heat_male.append(item)
-        elif gender == "女频":
-            heat_female.append(item)
-
-    heat_male.sort(key=lambda x: x["_hv"], reverse=True)
-    heat_female.sort(key=lambda x: x["_hv"], reverse=True)
-    # 去掉内部排序字段
-    for lst in (heat_male, heat_female):
-        for item in lst:
-            item.pop("_hv", None)
-
     return jsonify({
         "code": 0,
         "data": {
             "date": day,
-            "total": len(all_novels),
+            "total": summary["total"],
             "source_stats": source_stats,
-            "category_stats": top_categories,
-            "gender_stats": dict(gender_counter),
-            "period_stats": dict(period_counter),
-            "cross_platform": cross_platform[:20],
-            "heat_rank_male": heat_male[:30],
-            "heat_rank_female": heat_female[:30],
+            "category_stats": summary["category_stats"],
+            "gender_stats": summary["gender_stats"],
+            "period_stats": summary["period_stats"],
+            "cross_platform": summary["cross_platform"],
+            "heat_rank_male": summary["heat_rank"].get("男频", []),
+            "heat_rank_female": summary["heat_rank"].get("女频", []),
             "has_data": True,
         },
     })
@@ -550,11 +603,23 @@ def api_dates():
     return jsonify({"code": 0, "data": dates})
 
 
+@app.route("/api/snapshots")
+def api_snapshots():
+    """某数据源某天的日内快照时间列表"""
+    source = request.args.get("source", "fanqie")
+    day = request.args.get("date") or latest_date()
+    return jsonify({"code": 0, "data": list_snapshots(source, day), "date": day})
+
+
+_CATEGORY_BOOK_FIELDS = (
+    "title", "author", "category", "gender", "period", "source", "book_url", "rank", "latest_chapter",
+    "extra", "heat_value",
+)
+
+
 @app.route("/api/category-books")
 def api_category_books():
     """获取指定分类的所有书籍详情，按热度排序"""
-    import re
-
     category = request.args.get("category", "")
     day = request.args.get("date") or latest_date()
     sort_by = request.args.get("sort", "heat")  # heat | rank
@@ -563,50 +628,19 @@ def api_category_books():
     if not category:
         return jsonify({"code": 1, "msg": "缺少 category 参数"})
 
-    def _parse_heat(extra):
-        heat_str = extra.get("heat", "")
-        if not heat_str:
-            return 0.0
-        cleaned = re.sub(r'^[^\d.]*', '', heat_str)
-        m = re.match(r'([\d.]+)\s*(万)?', cleaned)
-        if not m:
-            return 0.0
-        val = float(m.group(1))
-        if m.group(2) == '万':
-            val *= 10000
-        return val
-
-    all_books = []
+    # 每个数据源只取排序后的前 limit 条，再归并
+    sort = "heat" if sort_by == "heat" else "rank"
+    limit = limit if limit and limit > 0 else None
+    total = 0
+    results = []
     for source_key, entry in SCRAPER_REGISTRY.items():
         if not has_data(source_key, day):
             continue
-        data = load_data(source_key, day)
-        for novel in data:
-            if novel.get("category") == category:
-                extra = novel.get("extra", {})
-                all_books.append({
-                    "title": novel.get("title", ""),
-                    "author": novel.get("author", ""),
-                    "category": novel.get("category", ""),
-                    "gender": novel.get("gender", ""),
-                    "period": novel.get("period", ""),
-                    "source": novel.get("source", ""),
-                    "book_url": novel.get("book_url", ""),
-                    "rank": novel.get("rank", 0),
-                    "latest_chapter": novel.get("latest_chapter", ""),
-                    "extra": extra,
-                    "heat_value": _parse_heat(extra),
-                })
-
-    # 按热度降序排列
-    if sort_by == "heat":
-        all_books.sort(key=lambda x: x["heat_value"], reverse=True)
-    else:
-        all_books.sort(key=lambda x: x["rank"])
-
-    total = len(all_books)
-    if limit and limit > 0:
-        all_books = all_books[:limit]
+        total += count_ranks(source_key, day, category=category)
+        results.append(query_ranks(
+            source_key, day, category=category, sort=sort, limit=limit, fields=_CATEGORY_BOOK_FIELDS
+        ))
+    all_books = merge_ranks(results, sort, limit)
 
     return jsonify({
         "code": 0,
@@ -620,66 +654,13 @@ def api_category_books():
 
 @app.route("/api/category-rank")
 def api_category_rank():
-    """分类排行：按各分类在读前10热度值累加倒排"""
-    import re
-    from collections import defaultdict
-
+    """分类排行：按各分类在读前10热度值累加倒排（读每日汇总表）"""
     day = request.args.get("date") or latest_date()
+    category_rank = load_category_rank(day, list(SCRAPER_REGISTRY))
 
-    def _parse_heat(extra):
-        heat_str = extra.get("heat", "")
-        if not heat_str:
-            return 0.0
-        cleaned = re.sub(r'^[^\d.]*', '', heat_str)
-        m = re.match(r'([\d.]+)\s*(万)?', cleaned)
-        if not m:
-            return 0.0
-        val = float(m.group(1))
-        if m.group(2) == '万':
-            val *= 10000
-        return val
-
-    # 收集全部数据
-    all_novels = []
-    for source_key, entry in SCRAPER_REGISTRY.items():
-        if has_data(source_key, day):
-            all_novels.extend(load_data(source_key, day))
-
-    if not all_novels:
+    if not category_rank:
         return jsonify({"code": 0, "data": [], "date": day})
 
-    # 按分类归组，每个分类收集所有热度值
-    cat_books = defaultdict(list)
-    for novel in all_novels:
-        cat = novel.get("category", "未分类")
-        hv = _parse_heat(novel.get("extra", {}))
-        cat_books[cat].append({
-            "title": novel.get("title", ""),
-            "author": novel.get("author", ""),
-            "heat": novel.get("extra", {}).get("heat", ""),
-            "heat_value": hv,
-            "source": novel.get("source", ""),
-            "gender": novel.get("gender", ""),
-            "book_url": novel.get("book_url", ""),
-        })
-
-    # 每个分类取热度前10累加
-    category_rank = []
-    for cat, books in cat_books.items():
-        books.sort(key=lambda x: x["heat_value"], reverse=True)
-        top10 = books[:10]
-        total_heat = sum(b["heat_value"] for b in top10)
-        category_rank.append({
-            "category": cat,
-            "total_heat": total_heat,
-            "book_count": len(books),
-            "top10_count": len(top10),
-            "top10": top10,
-        })
-
-    # 按累加热度倒排
-    category_rank.sort(key=lambda x: x["total_heat"], reverse=True)
-
     return jsonify({
         "code": 0,
         "data": category_rank,
@@ -694,11 +675,12 @@ def api_novel_trend():
     title = request.args.get("title", "").strip()
     source = request.args.get("source") or None
     limit = request.args.get("limit", 30, type=int)
+    intraday = request.args.get("intraday", "0") == "1"
 
     if not title:
         return jsonify({"code": 1, "msg": "缺少 title 参数"})
 
-    data = get_novel_trend(title, source=source, limit=limit)
+    data = get_novel_trend(title, source=source, limit=limit, intraday=intraday)
     return jsonify({
         "code": 0,
         "data": data,
@@ -707,6 +689,25 @@ def api_novel_trend():
     })
 
 
+@app.route("/api/stats/http")
+def api_stats_http():
+    """HTTP 连接池复用统计 + 各主机限速器 / 各数据源熔断器 / 解析进程池 / 数据库连接 / 数据缓存状态"""
+    data = client_stats()
+    data["rate_limits"] = limiter_stats()
+    data["circuit_breakers"] = breaker_stats()
+    data["parse_pool"] = parse_pool_stats()
+    data["db"] = connection_stats()
+    data["snapshot_cache"] = snapshot_cache_stats()
+    return jsonify({"code": 0, "data": data})
+
+
+@app.route("/api/stats/queue")
+def api_stats_queue():
+    """抓取任务队列各数据源各状态的任务数"""
+    day = request.args.get("date") or None
+    return jsonify({"code": 0, "data": queue_stats(day)})
+
+
 @app.route("/api/feishu/push", methods=["POST"])
 def api_feishu_push():
     """推送到飞书"""
@@ -784,6 +785,7 @@ def api_settings_save():
 
     # 重新调度
     _schedule_next()
+    _schedule_hot()
 
     return jsonify({
         "code": 0,
@@ -812,7 +814,7 @@ def api_notify():
     results = {}
     for source_key, entry in SCRAPER_REGISTRY.items():
         if has_data(source_key, day):
-            data = load_data(source_key, day)
+            data = load_data(source_key, day, fields=("rank",))
             results[source_key] = {"name": entry["name"], "count": len(data), "from_storage": True}
         else:
             results[source_key] = {"name": entry["name"], "count": 0, "from_storage": False}
@@ -1030,6 +1032,8 @@ def _auto_start_tomato():
 if __name__ == "__main__":
     # 初始化数据库 & 启动时自动调度
     init_db()
+    configure_snapshot_cache(load_config().get("storage", {}).get("snapshot_cache_mb", 64))
     _schedule_next()
+    _schedule_hot()
     _auto_start_tomato()
     app.run(host="0.0.0.0", port=8081, debug=True)
@@ -1,11 +1,21 @@
-"""数据存储层 - SQLite 存储，每条记录含常用字段 + 完整 JSON"""
+"""数据存储层 - SQLite 存储，书籍 / 榜单 / 分类维度表 + 排名事实表，同一天可有多个快照"""
 
+import atexit
+import hashlib
+import heapq
+import itertools
 import json
 import os
 import re
 import sqlite3
+import sys
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
 from datetime import date, datetime
-from typing import Optional
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
 
 from models.novel import NovelRank
 
@@ -16,48 +26,505 @@ DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nove
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 
 
-def _get_conn() -> sqlite3.Connection:
-    """获取数据库连接"""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+# 每个连接打开时设置的参数（journal_mode=WAL 写在库文件里，由 init_db 设置一次）
+_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",     # WAL 下只在检查点 fsync，断电最多丢最后几个事务
+    "PRAGMA cache_size=-16000",      # 页缓存 16 MB
+    "PRAGMA mmap_size=268435456",    # 最多 256 MB 内存映射读
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionManager:
+    """
+    按线程持有的持久 SQLite 连接
+
+    每个线程第一次访问时打开连接并设置 _PRAGMAS，之后一直复用，连接自带的
+    语句缓存（cached_statements）使相同 SQL 不必重复编译。线程退出后其连接在
+    下次有新线程打开连接时关闭；close_all() 关闭全部连接（进程退出时自动调用），
+    之后再访问会重新打开。
+    """
+
+    def __init__(self, path: str, cached_statements: int = 256, timeout: float = 30):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: list[tuple[weakref.ref, sqlite3.Connection]] = []
+        self._generation = 0
+        self._pid = os.getpid()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation and self._pid == os.getpid():
+            return conn
+
+        if self._pid != os.getpid():
+            # fork 出的子进程不能使用父进程的连接
+            with self._lock:
+                self._conns = []
+                self._pid = os.getpid()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=self.timeout,
+            cached_statements=self.cached_statements, check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+
+        with self._lock:
+            # 顺便关闭已退出线程的连接（Web 服务器每个请求可能是新线程）
+            alive = []
+            for ref, other in self._conns:
+                thread = ref()
+                if thread is None or not thread.is_alive():
+                    other.close()
+                else:
+                    alive.append((ref, other))
+            alive.append((weakref.ref(threading.current_thread()), conn))
+            self._conns = alive
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def close_all(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for _, conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"connections": len(self._conns)}
+
+
+_connections = ConnectionManager(DB_PATH)
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    获取当前线程的数据库连接，也供在同一个库里建表的模块（如任务队列）使用
+
+    连接按线程持久复用（见 ConnectionManager），调用方不要关闭。
+    """
+    return _connections.get()
+
+
+@atexit.register
+def close_all():
+    """关闭全部数据库连接（进程退出时自动调用）"""
+    _connections.close_all()
+
+
+def connection_stats() -> dict:
+    """当前打开的数据库连接数"""
+    return _connections.stats()
+
+
+# load_data 结果缓存的默认内存预算（MB），可用 configure_snapshot_cache 调整
+SNAPSHOT_CACHE_MB = 64
+
+
+class SnapshotCache:
+    """
+    load_data 结果的进程内 LRU 缓存，按内存预算淘汰
+
+    键为 (source, date, 快照, 投影, 筛选 / 排序条件)，每个条目记下加载时该数据源该天的
+    数据版本（data_versions）。写入有改动时在同一事务内递增版本，取缓存时版本
+    不一致即视为失效，其他进程（如队列 worker）写入的数据也不会读到旧值；
+    本进程写入后还会立即丢弃相关条目。缓存的行不直接交给调用方，取出时复制。
+    书籍维度（书名、简介等取最近一次抓取的值）被其他日期的写入更新时不影响
+    版本，已缓存的条目保留旧值直到被淘汰。
+    """
+
+    def __init__(self, max_mb: float = SNAPSHOT_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[int, list, int]] = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: tuple, version: int) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                self._drop(key)
+                self._stats["invalidations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: tuple, version: int, rows: list):
+        size = _rows_size(rows)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (version, rows, size)
+            self._bytes += size
+            self._evict()
+
+    def invalidate(self, source: str, day: str):
+        """丢弃某数据源某天的全部条目"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == source and k[1] == day]:
+                self._drop(key)
+                self._stats["invalidations"] += 1
+
+    def resize(self, max_mb: float):
+        with self._lock:
+            self.max_bytes = int(max_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "mb": round(self._bytes / 1024 / 1024, 2),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            }
+
+    def _drop(self, key: tuple):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+
+
+def _rows_size(rows: list) -> int:
+    """估算 load_data 结果占用的内存（字节）：列表 + 每行字典及其值，字段名不计"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row.values():
+            size += sys.getsizeof(value)
+            if isinstance(value, dict):
+                size += sum(sys.getsizeof(v) for v in value.values())
+    return size
+
+
+def _copy_rows(rows: list) -> list[dict]:
+    """复制缓存中的行（extra 字典一并复制），调用方可以随意修改"""
+    result = []
+    for row in rows:
+        row = dict(row)
+        if "extra" in row:
+            row["extra"] = dict(row["extra"])
+        result.append(row)
+    return result
+
+
+_snapshot_cache = SnapshotCache()
+
+
+def configure_snapshot_cache(max_mb: float):
+    """设置 load_data 结果缓存的内存预算（MB），0 表示不缓存"""
+    _snapshot_cache.resize(max_mb)
+
+
+def snapshot_cache_stats() -> dict:
+    """load_data 结果缓存的命中 / 未命中 / 淘汰 / 失效次数和占用内存"""
+    return _snapshot_cache.stats()
+
+
+def _data_version(conn: sqlite3.Connection, source: str, day: str) -> int:
+    row = conn.execute("SELECT version FROM data_versions WHERE source=? AND date=?", (source, day)).fetchone()
+    return row[0] if row else 0
+
+
+def _bump_version(conn: sqlite3.Connection, source: str, day: str):
+    """在写入事务内递增数据版本（使各进程中该数据源该天的缓存失效）"""
+    conn.execute("""
+        INSERT INTO data_versions (source, date, version) VALUES (?, ?, 1)
+        ON CONFLICT (source, date) DO UPDATE SET version=version+1
+    """, (source, day))
 
 
 def init_db():
-    """创建表和索引"""
-    conn = _get_conn()
+    """创建表、索引和兼容视图；旧版单表 novel_ranks 自动迁移为规范化结构"""
+    conn = get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
     conn.executescript("""
-        CREATE TABLE IF NOT EXISTS novel_ranks (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            date        TEXT NOT NULL,
+        -- 书籍维度：每个数据源的每本书一行（native_id 取自 book_url），
+        -- 书名 / 作者 / 链接 / 简介只存一份，取最近一次抓取的值（不是历史值；
+        -- 各天各快照当时的书名和作者见 rank_facts.title / author）
+        CREATE TABLE IF NOT EXISTS books (
+            id          INTEGER PRIMARY KEY,
             source      TEXT NOT NULL,
-            source_name TEXT NOT NULL DEFAULT '',
-            rank        INTEGER NOT NULL,
+            native_id   TEXT NOT NULL,
             title       TEXT NOT NULL,
             author      TEXT NOT NULL DEFAULT '',
-            category    TEXT NOT NULL DEFAULT '',
+            book_url    TEXT NOT NULL DEFAULT '',
+            author_url  TEXT NOT NULL DEFAULT '',
+            intro       BLOB NOT NULL DEFAULT '',     -- 压缩存储，见 _pack
+            updated_at  TEXT NOT NULL,
+            UNIQUE (source, native_id)
+        );
+
+        -- 榜单维度：数据源 + 榜单键 + 频道 + 榜单类型
+        CREATE TABLE IF NOT EXISTS rank_lists (
+            id          INTEGER PRIMARY KEY,
+            source      TEXT NOT NULL,
+            source_name TEXT NOT NULL DEFAULT '',
+            list_key    TEXT NOT NULL DEFAULT '',
             gender      TEXT NOT NULL DEFAULT '',
             period      TEXT NOT NULL DEFAULT '',
-            book_url    TEXT DEFAULT '',
-            heat        TEXT DEFAULT '',
-            heat_value  REAL DEFAULT 0,
-            raw_json    TEXT NOT NULL,
-            created_at  TEXT NOT NULL
+            UNIQUE (source, list_key, gender, period, source_name)
+        );
+
+        CREATE TABLE IF NOT EXISTS categories (
+            id          INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL UNIQUE
+        );
+
+        -- 排名事实：某个快照中一本书在一个榜单上的排名和热度
+        CREATE TABLE IF NOT EXISTS rank_facts (
+            id             INTEGER PRIMARY KEY,
+            date           TEXT NOT NULL,
+            snapshot       TEXT NOT NULL,
+            list_id        INTEGER NOT NULL REFERENCES rank_lists(id),
+            book_id        INTEGER NOT NULL REFERENCES books(id),
+            category_id    INTEGER NOT NULL REFERENCES categories(id),
+            rank           INTEGER NOT NULL,
+            heat           TEXT NOT NULL DEFAULT '',
+            heat_value     REAL NOT NULL DEFAULT 0,
+            latest_chapter TEXT NOT NULL DEFAULT '',
+            extra          BLOB NOT NULL DEFAULT '',   -- 其余字段（JSON，压缩存储），没有为空串
+            title          TEXT NOT NULL DEFAULT '',   -- 抓取当时的书名 / 作者（改名后旧数据不变）
+            author         TEXT NOT NULL DEFAULT ''
+        );
+
+        -- 分榜单抓取断点：记录某数据源某天已入库的榜单
+        CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+            source      TEXT NOT NULL,
+            date        TEXT NOT NULL,
+            list_key    TEXT NOT NULL,
+            count       INTEGER NOT NULL DEFAULT 0,
+            updated_at  TEXT NOT NULL,
+            PRIMARY KEY (source, date, list_key)
         );
 
-        CREATE INDEX IF NOT EXISTS idx_date ON novel_ranks(date);
-        CREATE INDEX IF NOT EXISTS idx_source ON novel_ranks(source, date);
-        CREATE INDEX IF NOT EXISTS idx_title ON novel_ranks(title);
-        CREATE INDEX IF NOT EXISTS idx_author ON novel_ranks(author);
-        CREATE INDEX IF NOT EXISTS idx_category ON novel_ranks(category, date);
-        CREATE INDEX IF NOT EXISTS idx_gender ON novel_ranks(gender, date);
-        CREATE INDEX IF NOT EXISTS idx_title_source ON novel_ranks(title, source, date);
+        -- 数据版本：某数据源某天的排名数据每次有改动都递增，用于校验进程内缓存
+        CREATE TABLE IF NOT EXISTS data_versions (
+            source      TEXT NOT NULL,
+            date        TEXT NOT NULL,
+            version     INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, date)
+        );
+
+        -- 每日汇总：每个数据源每天一份，由当天各榜单最新快照算出，写入排名数据时
+        -- 在同一事务内重算（见 _refresh_summary）；version 为计算时的数据版本
+        CREATE TABLE IF NOT EXISTS day_summaries (
+            date        TEXT NOT NULL,
+            source      TEXT NOT NULL,
+            version     INTEGER NOT NULL,
+            total       INTEGER NOT NULL,
+            PRIMARY KEY (date, source)
+        );
+
+        -- 分类 / 频道 / 榜单类型的条数，first_pos 为该值按排名顺序首次出现的位置
+        CREATE TABLE IF NOT EXISTS day_counts (
+            date        TEXT NOT NULL,
+            source      TEXT NOT NULL,
+            dim         TEXT NOT NULL,    -- category / gender / period
+            value       TEXT NOT NULL,
+            count       INTEGER NOT NULL,
+            first_pos   INTEGER NOT NULL,
+            PRIMARY KEY (date, source, dim, value)
+        );
+
+        -- 每个书名首次出现的记录（跨平台统计）
+        CREATE TABLE IF NOT EXISTS day_titles (
+            date        TEXT NOT NULL,
+            source      TEXT NOT NULL,
+            source_name TEXT NOT NULL,
+            title       TEXT NOT NULL,
+            first_pos   INTEGER NOT NULL,
+            author      TEXT NOT NULL,
+            category    TEXT NOT NULL,
+            book_url    TEXT NOT NULL,
+            PRIMARY KEY (date, source, source_name, title)
+        );
+
+        -- 热度前 N：kind='heat' 按频道取有热度的前 _HEAT_TOP 条，
+        -- kind='category' 按分类取前 _CATEGORY_TOP 条；pos 为按排名顺序的位置
+        CREATE TABLE IF NOT EXISTS day_top_books (
+            date        TEXT NOT NULL,
+            source      TEXT NOT NULL,
+            kind        TEXT NOT NULL,
+            key         TEXT NOT NULL,
+            pos         INTEGER NOT NULL,
+            title       TEXT NOT NULL,
+            author      TEXT NOT NULL,
+            category    TEXT NOT NULL,
+            gender      TEXT NOT NULL,
+            source_name TEXT NOT NULL,
+            book_url    TEXT NOT NULL,
+            heat        TEXT NOT NULL,
+            heat_value  REAL NOT NULL,
+            word_count  TEXT NOT NULL,
+            PRIMARY KEY (date, source, kind, key, pos)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_day_titles ON day_titles(date, title);
+        CREATE INDEX IF NOT EXISTS idx_facts_list ON rank_facts(list_id, date, snapshot);
+        CREATE INDEX IF NOT EXISTS idx_facts_date ON rank_facts(date);
+        CREATE INDEX IF NOT EXISTS idx_facts_category ON rank_facts(date, category_id, heat_value);
+        CREATE INDEX IF NOT EXISTS idx_facts_book ON rank_facts(book_id, date);
+        CREATE INDEX IF NOT EXISTS idx_books_title ON books(title);
     """)
     conn.commit()
-    conn.close()
+    _add_fact_names(conn)
+
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name='novel_ranks'").fetchone()
+    if row is not None and row["type"] == "table":
+        _migrate_novel_ranks(conn)
+
+    # novel_ranks 视图保持旧的宽表形状，供按书名 / 日期等条件查询
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='view' AND name='novel_ranks'").fetchone()
+    if row is None or row["sql"] != _VIEW_SQL:
+        with conn:
+            conn.execute("DROP VIEW IF EXISTS novel_ranks")
+            conn.execute(_VIEW_SQL)
+
+    # user_version 1：简介和其余字段改为压缩存储
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+        _compress_payloads(conn)
+        conn.execute("PRAGMA user_version=1")
+
+
+_VIEW_SQL = """CREATE VIEW novel_ranks AS
+    SELECT f.id, f.date, f.snapshot, l.source, l.source_name, l.list_key, l.gender, l.period,
+           f.rank, f.title, f.author, c.name AS category, b.book_url, b.author_url, b.intro,
+           f.heat, f.heat_value, f.latest_chapter, f.extra, f.list_id, f.book_id, f.category_id
+    FROM rank_facts f
+    JOIN rank_lists l ON l.id = f.list_id
+    JOIN books b ON b.id = f.book_id
+    JOIN categories c ON c.id = f.category_id"""
+
+
+def _add_fact_names(conn: sqlite3.Connection):
+    """
+    旧库的 rank_facts 没有 title / author 列时补上
+
+    已有的行只能取 books 中现存的（最近一次抓取的）书名和作者。
+    """
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(rank_facts)")}
+    if "title" in columns:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_title ON rank_facts(title)")
+        return
+    with conn:
+        conn.execute("ALTER TABLE rank_facts ADD COLUMN title TEXT NOT NULL DEFAULT ''")
+        conn.execute("ALTER TABLE rank_facts ADD COLUMN author TEXT NOT NULL DEFAULT ''")
+        conn.execute("""
+            UPDATE rank_facts SET
+                title=(SELECT title FROM books WHERE books.id=rank_facts.book_id),
+                author=(SELECT author FROM books WHERE books.id=rank_facts.book_id)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_title ON rank_facts(title)")
+
+
+def _migrate_novel_ranks(conn: sqlite3.Connection):
+    """旧版单表 novel_ranks（每行带完整 raw_json）-> books / rank_lists / categories / rank_facts"""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(novel_ranks)")}
+    list_key = "list_key" if "list_key" in columns else "''"
+    snapshot = "snapshot" if "snapshot" in columns else "substr(created_at, 1, 19)"
+    total = conn.execute("SELECT COUNT(*) FROM novel_ranks").fetchone()[0]
+    print(f"[migrate] novel_ranks -> rank_facts ({total} records) ...")
+
+    cur = conn.execute(f"""
+        SELECT source, date, {list_key} AS list_key, {snapshot} AS snapshot, raw_json
+        FROM novel_ranks ORDER BY date, snapshot, id
+    """)
+    dims = _Dimensions(conn)
+    with conn:
+        while True:
+            batch = cur.fetchmany(2000)
+            if not batch:
+                break
+            conn.executemany(_INSERT_FACT, [
+                dims.fact(row["source"], row["date"], row["snapshot"], row["list_key"],
+                          json.loads(row["raw_json"]))
+                for row in batch
+            ])
+        conn.execute("DROP TABLE novel_ranks")
+    conn.execute("VACUUM")
+    print(f"[migrate] done, {len(dims.books)} books")
+
+
+def _compress_payloads(conn: sqlite3.Connection):
+    """把未压缩的 books.intro / rank_facts.extra 旧值改为压缩存储"""
+    with conn:
+        for table, column in (("books", "intro"), ("rank_facts", "extra")):
+            rows = conn.execute(
+                f"SELECT id, {column} FROM {table} WHERE typeof({column})='text' AND {column} != ''"
+            ).fetchall()
+            packed = [(_pack(row[1]), row[0]) for row in rows]
+            conn.executemany(
+                f"UPDATE {table} SET {column}=? WHERE id=?",
+                [item for item in packed if isinstance(item[0], bytes)],
+            )
+
+
+# 压缩列（books.intro、rank_facts.extra）共用的预置字典：单个值只有几十到几百字节，
+# 没有字典基本压不动。放常见的 JSON 键值和简介用词，越常用越靠后。
+# 修改字典后旧数据无法解码，须同时换用新的格式标记
+_ZDICT = (
+    "主角系统重生穿越修仙玄幻都市总裁豪门甜宠逆袭天才少年少女世界然而竟然没想到这一世"
+    '{"extra": {"read_count": 0, "status": "已完结", "status": "连载中", "word_count": "万字"}}'
+).encode("utf-8")
+_PACK_V1 = b"\x01"
+
+
+def _pack(text: str):
+    """
+    文本 -> 压缩列的值：raw deflate + 预置字典，首字节为格式标记（bytes）；
+    空文本存空串，压缩后不更短的短文本按原文（str）存储
+    """
+    if not text:
+        return ""
+    raw = text.encode("utf-8")
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=_ZDICT)
+    packed = _PACK_V1 + compressor.compress(raw) + compressor.flush()
+    return packed if len(packed) < len(raw) else text
+
+
+def _unpack(value) -> str:
+    """压缩列的值 -> 文本"""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value
+    if value[:1] != _PACK_V1:
+        raise ValueError(f"未知的压缩格式: {value[:1]!r}")
+    decompressor = zlib.decompressobj(-15, zdict=_ZDICT)
+    return (decompressor.decompress(value[1:]) + decompressor.flush()).decode("utf-8")
 
 
 def parse_heat_value(heat_str: str) -> float:
@@ -78,136 +545,657 @@ def today_str() -> str:
     return date.today().isoformat()
 
 
+def snapshot_str() -> str:
+    """当前快照时间，如 2026-02-23T08:30:00"""
+    return datetime.now().isoformat(timespec="seconds")
+
+
+_INSERT_FACT = """
+    INSERT INTO rank_facts
+        (date, snapshot, list_id, book_id, category_id, rank, heat, heat_value, latest_chapter, extra,
+         title, author)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# NovelRank 字典中有专门列的字段，其余字段存入 rank_facts.extra
+_COLUMN_FIELDS = {
+    "rank", "title", "author", "category", "gender", "period",
+    "latest_chapter", "book_url", "author_url", "source", "extra",
+}
+
+# 还原记录所需的 novel_ranks 视图列
+_RECORD_COLUMNS = (
+    "rank, title, author, category, gender, period, latest_chapter, book_url, author_url, "
+    "source_name, heat, intro, extra"
+)
+
+# 投影时可以直接取列、不用解码压缩列的字段 -> novel_ranks 视图列
+# （heat / heat_value 投影时作为顶层字段返回）
+_TYPED_FIELDS = {
+    "rank": "rank", "title": "title", "author": "author", "category": "category",
+    "gender": "gender", "period": "period", "latest_chapter": "latest_chapter",
+    "book_url": "book_url", "author_url": "author_url", "source": "source_name",
+    "heat": "heat", "heat_value": "heat_value",
+}
+
+# 每个榜单取不晚于 as_of 的最新快照（as_of 为 NULL 时取最新）
+_LATEST_SNAPSHOT = """
+    snapshot = (
+        SELECT MAX(m.snapshot) FROM rank_facts m
+        WHERE m.list_id=novel_ranks.list_id AND m.date=novel_ranks.date
+          AND (? IS NULL OR m.snapshot <= ?)
+    )
+"""
+
+# 某数据源的全部榜单 id（rank_facts 按 list_id 索引）
+_SOURCE_LISTS = "list_id IN (SELECT id FROM rank_lists WHERE source=?)"
+
+# query_ranks 的排序方式 -> 单个数据源内的 ORDER BY
+_SORT_ORDERS = {
+    "rank": "rank, id",
+    "category": "category, rank, id",
+    "gender": "gender, rank, id",
+    "period": "period, rank, id",
+    "heat": "heat_value DESC, rank, id",
+}
+
+# 与 _SORT_ORDERS 一致的排序键，merge_ranks 归并多个数据源的结果时使用
+_SORT_KEYS = {
+    "rank": lambda r: r["rank"],
+    "category": lambda r: (r["category"], r["rank"]),
+    "gender": lambda r: (r["gender"], r["rank"]),
+    "period": lambda r: (r["period"], r["rank"]),
+    "heat": lambda r: -r["heat_value"],
+}
+
+
+def native_book_id(book_url: str, title: str = "", author: str = "") -> str:
+    """
+    书籍在站点上的 ID：取 book_url 路径的最后一段（去掉 .html 等扩展名），
+    如 /page/7143038691944959011、/shuku/1234/、/book/8040185.html；
+    没有链接时用书名 + 作者的哈希（以 # 开头）
+    """
+    if book_url:
+        segment = urlsplit(book_url).path.rstrip("/").rsplit("/", 1)[-1]
+        segment = re.sub(r"\.s?html?$", "", segment)
+        if segment:
+            return segment
+    return "#" + hashlib.sha1(f"{title}\0{author}".encode("utf-8")).hexdigest()[:16]
+
+
+class _Dimensions:
+    """写入排名事实时查找（必要时创建）书籍 / 榜单 / 分类的 id，同一批写入内缓存"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.lists: dict[tuple, int] = {}
+        self.categories: dict[str, int] = {}
+        self.books: dict[tuple, int] = {}
+
+    def list_id(self, source: str, source_name: str, list_key: str, gender: str, period: str) -> int:
+        key = (source, list_key, gender, period, source_name)
+        if key not in self.lists:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO rank_lists (source, list_key, gender, period, source_name)
+                VALUES (?, ?, ?, ?, ?)
+            """, key)
+            self.lists[key] = self.conn.execute("""
+                SELECT id FROM rank_lists
+                WHERE source=? AND list_key=? AND gender=? AND period=? AND source_name=?
+            """, key).fetchone()[0]
+        return self.lists[key]
+
+    def category_id(self, name: str) -> int:
+        if name not in self.categories:
+            self.conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            self.categories[name] = self.conn.execute(
+                "SELECT id FROM categories WHERE name=?", (name,)
+            ).fetchone()[0]
+        return self.categories[name]
+
+    def book_id(self, source: str, d: dict, intro: str, snapshot: str) -> int:
+        native_id = native_book_id(d.get("book_url", ""), d.get("title", ""), d.get("author", ""))
+        key = (source, native_id)
+        if key not in self.books:
+            # 只用不早于现有记录的数据更新书籍信息（回填历史日期时不覆盖新数据）
+            self.conn.execute("""
+                INSERT INTO books (source, native_id, title, author, book_url, author_url, intro, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, native_id) DO UPDATE SET
+                    title=excluded.title, author=excluded.author, book_url=excluded.book_url,
+                    author_url=CASE WHEN excluded.author_url != '' THEN excluded.author_url ELSE author_url END,
+                    intro=CASE WHEN excluded.intro != '' THEN excluded.intro ELSE intro END,
+                    updated_at=excluded.updated_at
+                WHERE excluded.updated_at >= books.updated_at AND (
+                    excluded.updated_at != books.updated_at OR excluded.title != books.title
+                    OR excluded.author != books.author OR excluded.book_url != books.book_url
+                    OR excluded.author_url NOT IN ('', books.author_url)
+                    OR excluded.intro NOT IN ('', books.intro)
+                )
+            """, (source, native_id, d.get("title", ""), d.get("author", ""), d.get("book_url", "") or "",
+                  d.get("author_url", "") or "", _pack(intro), snapshot))
+            self.books[key] = self.conn.execute(
+                "SELECT id FROM books WHERE source=? AND native_id=?", key
+            ).fetchone()[0]
+        return self.books[key]
+
+    def fact(self, source: str, day: str, snapshot: str, list_key: str, d: dict) -> tuple:
+        """NovelRank 字典 -> rank_facts 行"""
+        extra = dict(d.get("extra") or {})
+        heat = extra.pop("heat", "") or ""
+        intro = extra.pop("intro", "") or ""
+        rest = {k: v for k, v in d.items() if k not in _COLUMN_FIELDS}
+        if extra:
+            rest["extra"] = extra
+        return (
+            day,
+            snapshot,
+            self.list_id(source, d.get("source", ""), list_key, d.get("gender", ""), d.get("period", "")),
+            self.book_id(source, d, intro, snapshot),
+            self.category_id(d.get("category", "")),
+            d.get("rank", 0),
+            heat,
+            parse_heat_value(heat),
+            d.get("latest_chapter", "") or "",
+            _pack(json.dumps(rest, ensure_ascii=False)) if rest else "",
+            d.get("title", "") or "",
+            d.get("author", "") or "",
+        )
+
+
+def _insert_records(conn: sqlite3.Connection, source: str, day: str, snapshot: str,
+                    list_key: str, records: list[dict]) -> int:
+    dims = _Dimensions(conn)
+    conn.executemany(_INSERT_FACT, [dims.fact(source, day, snapshot, list_key, d) for d in records])
+    return len(records)
+
+
+# 差异写入比较的 rank_facts 列（date 由写入范围固定）
+_FACT_COLUMNS = (
+    "snapshot", "list_id", "book_id", "category_id", "rank", "heat", "heat_value", "latest_chapter", "extra",
+    "title", "author",
+)
+
+
+def _write_diff(conn: sqlite3.Connection, source: str, day: str, snapshot: str, list_key: str,
+                records: list[dict], scope: str, params: tuple) -> dict:
+    """
+    把写入范围内的现有排名事实改写为 records，只改动有差异的行
+
+    scope 为限定现有行的条件（rank_facts 别名 f）。新旧行按自然键
+    （频道, 榜单类型, 来源名, 分类, 排名）配对：内容相同的不动，不同的原地
+    UPDATE，多出的新行 INSERT，没配上的旧行 DELETE。键重复时按快照新旧、
+    写入先后依次配对。调用方负责事务。
+
+    Returns:
+        dict: {"inserted": 新增行数, "updated": 更新行数, "deleted": 删除行数}
+    """
+    dims = _Dimensions(conn)
+    facts = [dims.fact(source, day, snapshot, list_key, d) for d in records]
+    labels = {list_id: key[2:] for key, list_id in dims.lists.items()}
+
+    existing: dict[tuple, list] = {}
+    rows = conn.execute(f"""
+        SELECT f.id, {", ".join("f." + c for c in _FACT_COLUMNS)}, l.gender, l.period, l.source_name
+        FROM rank_facts f JOIN rank_lists l ON l.id = f.list_id
+        WHERE {scope}
+        ORDER BY f.snapshot, f.id DESC
+    """, params).fetchall()
+    for row in rows:
+        key = (row["gender"], row["period"], row["source_name"], row["category_id"], row["rank"])
+        existing.setdefault(key, []).append(row)
+
+    inserts, updates = [], []
+    for fact in facts:
+        values = fact[1:]
+        key = (*labels[fact[2]], fact[4], fact[5])
+        matches = existing.get(key)
+        if not matches:
+            inserts.append(fact)
+            continue
+        row = matches.pop()  # 最新快照中最早写入的一行
+        if tuple(row[c] for c in _FACT_COLUMNS) != values:
+            updates.append((*values, row["id"]))
+    deletes = [(row["id"],) for matches in existing.values() for row in matches]
+
+    if deletes:
+        conn.executemany("DELETE FROM rank_facts WHERE id=?", deletes)
+    if updates:
+        conn.executemany(
+            f"UPDATE rank_facts SET {', '.join(c + '=?' for c in _FACT_COLUMNS)} WHERE id=?", updates
+        )
+    if inserts:
+        conn.executemany(_INSERT_FACT, inserts)
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+
+
+def _adopt_legacy_rows(conn: sqlite3.Connection, source: str, day: str, list_key: str,
+                       records: list[dict]) -> int:
+    """
+    把当天未标记榜单的旧行（旧版整天写入 / save_data 写入）中属于该榜单的部分
+    改挂到该榜单上，快照时间不变；返回改挂的行数
+
+    按 (来源名, 频道, 榜单类型, 分类) 与 records 相同来认领，其余旧行原样保留，
+    不会因为写入别的榜单被改写或删除。改挂后不再是未标记的行，只迁移一次。
+    """
+    if not list_key:
+        return 0
+    dims = _Dimensions(conn)
+    groups: dict[tuple, set] = {}
+    for d in records:
+        labels = (d.get("source", ""), d.get("gender", ""), d.get("period", ""))
+        groups.setdefault(labels, set()).add(d.get("category", ""))
+
+    adopted = 0
+    for (source_name, gender, period), categories in groups.items():
+        legacy = conn.execute("""
+            SELECT id FROM rank_lists
+            WHERE source=? AND list_key='' AND gender=? AND period=? AND source_name=?
+        """, (source, gender, period, source_name)).fetchone()
+        if legacy is None:
+            continue
+        category_ids = [dims.category_id(c) for c in categories]
+        cur = conn.execute(f"""
+            UPDATE rank_facts SET list_id=?
+            WHERE list_id=? AND date=? AND category_id IN ({",".join("?" * len(category_ids))})
+        """, (dims.list_id(source, source_name, list_key, gender, period), legacy["id"], day, *category_ids))
+        adopted += cur.rowcount
+    return adopted
+
+
+def _diff_summary(counts: dict) -> str:
+    return f"+{counts['inserted']} ~{counts['updated']} -{counts['deleted']}"
+
+
+def _record(row) -> dict:
+    """
+    novel_ranks 视图行 -> NovelRank 字典
+
+    排名、书名、作者、分类等为入库时的值；book_url / author_url / 简介取自
+    books，是该书最近一次抓取的值，不随日期回溯，与当天的 to_dict() 可能不同。
+    """
+    rest = json.loads(_unpack(row["extra"])) if row["extra"] else {}
+    extra = {"heat": row["heat"]} if row["heat"] else {}
+    extra.update(rest.pop("extra", {}))
+    if row["intro"]:
+        extra["intro"] = _unpack(row["intro"])
+    return {
+        "rank": row["rank"],
+        "title": row["title"],
+        "author": row["author"],
+        "category": row["category"],
+        "gender": row["gender"],
+        "period": row["period"],
+        "latest_chapter": row["latest_chapter"],
+        "book_url": row["book_url"],
+        "author_url": row["author_url"],
+        "source": row["source_name"],
+        "extra": extra,
+        **rest,
+    }
+
+
+def _projection(fields: Optional[tuple]):
+    """
+    投影字段 -> (SELECT 的视图列, 行 -> 字典的函数)
+
+    fields 为 None 时还原完整记录。类型列之外的字段才解码压缩列：intro 只解码
+    简介，extra 还原完整的 extra 字典，其余字段（如 word_count）从 rank_facts.extra
+    中取，没有为 None。
+    """
+    if fields is None:
+        return _RECORD_COLUMNS, _record
+    if all(f in _TYPED_FIELDS for f in fields):
+        columns = ", ".join(dict.fromkeys(_TYPED_FIELDS[f] for f in fields))
+        return columns, lambda row: {f: row[_TYPED_FIELDS[f]] for f in fields}
+
+    def build(row) -> dict:
+        result = {}
+        rest = None
+        for f in fields:
+            if f in _TYPED_FIELDS:
+                result[f] = row[_TYPED_FIELDS[f]]
+            elif f == "intro":
+                result[f] = _unpack(row["intro"])
+            elif f == "extra":
+                result[f] = _record(row)["extra"]
+            else:
+                if rest is None:
+                    rest = json.loads(_unpack(row["extra"])) if row["extra"] else {}
+                result[f] = rest[f] if f in rest else rest.get("extra", {}).get(f)
+        return result
+
+    return _RECORD_COLUMNS + ", heat_value", build
+
+
 def has_data(source: str, day: Optional[str] = None) -> bool:
     """检查指定数据源某天是否有数据"""
     day = day or today_str()
-    conn = _get_conn()
+    conn = get_connection()
     row = conn.execute(
-        "SELECT COUNT(*) as cnt FROM novel_ranks WHERE source=? AND date=?",
-        (source, day)
+        f"SELECT 1 FROM rank_facts WHERE date=? AND {_SOURCE_LISTS} LIMIT 1",
+        (day, source)
     ).fetchone()
-    conn.close()
-    return row["cnt"] > 0
+    return row is not None
+
 
+def save_data(source: str, novels: list[NovelRank], day: Optional[str] = None) -> dict:
+    """
+    保存抓取结果到 SQLite（整天覆盖写入，当天其他快照一并删除；
+    空结果不会覆盖已有数据）。用于重新解析回填等整天重建的场景。
 
-def save_data(source: str, novels: list[NovelRank], day: Optional[str] = None):
-    """保存抓取结果到 SQLite"""
+    按差异写入：沿用当天最新的快照时间（没有数据时为当前时间），与现有数据
+    相同的行不改动，重复写入同样的结果不产生任何写操作。
+
+    Returns:
+        dict: {"inserted": 新增行数, "updated": 更新行数, "deleted": 删除行数}
+    """
     day = day or today_str()
-    conn = _get_conn()
+    if not novels and has_data(source, day):
+        print(f"  [skip] empty result, keep existing data ({source}, {day})")
+        return {"inserted": 0, "updated": 0, "deleted": 0}
+
+    conn = get_connection()
+    with conn:
+        row = conn.execute(
+            f"SELECT MAX(snapshot) FROM rank_facts WHERE date=? AND {_SOURCE_LISTS}", (day, source)
+        ).fetchone()
+        snapshot = row[0] or snapshot_str()
+        counts = _write_diff(
+            conn, source, day, snapshot, "", [n.to_dict() for n in novels],
+            "f.date=? AND l.source=?", (day, source),
+        )
+        # 分榜单断点随之失效
+        conn.execute("DELETE FROM scrape_checkpoints WHERE source=? AND date=?", (source, day))
+        if any(counts.values()):
+            _bump_version(conn, source, day)
+            _refresh_summary(conn, source, day)
+    if any(counts.values()):
+        _snapshot_cache.invalidate(source, day)
+    print(f"  [save] {len(novels)} records -> SQLite ({source}, {day}) {_diff_summary(counts)}")
+    return counts
 
-    # 先删除同源同天旧数据（覆盖写入）
-    conn.execute("DELETE FROM novel_ranks WHERE source=? AND date=?", (source, day))
 
+def save_batch(
+    source: str,
+    list_key: str,
+    novels: list[NovelRank],
+    day: Optional[str] = None,
+    snapshot: Optional[str] = None,
+    summary: bool = True,
+) -> dict:
+    """
+    保存单个榜单的一个快照，并在同一事务内记录断点、重算当天汇总
+
+    该榜单当天较早的快照保留（用于观察日内排名变化），同一快照时间重复写入
+    则按差异覆盖。当天未标记榜单的旧行中属于该榜单的部分先改挂到该榜单
+    （见 _adopt_legacy_rows），其余榜单和未标记的行都不受影响。
+    连续写入多个榜单时可传 summary=False，全部写完后调用 refresh_summary 一次。
+
+    Returns:
+        dict: {"inserted": 新增行数, "updated": 更新行数, "deleted": 删除行数}
+    """
+    day = day or today_str()
+    snapshot = snapshot or snapshot_str()
+    conn = get_connection()
     now = datetime.now().isoformat()
-    rows = []
-    for n in novels:
-        d = n.to_dict()
-        extra = d.get("extra", {})
-        heat = extra.get("heat", "")
-        hv = parse_heat_value(heat)
-        rows.append((
-            day,
-            source,
-            d.get("source", ""),   # source_name
-            d.get("rank", 0),
-            d.get("title", ""),
-            d.get("author", ""),
-            d.get("category", ""),
-            d.get("gender", ""),
-            d.get("period", ""),
-            d.get("book_url", ""),
-            heat,
-            hv,
-            json.dumps(d, ensure_ascii=False),
-            now,
-        ))
 
-    conn.executemany("""
-        INSERT INTO novel_ranks
-            (date, source, source_name, rank, title, author, category, gender, period,
-             book_url, heat, heat_value, raw_json, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
-    conn.commit()
-    conn.close()
-    print(f"  [save] {len(novels)} records -> SQLite ({source}, {day})")
+    records = [n.to_dict() for n in novels]
 
+    with conn:
+        adopted = _adopt_legacy_rows(conn, source, day, list_key, records)
+        counts = _write_diff(
+            conn, source, day, snapshot, list_key, records,
+            "f.date=? AND l.source=? AND f.snapshot=? AND l.list_key=?",
+            (day, source, snapshot, list_key),
+        )
+        conn.execute("""
+            INSERT OR REPLACE INTO scrape_checkpoints (source, date, list_key, count, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (source, day, list_key, len(novels), now))
+        changed = adopted > 0 or any(counts.values())
+        if changed:
+            _bump_version(conn, source, day)
+            if summary:
+                _refresh_summary(conn, source, day)
+    if changed:
+        _snapshot_cache.invalidate(source, day)
+    print(f"  [save] {len(novels)} records -> SQLite ({source}, {day}, {list_key} @ {snapshot[11:]}) "
+          f"{_diff_summary(counts)}")
+    return counts
 
-def load_data(source: str, day: Optional[str] = None) -> list[dict]:
-    """加载某天某数据源的数据"""
+
+def done_lists(source: str, day: Optional[str] = None, since: Optional[str] = None) -> set[str]:
+    """
+    某数据源某天已完成入库的榜单键
+
+    since 为 ISO 时间时只算在此之后入库的榜单（用于按间隔刷新热门榜单）。
+    """
     day = day or today_str()
-    conn = _get_conn()
+    conn = get_connection()
     rows = conn.execute(
-        "SELECT raw_json FROM novel_ranks WHERE source=? AND date=? ORDER BY rank",
-        (source, day)
+        "SELECT list_key FROM scrape_checkpoints WHERE source=? AND date=? AND updated_at >= ?",
+        (source, day, since or "")
     ).fetchall()
-    conn.close()
+    return {row["list_key"] for row in rows}
 
-    result = []
-    for row in rows:
-        result.append(json.loads(row["raw_json"]))
 
-    print(f"  [load] {len(result)} records ({source}, {day})")
+def clear_checkpoints(source: str, day: Optional[str] = None):
+    """清除断点（强制刷新时从头抓取）"""
+    day = day or today_str()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM scrape_checkpoints WHERE source=? AND date=?", (source, day))
+
+
+def load_data(
+    source: str,
+    day: Optional[str] = None,
+    snapshot: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None
+) -> list[dict]:
+    """
+    加载某天某数据源的数据
+
+    每个榜单取当天最新的快照；指定 snapshot（ISO 时间）时取各榜单在该时刻
+    的状态，即不晚于它的最新快照。
+
+    fields 指定时只返回这些字段（投影），如 ("title", "rank", "heat_value")；
+    只含类型列（见 _TYPED_FIELDS）时不读取、不解码压缩的简介和其余字段。
+
+    结果缓存在进程内（见 SnapshotCache），数据有写入时自动失效。
+    """
+    day = day or today_str()
+    result, cached = _select_ranks(source, day, snapshot, fields=fields)
+    print(f"  [load] {len(result)} records ({source}, {day}{', cached' if cached else ''})")
     return result
 
 
+def query_ranks(
+    source: str,
+    day: Optional[str] = None,
+    snapshot: Optional[str] = None,
+    gender: Optional[str] = None,
+    period: Optional[str] = None,
+    category: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None
+) -> list[dict]:
+    """
+    按条件查询某天某数据源的数据，筛选、排序和条数限制都在 SQL 中完成
+
+    快照和 fields 的含义同 load_data。gender / period / category 为库中的
+    频道 / 榜单类型 / 分类名（如 "男频"、"阅读榜"）。sort 为 _SORT_ORDERS 中的
+    排序方式，默认同 load_data 按排名；"heat" 按热度降序。limit 限制返回条数。
+    """
+    day = day or today_str()
+    if sort is not None and sort not in _SORT_ORDERS:
+        raise ValueError(f"不支持的排序方式: {sort}")
+    return _select_ranks(source, day, snapshot, gender, period, category, sort, limit, fields)[0]
+
+
+def count_ranks(
+    source: str,
+    day: Optional[str] = None,
+    snapshot: Optional[str] = None,
+    gender: Optional[str] = None,
+    period: Optional[str] = None,
+    category: Optional[str] = None
+) -> int:
+    """query_ranks 不限条数时的结果条数"""
+    day = day or today_str()
+    where, params = _rank_filters(source, day, snapshot, gender, period, category)
+    conn = get_connection()
+    return conn.execute(f"SELECT COUNT(*) FROM novel_ranks WHERE {where}", params).fetchone()[0]
+
+
+def merge_ranks(results: list[list[dict]], sort: Optional[str] = None, limit: Optional[int] = None) -> list[dict]:
+    """
+    合并多个数据源的 query_ranks 结果（各自已按 sort 排好序）
+
+    sort 为 None 时按数据源顺序依次拼接；否则按相同的排序键归并，排序键相同
+    时排在前面的数据源在前，与拼接后再稳定排序的结果相同。排序用到的字段
+    （如 "heat" 的 heat_value）须在 fields 中。
+    """
+    if sort is None:
+        merged = itertools.chain.from_iterable(results)
+    else:
+        merged = heapq.merge(*results, key=_SORT_KEYS[sort])
+    return list(itertools.islice(merged, limit)) if limit is not None else list(merged)
+
+
+def _rank_filters(source: str, day: str, snapshot: Optional[str], gender: Optional[str],
+                  period: Optional[str], category: Optional[str]) -> tuple[str, list]:
+    """novel_ranks 视图的查询条件：频道 / 榜单类型筛选榜单，分类按 category_id"""
+    lists = "SELECT id FROM rank_lists WHERE source=?"
+    params: list = [source]
+    if gender:
+        lists += " AND gender=?"
+        params.append(gender)
+    if period:
+        lists += " AND period=?"
+        params.append(period)
+    where = f"list_id IN ({lists}) AND date=?"
+    params.append(day)
+    if category is not None:
+        where += " AND category_id=(SELECT id FROM categories WHERE name=?)"
+        params.append(category)
+    where += f" AND {_LATEST_SNAPSHOT}"
+    params.extend([snapshot, snapshot])
+    return where, params
+
+
+def _select_ranks(
+    source: str,
+    day: str,
+    snapshot: Optional[str] = None,
+    gender: Optional[str] = None,
+    period: Optional[str] = None,
+    category: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None
+) -> tuple[list[dict], bool]:
+    """执行查询（经过进程内缓存），返回 (结果, 是否命中缓存)"""
+    fields = tuple(fields) if fields is not None else None
+    conn = get_connection()
+
+    key = (source, day, snapshot, fields, gender, period, category, sort, limit)
+    if _snapshot_cache.enabled:
+        version = _data_version(conn, source, day)
+        cached = _snapshot_cache.get(key, version)
+        if cached is not None:
+            return _copy_rows(cached), True
+
+    columns, build = _projection(fields)
+    where, params = _rank_filters(source, day, snapshot, gender, period, category)
+    sql = f"SELECT {columns} FROM novel_ranks WHERE {where} ORDER BY {_SORT_ORDERS[sort or 'rank']}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    rows = conn.execute(sql, params).fetchall()
+
+    result = [build(row) for row in rows]
+    if _snapshot_cache.enabled:
+        _snapshot_cache.put(key, version, result)
+        result = _copy_rows(result)
+    return result, False
+
+
+def list_snapshots(source: str, day: Optional[str] = None) -> list[str]:
+    """某数据源某天的全部快照时间（升序）"""
+    day = day or today_str()
+    conn = get_connection()
+    rows = conn.execute(
+        f"SELECT DISTINCT snapshot FROM rank_facts WHERE date=? AND {_SOURCE_LISTS} ORDER BY snapshot",
+        (day, source)
+    ).fetchall()
+    return [row["snapshot"] for row in rows]
+
+
 def list_dates() -> list[str]:
     """列出所有有数据的日期（降序）"""
-    conn = _get_conn()
+    conn = get_connection()
     rows = conn.execute(
-        "SELECT DISTINCT date FROM novel_ranks ORDER BY date DESC"
+        "SELECT DISTINCT date FROM rank_facts ORDER BY date DESC"
     ).fetchall()
-    conn.close()
     return [row["date"] for row in rows]
 
 
 def latest_date() -> str:
     """返回最近有数据的日期"""
     today = today_str()
-    conn = _get_conn()
+    conn = get_connection()
 
     # 今天有数据则用今天
     row = conn.execute(
-        "SELECT COUNT(*) as cnt FROM novel_ranks WHERE date=?", (today,)
+        "SELECT 1 FROM rank_facts WHERE date=? LIMIT 1", (today,)
     ).fetchone()
-    if row["cnt"] > 0:
-        conn.close()
+    if row is not None:
         return today
 
     # 否则取历史最新
     row = conn.execute(
-        "SELECT date FROM novel_ranks ORDER BY date DESC LIMIT 1"
+        "SELECT date FROM rank_facts ORDER BY date DESC LIMIT 1"
     ).fetchone()
-    conn.close()
     return row["date"] if row else today
 
 
-def get_novel_trend(title: str, source: Optional[str] = None, limit: int = 30) -> list[dict]:
-    """查询某本小说历史热度数据，用于趋势图"""
-    conn = _get_conn()
+def get_novel_trend(
+    title: str,
+    source: Optional[str] = None,
+    limit: int = 30,
+    intraday: bool = False
+) -> list[dict]:
+    """
+    查询某本小说历史热度数据，用于趋势图
+
+    默认每天只取各榜单的最新快照；intraday=True 返回日内全部快照。
+    """
+    conn = get_connection()
 
+    where = "title=?"
+    params: list = [title]
     if source:
-        rows = conn.execute("""
-            SELECT date, source, source_name, rank, heat, heat_value, category, gender, period, book_url, raw_json
-            FROM novel_ranks
-            WHERE title=? AND source=?
-            ORDER BY date DESC
-            LIMIT ?
-        """, (title, source, limit)).fetchall()
-    else:
-        rows = conn.execute("""
-            SELECT date, source, source_name, rank, heat, heat_value, category, gender, period, book_url, raw_json
-            FROM novel_ranks
-            WHERE title=?
-            ORDER BY date DESC
-            LIMIT ?
-        """, (title, limit)).fetchall()
-    conn.close()
+        where += " AND source=?"
+        params.append(source)
+    if not intraday:
+        where += f" AND {_LATEST_SNAPSHOT}"
+        params.extend([None, None])
+    rows = conn.execute(f"""
+        SELECT date, snapshot, source, source_name, rank, heat, heat_value, category, gender, period, book_url
+        FROM novel_ranks
+        WHERE {where}
+        ORDER BY date DESC, snapshot DESC
+        LIMIT ?
+    """, (*params, limit)).fetchall()
 
     result = []
     for row in rows:
         result.append({
             "date": row["date"],
+            "snapshot": row["snapshot"],
             "source": row["source"],
             "source_name": row["source_name"],
             "rank": row["rank"],
@@ -222,6 +1210,272 @@ def get_novel_trend(title: str, source: Optional[str] = None, limit: int = 30) -
     return result
 
 
+# ============================================================
+# 每日汇总：看板 / 分类排行直接读汇总表，不加载整天数据
+# ============================================================
+# 每个数据源每天保存的热度前 N 条（每个频道）和每个分类的热度前 N 条
+_HEAT_TOP = 30
+_CATEGORY_TOP = 10
+
+
+def _compute_summary(conn: sqlite3.Connection, source: str, day: str) -> dict:
+    """
+    从排名事实算出某数据源某天的汇总（只读）
+
+    Returns:
+        dict: {"total": 条数, "counts": [...], "titles": [...], "top": [...]}，
+        后三项的元素为与 day_counts / day_titles / day_top_books 列同名的 dict
+    """
+    rows = conn.execute(f"""
+        SELECT title, author, category, gender, period, source_name, book_url, heat, heat_value, extra
+        FROM novel_ranks WHERE {_SOURCE_LISTS} AND date=? AND {_LATEST_SNAPSHOT}
+        ORDER BY rank, id
+    """, (source, day, None, None)).fetchall()
+
+    counts: dict[tuple, list] = {}
+    titles: dict[tuple, tuple] = {}
+    by_gender: dict[str, list] = {}
+    by_category: dict[str, list] = {}
+    for pos, row in enumerate(rows):
+        for dim in ("category", "gender", "period"):
+            entry = counts.setdefault((dim, row[dim]), [0, pos])
+            entry[0] += 1
+        if row["title"]:
+            titles.setdefault((row["source_name"], row["title"]), (pos, row["author"], row["category"], row["book_url"]))
+        if row["heat_value"] > 0:
+            by_gender.setdefault(row["gender"], []).append((pos, row))
+        by_category.setdefault(row["category"], []).append((pos, row))
+
+    top = []
+    for kind, groups, limit in (("heat", by_gender, _HEAT_TOP), ("category", by_category, _CATEGORY_TOP)):
+        for key, items in groups.items():
+            items.sort(key=lambda item: -item[1]["heat_value"])
+            for pos, row in items[:limit]:
+                word_count = ""
+                if kind == "heat" and row["extra"]:
+                    word_count = json.loads(_unpack(row["extra"])).get("extra", {}).get("word_count", "")
+                top.append({
+                    "source": source, "kind": kind, "key": key, "pos": pos,
+                    "title": row["title"], "author": row["author"], "category": row["category"],
+                    "gender": row["gender"], "source_name": row["source_name"], "book_url": row["book_url"],
+                    "heat": row["heat"], "heat_value": row["heat_value"], "word_count": word_count,
+                })
+
+    return {
+        "total": len(rows),
+        "counts": [
+            {"source": source, "dim": dim, "value": value, "count": count, "first_pos": pos}
+            for (dim, value), (count, pos) in counts.items()
+        ],
+        "titles": [
+            {"source": source, "source_name": name, "title": title, "first_pos": pos,
+             "author": author, "category": category, "book_url": book_url}
+            for (name, title), (pos, author, category, book_url) in titles.items()
+        ],
+        "top": top,
+    }
+
+
+def _refresh_summary(conn: sqlite3.Connection, source: str, day: str):
+    """重算某数据源某天的汇总并写入汇总表（在调用方的写入事务内）"""
+    summary = _compute_summary(conn, source, day)
+    for table in ("day_summaries", "day_counts", "day_titles", "day_top_books"):
+        conn.execute(f"DELETE FROM {table} WHERE date=? AND source=?", (day, source))
+    conn.execute(
+        "INSERT INTO day_summaries (date, source, version, total) VALUES (?, ?, ?, ?)",
+        (day, source, _data_version(conn, source, day), summary["total"]),
+    )
+    conn.executemany("""
+        INSERT INTO day_counts (date, source, dim, value, count, first_pos)
+        VALUES (:date, :source, :dim, :value, :count, :first_pos)
+    """, [dict(r, date=day) for r in summary["counts"]])
+    conn.executemany("""
+        INSERT INTO day_titles (date, source, source_name, title, first_pos, author, category, book_url)
+        VALUES (:date, :source, :source_name, :title, :first_pos, :author, :category, :book_url)
+    """, [dict(r, date=day) for r in summary["titles"]])
+    conn.executemany("""
+        INSERT INTO day_top_books
+            (date, source, kind, key, pos, title, author, category, gender, source_name, book_url,
+             heat, heat_value, word_count)
+        VALUES (:date, :source, :kind, :key, :pos, :title, :author, :category, :gender, :source_name,
+                :book_url, :heat, :heat_value, :word_count)
+    """, [dict(r, date=day) for r in summary["top"]])
+
+
+def refresh_summary(source: str, day: Optional[str] = None):
+    """重算某数据源某天的汇总（用 save_batch(..., summary=False) 批量写入后调用一次）"""
+    day = day or today_str()
+    conn = get_connection()
+    with conn:
+        _refresh_summary(conn, source, day)
+
+
+def _load_summaries(day: str, sources: list[str]) -> dict:
+    """
+    读取各数据源某天的汇总（只读，不写库）
+
+    汇总表与当前数据版本一致时直接读表；没有汇总或已过期（如升级前写入的数据、
+    批量写入尚未结束）时从排名事实现算，结果不写回，由写入方负责刷新。
+
+    Returns:
+        dict: {
+            "totals": {source: 条数}（当天没有数据为 0）,
+            "counts" / "titles" / "top": [(数据源序号, 行)]，行可按列名取值,
+        }
+    """
+    conn = get_connection()
+    order = {source: i for i, source in enumerate(sources)}
+    summaries = {
+        row["source"]: row for row in conn.execute(
+            "SELECT source, version, total FROM day_summaries WHERE date=?", (day,)
+        )
+    }
+    result: dict = {"totals": {}, "counts": [], "titles": [], "top": []}
+    fresh = []
+    for source in sources:
+        row = summaries.get(source)
+        if row is not None and row["version"] == _data_version(conn, source, day):
+            result["totals"][source] = row["total"]
+            fresh.append(source)
+        elif row is None and not has_data(source, day):
+            result["totals"][source] = 0
+        else:
+            summary = _compute_summary(conn, source, day)
+            result["totals"][source] = summary["total"]
+            for part in ("counts", "titles", "top"):
+                result[part].extend((order[source], r) for r in summary[part])
+
+    if fresh:
+        marks = ",".join("?" * len(fresh))
+        for part, table in (("counts", "day_counts"), ("titles", "day_titles"), ("top", "day_top_books")):
+            rows = conn.execute(
+                f"SELECT * FROM {table} WHERE date=? AND source IN ({marks})", (day, *fresh)
+            ).fetchall()
+            result[part].extend((order[row["source"]], row) for row in rows)
+    return result
+
+
+def load_dashboard(day: str, sources: list[str]) -> dict:
+    """
+    看板汇总（读汇总表，汇总过期的数据源现算，见 _load_summaries）
+
+    sources 为数据源键的顺序，决定同分同热度时的先后（与按该顺序加载各数据源
+    全部数据再统计的结果相同）。
+
+    Returns:
+        dict: {
+            "totals": {source: 条数},
+            "total": 总条数,
+            "category_stats": 条数前 15 的分类,
+            "gender_stats": {频道: 条数},
+            "period_stats": {榜单类型: 条数},
+            "cross_platform": 出现在 2 个及以上平台的书（前 20）,
+            "heat_rank": {频道: 热度前 _HEAT_TOP 的书},
+        }
+    """
+    summaries = _load_summaries(day, sources)
+    totals = summaries["totals"]
+
+    counters: dict[str, dict] = {"category": {}, "gender": {}, "period": {}}
+    first: dict[tuple, tuple] = {}
+    for order, row in summaries["counts"]:
+        key = (row["dim"], row["value"])
+        counters[row["dim"]][row["value"]] = counters[row["dim"]].get(row["value"], 0) + row["count"]
+        first[key] = min(first.get(key, (order, row["first_pos"])), (order, row["first_pos"]))
+
+    def ordered(dim: str) -> list[tuple]:
+        """按首次出现顺序排列的 (值, 条数)"""
+        return sorted(counters[dim].items(), key=lambda item: first[(dim, item[0])])
+
+    category_stats = sorted(ordered("category"), key=lambda item: -item[1])[:15]
+
+    # 跨平台：出现在 2 个及以上来源的书名，书籍信息取首次出现的记录
+    cross: dict[str, dict] = {}
+    for order, row in sorted(summaries["titles"], key=lambda item: (item[0], item[1]["first_pos"])):
+        info = cross.setdefault(row["title"], {
+            "title": row["title"],
+            "author": row["author"],
+            "category": row["category"],
+            "book_url": row["book_url"],
+            "sources": set(),
+        })
+        info["sources"].add(row["source_name"])
+    cross_platform = []
+    for info in cross.values():
+        if len(info["sources"]) >= 2:
+            info["sources"] = sorted(info["sources"])
+            info["source_count"] = len(info["sources"])
+            cross_platform.append(info)
+    cross_platform.sort(key=lambda x: x["source_count"], reverse=True)
+
+    heat_rank: dict[str, list] = {}
+    rows = [item for item in summaries["top"] if item[1]["kind"] == "heat"]
+    for order, row in sorted(rows, key=lambda item: (-item[1]["heat_value"], item[0], item[1]["pos"])):
+        books = heat_rank.setdefault(row["key"], [])
+        if len(books) < _HEAT_TOP:
+            books.append({
+                "title": row["title"],
+                "author": row["author"],
+                "heat": row["heat"],
+                "word_count": row["word_count"],
+                "source": row["source_name"],
+                "book_url": row["book_url"],
+                "category": row["category"],
+            })
+
+    return {
+        "totals": totals,
+        "total": sum(totals.values()),
+        "category_stats": dict(category_stats),
+        "gender_stats": dict(ordered("gender")),
+        "period_stats": dict(ordered("period")),
+        "cross_platform": cross_platform[:20],
+        "heat_rank": heat_rank,
+    }
+
+
+def load_category_rank(day: str, sources: list[str]) -> list[dict]:
+    """
+    分类排行（读汇总表，同 load_dashboard）：各分类热度前 _CATEGORY_TOP 条的热度累加倒排
+
+    sources 的含义同 load_dashboard。
+    """
+    summaries = _load_summaries(day, sources)
+
+    categories: dict[str, dict] = {}
+    rows = [item for item in summaries["counts"] if item[1]["dim"] == "category"]
+    for order, row in sorted(rows, key=lambda item: (item[0], item[1]["first_pos"])):
+        entry = categories.setdefault(row["value"], {"category": row["value"], "book_count": 0, "top": []})
+        entry["book_count"] += row["count"]
+
+    rows = [item for item in summaries["top"] if item[1]["kind"] == "category"]
+    for order, row in sorted(rows, key=lambda item: (-item[1]["heat_value"], item[0], item[1]["pos"])):
+        top = categories[row["key"]]["top"]
+        if len(top) < _CATEGORY_TOP:
+            top.append({
+                "title": row["title"],
+                "author": row["author"],
+                "heat": row["heat"],
+                "heat_value": row["heat_value"],
+                "source": row["source_name"],
+                "gender": row["gender"],
+                "book_url": row["book_url"],
+            })
+
+    category_rank = []
+    for entry in categories.values():
+        top10 = entry.pop("top")
+        category_rank.append({
+            "category": entry["category"],
+            "total_heat": sum(b["heat_value"] for b in top10),
+            "book_count": entry["book_count"],
+            "top10_count": len(top10),
+            "top10": top10,
+        })
+    category_rank.sort(key=lambda x: x["total_heat"], reverse=True)
+    return category_rank
+
+
 # ============================================================
 # 数据迁移：旧 JSON -> SQLite
 # ============================================================
@@ -264,15 +1518,8 @@ def migrate_json_data():
 
 def _import_json_file(filepath: str, source_key: str, day: str) -> int:
     """导入单个 JSON 文件"""
-    conn = _get_conn()
-
     # 检查是否已导入
-    row = conn.execute(
-        "SELECT COUNT(*) as cnt FROM novel_ranks WHERE source=? AND date=?",
-        (source_key, day)
-    ).fetchone()
-    if row["cnt"] > 0:
-        conn.close()
+    if has_data(source_key, day):
         return 0
 
     try:
@@ -280,47 +1527,20 @@ def _import_json_file(filepath: str, source_key: str, day: str) -> int:
             data = json.load(f)
     except Exception as e:
         print(f"  [warn] failed to read {filepath}: {e}")
-        conn.close()
         return 0
 
     novels = data.get("novels", [])
     if not novels:
-        conn.close()
         return 0
 
-    now = datetime.now().isoformat()
-    rows = []
-    for d in novels:
-        extra = d.get("extra", {})
-        heat = extra.get("heat", "")
-        hv = parse_heat_value(heat)
-        rows.append((
-            day,
-            source_key,
-            d.get("source", ""),   # source_name
-            d.get("rank", 0),
-            d.get("title", ""),
-            d.get("author", ""),
-            d.get("category", ""),
-            d.get("gender", ""),
-            d.get("period", ""),
-            d.get("book_url", ""),
-            heat,
-            hv,
-            json.dumps(d, ensure_ascii=False),
-            now,
-        ))
-
-    conn.executemany("""
-        INSERT INTO novel_ranks
-            (date, source, source_name, rank, title, author, category, gender, period,
-             book_url, heat, heat_value, raw_json, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
-    conn.commit()
-    conn.close()
-    print(f"  [import] {len(rows)} records <- {filepath}")
-    return len(rows)
+    conn = get_connection()
+    with conn:
+        count = _insert_records(conn, source_key, day, snapshot_str(), "", novels)
+        _bump_version(conn, source_key, day)
+        _refresh_summary(conn, source_key, day)
+    _snapshot_cache.invalidate(source_key, day)
+    print(f"  [import] {count} records <- {filepath}")
+    return count
 
 
 # 启动时自动初始化
@@ -0,0 +1,110 @@
+"""抓取入库流程 - 逐榜单流式写入，支持断点续抓"""
+
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from typing import Optional
+
+from scrapers.base import BaseScraper, scrape_scope
+from storage import clear_checkpoints, done_lists, refresh_summary, save_batch, snapshot_str, today_str
+
+
+def sync_source(
+    source_key: str,
+    scraper: BaseScraper,
+    gender: Optional[str] = None,
+    period: Optional[str] = None,
+    day: Optional[str] = None,
+    resume: bool = True,
+    lists: Optional[list[str]] = None,
+    refresh_after: Optional[float] = None,
+) -> dict:
+    """
+    抓取一个数据源并逐榜单入库
+
+    每抓完一个榜单立即写入数据库并记录断点；进程中途退出后再次运行
+    （resume=True）只会抓取当天尚未完成的榜单。抓取失败或结果为空的
+    榜单不写入也不记断点，已有的数据保持不变，下次运行会重试。
+    每次运行入库的榜单共用一个快照时间（即开始抓取的时间，与页面归档一致），
+    当天较早的快照保留。有榜单入库时最后重算一次当天的汇总（看板 / 分类排行）。
+
+    Args:
+        source_key: 数据源标识
+        scraper: 爬虫实例
+        gender: 可选，筛选频道
+        period: 可选，筛选榜单类型
+        day: 数据日期，默认今天
+        resume: True 跳过已完成的榜单；False 清除断点从头抓取
+        lists: 可选，只抓取这些榜单键（如热门榜单）
+        refresh_after: 可选，秒；resume 时入库已超过这么久的榜单仍重新抓取
+
+    Returns:
+        dict: {
+            "novels": 本次抓取的 NovelRank 列表（按榜单顺序），
+            "saved": 本次入库的榜单数,
+            "skipped": 因断点跳过的榜单数,
+            "empty": 结果为空的榜单键列表,
+            "failed": 抓取失败的榜单键列表,
+            "rows": 差异写入的行数 {"inserted", "updated", "deleted"},
+        }
+    """
+    day = day or today_str()
+
+    if resume:
+        since = None
+        if refresh_after:
+            since = (datetime.now() - timedelta(seconds=refresh_after)).isoformat()
+        skip = done_lists(source_key, day, since)
+    else:
+        clear_checkpoints(source_key, day)
+        skip = set()
+
+    keys = scraper.list_keys(gender, period)
+    if lists is not None:
+        wanted = set(lists)
+        skip |= {k for k in keys if k not in wanted}
+        keys = [k for k in keys if k in wanted]
+    batches = {}
+    empty = []
+    failed = []
+    rows = {"inserted": 0, "updated": 0, "deleted": 0}
+    snapshot = snapshot_str()
+    with scrape_scope(snapshot=snapshot):
+        for list_key, novels in scraper.iter_batches(gender, period, skip=skip):
+            if novels is None:
+                failed.append(list_key)
+                continue
+            if not novels:
+                print(f"  ⚠ 榜单无数据，跳过入库: {source_key} {list_key}")
+                empty.append(list_key)
+                continue
+            counts = save_batch(source_key, list_key, novels, day, snapshot, summary=False)
+            for k, v in counts.items():
+                rows[k] += v
+            batches[list_key] = novels
+    if batches:
+        refresh_summary(source_key, day)
+
+    ordered = []
+    for key in keys:
+        ordered.extend(batches.get(key, []))
+
+    return {
+        "novels": ordered,
+        "saved": len(batches),
+        "skipped": len([k for k in keys if k in skip]),
+        "empty": empty,
+        "failed": failed,
+        "rows": rows,
+    }
+
+
+def hot_lists(scraper: BaseScraper, patterns: list[str]) -> list[str]:
+    """
+    按通配符（fnmatch）挑出需要高频刷新的热门榜单键
+
+    例如番茄 "*:read:*" 为全部阅读榜，七猫 "*:hot" 为男女频大热榜。
+    """
+    return [
+        key for key in scraper.list_keys()
+        if any(fnmatchcase(key, p) for p in patterns)
+    ]
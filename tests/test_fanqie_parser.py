@@ -0,0 +1,39 @@
+"""番茄排行榜解析：用脱敏的页面夹具逐字段比对解析结果"""
+
+import json
+import os
+
+import pytest
+
+from scrapers.fanqie import FanqieScraper
+from scrapers.replay import load_fixtures
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURES = load_fixtures(FIXTURES_DIR, "fanqie")
+
+
+@pytest.fixture(scope="module")
+def scraper():
+    return FanqieScraper({"page_cache": False, "archive": False})
+
+
+@pytest.mark.parametrize("path", sorted(FIXTURES))
+def test_parse_rank_page(scraper, path):
+    fixture = FIXTURES[path]
+    source_dir = os.path.join(FIXTURES_DIR, "fanqie")
+    with open(os.path.join(source_dir, fixture["file"]), encoding="utf-8") as f:
+        html = f.read()
+    with open(os.path.join(source_dir, fixture["expected"]), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    novels = [n.to_dict() for n in getattr(scraper, fixture["parser"])(html, *fixture["args"])]
+
+    assert len(novels) == len(expected), [n["title"] for n in novels]
+    for i, (got, want) in enumerate(zip(novels, expected)):
+        for field, value in want.items():
+            assert got[field] == value, f"{fixture['file']} #{i + 1} {field}"
+        assert set(got) == set(want), f"{fixture['file']} #{i + 1}"
+
+
+def test_fixtures_present():
+    assert len(FIXTURES) >= 3
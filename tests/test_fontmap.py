@@ -0,0 +1,59 @@
+"""字体反爬映射：从页面学习映射，并解码已知的混淆文本"""
+
+import json
+
+from scrapers.fanqie import FanqieScraper
+from scrapers.fontmap import PUA_RANGE, FontDecoder, learn_mapping, translate
+
+# 混淆文本（私有区码位 E3E8 E3E9 + "之王"）对应真实书名 "剑道之王"
+OBFUSCATED = "\ue3e8\ue3e9之王"
+PLAIN = "剑道之王"
+
+PAGE = """<html><head>
+<style>@font-face { font-family: dc; src: url("/static/font/dc027189e0ba4cd.woff2"); }</style>
+<script>window.__INITIAL_STATE__ = {"rank": {"book_list": [
+  {"bookId": "7001", "bookName": "剑道之王", "author": "道长", "lastChapterTitle": "第一章 剑出"},
+  {"bookId": "7002", "bookName": "王者之道", "author": "剑客", "lastChapterTitle": "第二章"}
+]}};</script></head><body>
+<div class="rank-book-item">
+  <div class="title"><a href="/page/7001">\ue3e8\ue3e9之王</a></div>
+  <a href="/author-page/1">\ue3e9长</a><a href="/reader/1">最近更新：第一章 \ue3e8出</a>
+</div>
+<div class="rank-book-item">
+  <div class="title"><a href="/page/7002">王者之\ue3e9</a></div>
+  <a href="/author-page/2">\ue3e8客</a><a href="/reader/2">第二章</a>
+</div>
+</body></html>"""
+
+
+def test_learn_mapping_from_page(tmp_path):
+    scraper = FanqieScraper({"page_cache": False, "archive": False})
+    version, pairs = scraper.font_samples(PAGE)
+    assert version == "dc027189e0ba4cd"
+    assert (OBFUSCATED, PLAIN) in pairs
+
+    mapping = learn_mapping(pairs)
+    assert mapping == {"E3E8": "剑", "E3E9": "道"}
+
+    decoder = FontDecoder(str(tmp_path / "fanqie.json"))
+    assert decoder.merge(version, mapping) == 2
+    assert decoder.decode(OBFUSCATED, version) == PLAIN
+    # 未知字体版本回退到 default
+    assert decoder.decode(OBFUSCATED, "unknown") == PLAIN
+    with open(tmp_path / "fanqie.json", encoding="utf-8") as f:
+        assert json.load(f)[version] == mapping
+
+
+def test_translate_uses_table_and_drops_unmapped(tmp_path):
+    path = tmp_path / "fanqie.json"
+    path.write_text(json.dumps({"default": {"E3E8": "剑"}}), encoding="utf-8")
+    table = FontDecoder(str(path)).table()
+
+    assert translate(OBFUSCATED, table) == "剑之王"
+    assert translate("普通文本", table) == "普通文本"
+    assert all(code in table for code in PUA_RANGE)
+
+
+def test_learn_mapping_majority_and_skips_unaligned():
+    pairs = [("\ue001a", "甲a"), ("\ue001b", "甲b"), ("\ue001", "乙"), ("\ue002xx", "丙")]
+    assert learn_mapping(pairs) == {"E001": "甲"}